@@ -0,0 +1,84 @@
+#!/usr/bin/env python3
+"""
+Benchmark CLI
+    python -m e2eios.benchmarks run [--out results.json] [--iterations 50] [--latency 0.002]
+    python -m e2eios.benchmarks compare baseline.json current.json [--threshold 0.10]
+"""
+
+import argparse
+import json
+import sys
+
+from e2eios.benchmarks.suite import BENCHMARKS, compare, run_suite
+
+
+def cmd_run(args) -> int:
+    report = run_suite(iterations=args.iterations, warmup=args.warmup, latency=args.latency,
+                       session_latency=args.session_latency, jitter=args.jitter,
+                       failure_rate=args.failure_rate, only=args.only, seed=args.seed)
+    text = json.dumps(report, indent=2)
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as f:
+            f.write(text + "\n")
+        for name, stats in report['benchmarks'].items():
+            print(f"{name:<24} p50={stats['p50']:>9.3f}ms  p95={stats['p95']:>9.3f}ms  "
+                  f"p99={stats['p99']:>9.3f}ms  errors={stats['errors']}")
+        print(f"Results written to {args.out}")
+    else:
+        print(text)
+    return 0
+
+
+def cmd_compare(args) -> int:
+    with open(args.baseline, encoding="utf-8") as f:
+        baseline = json.load(f)
+    with open(args.current, encoding="utf-8") as f:
+        current = json.load(f)
+    rows = compare(baseline, current, threshold=args.threshold)
+    if args.json:
+        print(json.dumps(rows, indent=2))
+    else:
+        for row in rows:
+            flag = "REGRESSION" if row['regression'] else "ok"
+            if row['metric'] == 'errors':
+                print(f"{row['benchmark']:<24} errors {row['baseline']:>8} -> {row['current']:>8}  "
+                      f"(n={current['benchmarks'][row['benchmark']].get('n', 0)}) {flag}")
+                continue
+            print(f"{row['benchmark']:<24} {row['metric']:<4} {row['baseline']:>10.3f} -> "
+                  f"{row['current']:>10.3f} ms  x{row['ratio']:<6} {flag}")
+    regressions = [r for r in rows if r['regression']]
+    if regressions:
+        print(f"{len(regressions)} regression(s): slower than {args.threshold:.0%} or new errors", file=sys.stderr)
+        return 1
+    return 0
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(prog="python -m e2eios.benchmarks", description="Overhead benchmarks")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    run = sub.add_parser("run", help="Run the benchmark suite")
+    run.add_argument("--out", help="Write JSON results to this file")
+    run.add_argument("--iterations", type=int, default=50)
+    run.add_argument("--warmup", type=int, default=3)
+    run.add_argument("--latency", type=float, default=0.002, help="Fake server latency per request (s)")
+    run.add_argument("--session-latency", type=float, default=0.05, help="Fake POST /session latency (s)")
+    run.add_argument("--jitter", type=float, default=0.0)
+    run.add_argument("--failure-rate", type=float, default=0.0)
+    run.add_argument("--seed", type=int, default=0)
+    run.add_argument("--only", nargs="+", choices=sorted(BENCHMARKS))
+    run.set_defaults(func=cmd_run)
+
+    cmp_ = sub.add_parser("compare", help="Compare two result files and flag regressions")
+    cmp_.add_argument("baseline")
+    cmp_.add_argument("current")
+    cmp_.add_argument("--threshold", type=float, default=0.10, help="Allowed slowdown ratio (0.10 = 10%%)")
+    cmp_.add_argument("--json", action="store_true", help="Print comparison rows as JSON")
+    cmp_.set_defaults(func=cmd_compare)
+
+    args = parser.parse_args(argv)
+    return args.func(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
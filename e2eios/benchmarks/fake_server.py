@@ -0,0 +1,226 @@
+#!/usr/bin/env python3
+"""
+Fake Appium / WebDriverAgent Server
+Local stand-in for the Appium /status, session and element endpoints and
+the WDA /status endpoint, with configurable latency and failure injection
+"""
+
+import json
+import random
+import re
+import threading
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, Optional, Tuple
+
+ELEMENT_KEY = "element-6066-11e4-a52e-4f735466cecf"
+
+PAGE_SOURCE = """<?xml version="1.0" encoding="UTF-8"?><AppiumAUT>
+<XCUIElementTypeApplication type="XCUIElementTypeApplication" name="Settings" label="Settings" enabled="true" visible="true" x="0" y="0" width="390" height="844">
+<XCUIElementTypeNavigationBar type="XCUIElementTypeNavigationBar" name="Settings" enabled="true" visible="true" x="0" y="47" width="390" height="96"/>
+<XCUIElementTypeCell type="XCUIElementTypeCell" name="com.apple.settings.general" label="General" enabled="true" visible="true" x="0" y="300" width="390" height="44"/>
+<XCUIElementTypeCell type="XCUIElementTypeCell" name="com.apple.settings.privacy" label="Privacy &amp; Security" enabled="true" visible="true" x="0" y="344" width="390" height="44"/>
+</XCUIElementTypeApplication></AppiumAUT>"""
+
+
+class FakeServerConfig:
+    """Latency / failure knobs shared by all handler threads"""
+
+    def __init__(self, latency: float = 0.0, jitter: float = 0.0, failure_rate: float = 0.0,
+                 session_latency: Optional[float] = None, kind: str = "appium", seed: int = 0,
+                 backend: Optional["FakeServerConfig"] = None):
+        self.latency = latency
+        self.jitter = jitter
+        self.failure_rate = failure_rate
+        self.session_latency = latency if session_latency is None else session_latency
+        self.kind = kind
+        self.random = random.Random(seed)
+        self.lock = threading.Lock()
+        self.requests = 0
+        self.failures = 0
+        self.sessions: Dict[str, Dict[str, Any]] = {}
+        # Appium only: a fake WDA whose session is opened alongside ours and whose latency every
+        # session command pays again (the hop Appium adds in front of WDA)
+        self.backend = backend
+
+    def delay(self, base: float) -> float:
+        with self.lock:
+            return max(0.0, base + (self.random.uniform(-self.jitter, self.jitter) if self.jitter else 0.0))
+
+    def should_fail(self) -> bool:
+        with self.lock:
+            return self.failure_rate > 0 and self.random.random() < self.failure_rate
+
+
+class FakeHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    server_version = "FakeAppium/1.0"
+    # Headers and body are separate writes; avoid Nagle/delayed-ACK stalls
+    disable_nagle_algorithm = True
+
+    @property
+    def config(self) -> FakeServerConfig:
+        return self.server.config
+
+    def log_message(self, format, *args):
+        pass
+
+    def _body(self) -> Dict[str, Any]:
+        length = int(self.headers.get("Content-Length") or 0)
+        if not length:
+            return {}
+        try:
+            return json.loads(self.rfile.read(length) or b"{}")
+        except ValueError:
+            return {}
+
+    def _send(self, status: int, payload: Any):
+        body = json.dumps(payload).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _handle(self, method: str):
+        config = self.config
+        with config.lock:
+            config.requests += 1
+        body = self._body() if method in ("POST", "DELETE") else {}
+        is_new_session = method == "POST" and self.path.rstrip("/") == "/session"
+        time.sleep(config.delay(config.session_latency if is_new_session else config.latency))
+        if config.backend is not None and self.path.startswith("/session/"):
+            time.sleep(config.backend.delay(config.backend.latency))
+
+        if config.should_fail():
+            with config.lock:
+                config.failures += 1
+            self._send(500, {"value": {"error": "unknown error", "message": "injected failure"}})
+            return
+
+        status, payload = self.route(method, self.path, body)
+        self._send(status, payload)
+
+    def route(self, method: str, path: str, body: Dict[str, Any]) -> Tuple[int, Any]:
+        config = self.config
+        path = path.split("?", 1)[0].rstrip("/") or "/"
+        if path in ("/status", "/wd/hub/status"):
+            if config.kind == "wda":
+                return 200, {"value": {"ready": True, "device": "iphone",
+                                       "os": {"name": "iOS", "version": "15.7"}},
+                             "sessionId": next(reversed(list(config.sessions)), None)}
+            return 200, {"value": {"ready": True, "build": {"version": "fake-2.0"}}}
+        if method == "GET" and path == "/screenshot":
+            return 200, {"value": ""}
+
+        if method == "POST" and path == "/session":
+            session_id = uuid.uuid4().hex
+            caps = body.get("capabilities", {}).get("alwaysMatch", {})
+            with config.lock:
+                config.sessions[session_id] = {"caps": caps}
+            if config.backend is not None:
+                backend_id = uuid.uuid4().hex
+                with config.backend.lock:
+                    config.backend.sessions[backend_id] = {"caps": caps}
+                config.sessions[session_id]["backend"] = backend_id
+            return 200, {"value": {"sessionId": session_id, "capabilities": caps}}
+
+        m = re.match(r"^/session/([^/]+)(/.*)?$", path)
+        if not m:
+            return 404, {"value": {"error": "unknown command", "message": path}}
+        session_id, rest = m.group(1), m.group(2) or ""
+        if session_id not in config.sessions:
+            return 404, {"value": {"error": "invalid session id", "message": session_id}}
+
+        if method == "DELETE" and rest == "":
+            with config.lock:
+                session = config.sessions.pop(session_id, None)
+            if config.backend is not None and session and session.get("backend"):
+                with config.backend.lock:
+                    config.backend.sessions.pop(session["backend"], None)
+            return 200, {"value": None}
+        if method == "POST" and rest in ("/element", "/elements"):
+            element = {ELEMENT_KEY: uuid.uuid4().hex[:12]}
+            return 200, {"value": [element] if rest == "/elements" else element}
+        if method == "POST" and re.match(r"^/element/[^/]+/(click|value|clear)$", rest):
+            return 200, {"value": None}
+        if method == "GET" and re.match(r"^/element/[^/]+/(rect|attribute/.+|text|displayed)$", rest):
+            return 200, {"value": {"x": 0, "y": 300, "width": 390, "height": 44} if rest.endswith("rect") else "General"}
+        if method == "GET" and rest == "/source":
+            return 200, {"value": PAGE_SOURCE}
+        if method == "GET" and rest == "/screenshot":
+            return 200, {"value": ""}
+        if method == "POST" and rest in ("/actions", "/execute/sync", "/appium/device/activate_app",
+                                         "/appium/device/terminate_app", "/wda/tap", "/timeouts"):
+            return 200, {"value": None}
+        if method == "DELETE" and rest == "/actions":
+            return 200, {"value": None}
+        return 404, {"value": {"error": "unknown command", "message": f"{method} {rest}"}}
+
+    def do_GET(self):
+        self._handle("GET")
+
+    def do_POST(self):
+        self._handle("POST")
+
+    def do_DELETE(self):
+        self._handle("DELETE")
+
+
+class FakeServer:
+    """Threaded fake server; use as a context manager"""
+
+    def __init__(self, host: str = "127.0.0.1", port: int = 0, **config):
+        self.config = FakeServerConfig(**config)
+        self.httpd = ThreadingHTTPServer((host, port), FakeHandler)
+        self.httpd.daemon_threads = True
+        self.httpd.config = self.config
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def url(self) -> str:
+        host, port = self.httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self) -> "FakeServer":
+        self._thread = threading.Thread(target=self.httpd.serve_forever, name="fake-server", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+    def __enter__(self) -> "FakeServer":
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+
+def main(argv=None):
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Run a fake Appium or WDA server")
+    parser.add_argument("--kind", choices=["appium", "wda"], default="appium")
+    parser.add_argument("--port", type=int, default=4723)
+    parser.add_argument("--latency", type=float, default=0.0, help="Seconds added to every request")
+    parser.add_argument("--session-latency", type=float, default=None, help="Seconds added to POST /session")
+    parser.add_argument("--jitter", type=float, default=0.0)
+    parser.add_argument("--failure-rate", type=float, default=0.0)
+    args = parser.parse_args(argv)
+
+    server = FakeServer(port=args.port, kind=args.kind, latency=args.latency, jitter=args.jitter,
+                        failure_rate=args.failure_rate, session_latency=args.session_latency)
+    print(f"Fake {args.kind} server listening on {server.url}")
+    try:
+        server.httpd.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.httpd.server_close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,312 @@
+#!/usr/bin/env python3
+"""
+Benchmark Suite
+Measures the project's own overhead against local fake Appium/WDA servers
+and reports p50/p95/p99 as JSON, with a comparison mode for regressions
+"""
+
+import platform
+import tempfile
+import time
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional
+
+from e2eios.benchmarks.fake_server import ELEMENT_KEY, FakeServer
+from e2eios.utils.env import load_env
+from e2eios.utils.gestures import GestureEngine
+from e2eios.utils.http_client import get_client
+from e2eios.utils.logger import AppiumLogger, LogBackend, LogSink, configure_logging
+from e2eios.utils.probes import Probe, get_probe_engine, http_status_probe, url_port_probe
+from e2eios.utils.session_pool import SessionBroker, SessionKey, SessionPool, lease_session
+
+
+def percentile(samples: List[float], pct: float) -> float:
+    """Linear-interpolated percentile of a list of samples"""
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    rank = (len(ordered) - 1) * pct / 100.0
+    low = int(rank)
+    high = min(low + 1, len(ordered) - 1)
+    return ordered[low] + (ordered[high] - ordered[low]) * (rank - low)
+
+
+def summarize(samples: List[float], errors: int = 0) -> Dict[str, Any]:
+    """Stats in milliseconds"""
+    ms = [s * 1000.0 for s in samples]
+    return {
+        'n': len(ms),
+        'errors': errors,
+        'mean': round(sum(ms) / len(ms), 4) if ms else 0.0,
+        'min': round(min(ms), 4) if ms else 0.0,
+        'max': round(max(ms), 4) if ms else 0.0,
+        'p50': round(percentile(ms, 50), 4),
+        'p95': round(percentile(ms, 95), 4),
+        'p99': round(percentile(ms, 99), 4),
+    }
+
+
+class NullSink(LogSink):
+    """Discards records; isolates logger overhead from terminal speed"""
+
+    def emit(self, records):
+        pass
+
+
+class W3CSession:
+    """Minimal W3C WebDriver client over the pooled HTTP client"""
+
+    def __init__(self, appium_url: str, key: SessionKey, session_id: Optional[str] = None):
+        self.client = get_client(appium_url)
+        if session_id:
+            # Attach to an existing session (e.g. the WDA session Appium opened)
+            self.session_id = session_id
+            return
+        response = self.client.post("/session", json={"capabilities": {"alwaysMatch": {
+            "platformName": "iOS",
+            "appium:automationName": "XCUITest",
+            "appium:udid": key.udid,
+            "appium:webDriverAgentUrl": key.wda_url,
+            "appium:bundleId": key.bundle_id,
+        }}})
+        response.raise_for_status()
+        self.session_id = response.json()["value"]["sessionId"]
+
+    def _call(self, method: str, path: str, payload: Optional[Dict[str, Any]] = None):
+        response = self.client.request(method, f"/session/{self.session_id}{path}", json=payload)
+        response.raise_for_status()
+        return response.json().get("value")
+
+    def activate_app(self, bundle_id: str):
+        self._call("POST", "/appium/device/activate_app", {"bundleId": bundle_id})
+
+    def terminate_app(self, bundle_id: str):
+        self._call("POST", "/appium/device/terminate_app", {"bundleId": bundle_id})
+
+    def find_element(self, using: str, value: str) -> str:
+        return self._call("POST", "/element", {"using": using, "value": value})[ELEMENT_KEY]
+
+    def click(self, element_id: str):
+        self._call("POST", f"/element/{element_id}/click", {})
+
+    def perform_actions(self, payload: Dict[str, Any]):
+        self._call("POST", "/actions", payload)
+
+    def quit(self):
+        self._call("DELETE", "")
+
+
+class BenchContext:
+    """Servers and shared objects available to every benchmark"""
+
+    def __init__(self, appium: FakeServer, wda: FakeServer, workdir: Path,
+                 proxied_appium: Optional[FakeServer] = None):
+        self.appium = appium
+        self.wda = wda
+        # Appium that opens a WDA session and pays the WDA latency again on every command
+        self.proxied_appium = proxied_appium
+        self._loop_sessions: Dict[str, W3CSession] = {}
+        self.gestures = GestureEngine(seed=0, screen=(390, 844))
+        self.workdir = workdir
+        self.key = SessionKey("FAKE-UDID-0001", "com.apple.Preferences", wda.url)
+        self.env = {
+            "APPIUM_URL": appium.url,
+            "WDA_URL": wda.url,
+            "IOS_UDID": self.key.udid,
+            "BUNDLE_ID": self.key.bundle_id,
+        }
+        self.env_file = workdir / ".env"
+        lines = [f"{k}={v}" for k, v in self.env.items()]
+        lines += ["# padding"] + [f"EXTRA_{i}='value {i}'" for i in range(40)]
+        self.env_file.write_text("\n".join(lines), encoding="utf-8")
+        self.null_backend = LogBackend(sinks=[NullSink()])
+        self.session_pool = SessionPool(appium.url, factory=lambda k: W3CSession(appium.url, k),
+                                        max_per_key=1, reset=lambda d, k: d.activate_app(k.bundle_id))
+        # Scripts lease from daemon.py serve over HTTP, so the benchmark goes through a broker too
+        self.session_broker = SessionBroker(self.session_pool, port=0, ping=lambda d: None).start()
+
+    def loop_session(self, route: str) -> W3CSession:
+        """Long-lived session for the action-loop benchmarks: via Appium, or straight to its WDA session"""
+        if route not in self._loop_sessions:
+            appium = self._loop_sessions.get('appium') or W3CSession(self.proxied_appium.url, self.key)
+            self._loop_sessions['appium'] = appium
+            if route == 'wda':
+                session_id = get_client(self.wda.url).get("/status").json()["sessionId"]
+                self._loop_sessions['wda'] = W3CSession(self.wda.url, self.key, session_id=session_id)
+        return self._loop_sessions[route]
+
+
+# ---- benchmarks (one call = one iteration) ----
+
+def bench_load_env(ctx: BenchContext):
+    load_env(ctx.env_file)
+
+
+def bench_logger_throughput(ctx: BenchContext):
+    """1000 records through the queued logger, including the final flush"""
+    logger = AppiumLogger("Bench", enable_debug=False, backend=ctx.null_backend)
+    for i in range(1000):
+        logger.info("Benchmark message", {'i': i, 'step': 'tap'})
+        logger.log_element_search("predicate", "label == 'General'", True)
+    ctx.null_backend.flush()
+
+
+def bench_test_connection(ctx: BenchContext):
+    from e2eios.scripts.test_connection import test_connection
+    if not test_connection(dict(ctx.env)):
+        raise RuntimeError("test_connection failed")
+
+
+def bench_status_probe_cycle(ctx: BenchContext):
+    """Same probe set as one control panel monitor tick"""
+    snapshot = get_probe_engine().run([
+        http_status_probe("appium", ctx.appium.url, timeout=5),
+        url_port_probe("wda", ctx.wda.url, timeout=2),
+        Probe("device", lambda t: (True, [ctx.key.udid]), timeout=30),
+    ])
+    if not snapshot.ok:
+        raise RuntimeError("probe cycle failed")
+
+
+def _settings_flow(driver, key: SessionKey):
+    driver.activate_app(key.bundle_id)
+    element = driver.find_element("-ios predicate string", 'label == "Generali" OR label == "General"')
+    driver.click(element)
+
+
+def bench_session_flow(ctx: BenchContext):
+    """open_settings-style flow with a fresh session every time"""
+    driver = W3CSession(ctx.appium.url, ctx.key)
+    try:
+        _settings_flow(driver, ctx.key)
+    finally:
+        driver.quit()
+
+
+def bench_session_flow_pooled(ctx: BenchContext):
+    """Same flow with a warm session leased from the session broker, as open_settings.py does"""
+    with lease_session(ctx.key, ctx.appium.url, ctx.session_broker.url,
+                       attach=lambda url, session_id, key: W3CSession(url, key, session_id=session_id)) as driver:
+        _settings_flow(driver, ctx.key)
+
+
+def _action_loop(driver: W3CSession, steps: int = 10):
+    for _ in range(steps):
+        element = driver.find_element("accessibility id", "General")
+        driver.click(element)
+
+
+def bench_action_loop_appium(ctx: BenchContext):
+    """10 find+tap pairs through Appium (which forwards each one to WDA)"""
+    _action_loop(ctx.loop_session('appium'))
+
+
+def bench_action_loop_wda_direct(ctx: BenchContext):
+    """Same loop sent straight to WDA, as WdaDirect does for hot commands"""
+    _action_loop(ctx.loop_session('wda'))
+
+
+def bench_gesture_swipe(ctx: BenchContext):
+    """Generate a 2000-point human-like swipe and send it to WDA as one W3C Actions request"""
+    gesture = ctx.gestures.swipe((200, 700), (190, 150), duration=1.0, samples=2000)
+    ctx.loop_session('wda').perform_actions(gesture.to_actions())
+
+
+BENCHMARKS: Dict[str, Callable[[BenchContext], None]] = {
+    'load_env': bench_load_env,
+    'logger_throughput_1k': bench_logger_throughput,
+    'test_connection': bench_test_connection,
+    'status_probe_cycle': bench_status_probe_cycle,
+    'session_flow': bench_session_flow,
+    'session_flow_pooled': bench_session_flow_pooled,
+    'action_loop_appium': bench_action_loop_appium,
+    'action_loop_wda_direct': bench_action_loop_wda_direct,
+    'gesture_swipe': bench_gesture_swipe,
+}
+
+
+def run_suite(iterations: int = 50, warmup: int = 3, latency: float = 0.002,
+              session_latency: float = 0.05, jitter: float = 0.0, failure_rate: float = 0.0,
+              only: Optional[List[str]] = None, seed: int = 0) -> Dict[str, Any]:
+    """Run the selected benchmarks and return the JSON-serializable report"""
+    names = only or list(BENCHMARKS)
+    results: Dict[str, Any] = {}
+    configure_logging(console=False)
+    try:
+        with FakeServer(kind="appium", latency=latency, session_latency=session_latency,
+                        jitter=jitter, failure_rate=failure_rate, seed=seed) as appium, \
+                FakeServer(kind="wda", latency=latency, jitter=jitter,
+                           failure_rate=failure_rate, seed=seed + 1) as wda, \
+                FakeServer(kind="appium", latency=latency, session_latency=session_latency, jitter=jitter,
+                           failure_rate=failure_rate, seed=seed + 2, backend=wda.config) as proxied_appium, \
+                tempfile.TemporaryDirectory() as tmp:
+            ctx = BenchContext(appium, wda, Path(tmp), proxied_appium)
+            for name in names:
+                func = BENCHMARKS[name]
+                samples, errors = [], 0
+                for i in range(warmup + iterations):
+                    start = time.perf_counter()
+                    try:
+                        func(ctx)
+                    except Exception:
+                        errors += 1
+                        continue
+                    if i >= warmup:
+                        samples.append(time.perf_counter() - start)
+                results[name] = summarize(samples, errors)
+            if 'session_flow_pooled' in results:
+                results['session_flow_pooled']['pool'] = ctx.session_pool.stats()
+            ctx.session_broker.stop()
+            ctx.session_pool.close()
+    finally:
+        configure_logging()
+
+    return {
+        'meta': {
+            'timestamp': time.strftime("%Y-%m-%dT%H:%M:%S"),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'iterations': iterations,
+            'warmup': warmup,
+            'latency': latency,
+            'session_latency': session_latency,
+            'jitter': jitter,
+            'failure_rate': failure_rate,
+            'unit': 'ms',
+        },
+        'benchmarks': results,
+    }
+
+
+def compare(baseline: Dict[str, Any], current: Dict[str, Any], threshold: float = 0.10,
+            metrics: tuple = ('p50', 'p95')) -> List[Dict[str, Any]]:
+    """Per-benchmark ratios; more errors, no samples, or a metric that grew by more than threshold is a regression"""
+    rows = []
+    base, cur = baseline.get('benchmarks', {}), current.get('benchmarks', {})
+    for name in sorted(set(base) & set(cur)):
+        before_errors, after_errors = base[name].get('errors', 0), cur[name].get('errors', 0)
+        sampled = base[name].get('n', 0) > 0 and cur[name].get('n', 0) > 0
+        if after_errors > before_errors or not cur[name].get('n', 0):
+            # A benchmark that fails every iteration has p50 = 0, which must not read as a speedup
+            rows.append({
+                'benchmark': name,
+                'metric': 'errors',
+                'baseline': before_errors,
+                'current': after_errors,
+                'ratio': None,
+                'regression': True,
+            })
+        if not sampled:
+            continue
+        for metric in metrics:
+            before, after = base[name].get(metric, 0.0), cur[name].get(metric, 0.0)
+            ratio = after / before if before else (1.0 if not after else float('inf'))
+            rows.append({
+                'benchmark': name,
+                'metric': metric,
+                'baseline': before,
+                'current': after,
+                'ratio': round(ratio, 3),
+                'regression': ratio > 1.0 + threshold,
+            })
+    return rows
@@ -0,0 +1,126 @@
+#!/usr/bin/env python3
+"""
+Artifact Store CLI
+Lists, reads and stores run artifacts (screenshots, page sources, logs),
+sweeps old timestamped service logs into the store, and applies retention
+"""
+
+import argparse
+import json
+import sys
+from pathlib import Path
+
+# Add project root to path
+ROOT = Path(__file__).resolve().parents[2]
+sys.path.insert(0, str(ROOT))
+
+from e2eios.utils.artifacts import ARTIFACT_DIR, ArtifactStore
+from e2eios.utils.env import load_env
+from e2eios.utils.logger import get_logger
+
+
+def _size(n: int) -> str:
+    for unit in ("B", "KB", "MB", "GB"):
+        if n < 1024 or unit == "GB":
+            return f"{n:.0f} {unit}" if unit == "B" else f"{n:.1f} {unit}"
+        n /= 1024
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Content-addressed store for run artifacts")
+    parser.add_argument("command", choices=["stats", "runs", "ls", "cat", "export", "put", "import-logs", "gc"],
+                        help="cat/export: artifact id or blob sha; import-logs: move old service logs into the store")
+    parser.add_argument("target", nargs="?", help="cat/export: artifact id or sha; put: file to store")
+    parser.add_argument("dest", nargs="?", type=Path, help="export: destination file")
+    parser.add_argument("--run", help="ls/put: run id")
+    parser.add_argument("--step", help="ls/put: step (e.g. screen name)")
+    parser.add_argument("--kind", help="ls/put: screenshot, source, log, ...")
+    parser.add_argument("--log-dir", type=Path, default=ROOT / "logs")
+    parser.add_argument("--older-than", type=float, default=60,
+                        help="import-logs: only logs unchanged for this many minutes")
+    parser.add_argument("--delete", action="store_true", help="import-logs: delete the originals once stored")
+    parser.add_argument("--keep-runs", type=int, default=None, help="gc: keep only the newest N runs")
+    parser.add_argument("--older-than-days", type=float, default=None, help="gc: drop runs older than this")
+    parser.add_argument("--dry-run", action="store_true", help="gc: report without deleting")
+    parser.add_argument("--dir", type=Path, default=None, help="Store directory (default: ARTIFACT_DIR or artifacts/)")
+    parser.add_argument("--json", action="store_true", help="Print results as JSON")
+    args = parser.parse_args(argv)
+
+    logger = get_logger("Artifacts")
+    env = load_env(ROOT / "e2eios" / "config" / ".env")
+    directory = args.dir or (ROOT / env["ARTIFACT_DIR"] if env.get("ARTIFACT_DIR") else ARTIFACT_DIR)
+
+    with ArtifactStore(directory) as store:
+        if args.command == "stats":
+            stats = store.stats()
+            if args.json:
+                print(json.dumps(stats, indent=2))
+            else:
+                logger.info(f"{stats['artifacts']} artifacts in {stats['runs']} runs: "
+                            f"{_size(stats['logical_bytes'])} written, {_size(stats['stored_bytes'])} on disk "
+                            f"({stats['saving']:.0%} saved)")
+            return 0
+
+        if args.command == "runs":
+            runs = store.runs()
+            if args.json:
+                print(json.dumps(runs, indent=2))
+            for run in [] if args.json else runs:
+                print(f"{run['run']:<40} {run['artifacts']:>6} artifacts  {_size(run['bytes'] or 0):>10}")
+            return 0
+
+        if args.command == "ls":
+            artifacts = store.find(run=args.run, step=args.step, kind=args.kind)
+            for artifact in artifacts:
+                if args.json:
+                    print(json.dumps(artifact.to_dict()))
+                else:
+                    print(f"{artifact.id:>6}  {artifact.run}  {artifact.step}  {artifact.kind}  {artifact.name}  "
+                          f"{_size(artifact.size)}  {artifact.sha[:12]}")
+            return 0
+
+        if args.command in ("cat", "export"):
+            if not args.target:
+                parser.error(f"{args.command} needs an artifact id or sha")
+            if args.command == "export" and args.dest is None:
+                parser.error("export needs a destination file")
+            try:
+                ref = store.get(int(args.target)) if args.target.isdigit() else args.target
+                if args.command == "export":
+                    logger.success(f"Exported to {store.export(ref, args.dest)}")
+                    return 0
+                for chunk in store.iter_chunks(ref):
+                    sys.stdout.buffer.write(chunk)
+            except KeyError as e:
+                logger.error(str(e.args[0]))
+                return 1
+            sys.stdout.buffer.flush()
+            return 0
+
+        if args.command == "put":
+            if not args.target or not (args.run and args.step and args.kind):
+                parser.error("put needs a file plus --run, --step and --kind")
+            artifact = store.put(Path(args.target), args.run, args.step, args.kind)
+            print(json.dumps(artifact.to_dict()) if args.json else f"{artifact.id} {artifact.sha}")
+            return 0
+
+        if args.command == "import-logs":
+            stored = store.import_logs(args.log_dir, older_than=args.older_than * 60, delete=args.delete)
+            logger.success(f"Stored {len(stored)} log file(s) from {args.log_dir}",
+                           {'deleted': args.delete, 'runs': len({a.run for a in stored})})
+            return 0
+
+        if args.keep_runs is None and args.older_than_days is None:
+            parser.error("gc needs --keep-runs and/or --older-than-days")
+        report = store.gc(args.keep_runs, args.older_than_days, dry_run=args.dry_run)
+        if args.json:
+            print(json.dumps(report.to_dict(), indent=2))
+        else:
+            verb = "Would remove" if report.dry_run else "Removed"
+            logger.info(f"{verb} {len(report.runs)} run(s), {report.artifacts} artifact(s), {report.blobs} blob(s), "
+                        f"{_size(report.bytes_freed)}")
+        return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
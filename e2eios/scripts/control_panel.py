@@ -4,14 +4,14 @@ Control Panel - Simple iOS Automation Manager
 Simplified control panel for the boilerplate project
 """
 
+import time
+_START = time.perf_counter()
+
 import tkinter as tk
 from tkinter import ttk, messagebox
-import subprocess
+import argparse
 import threading
-import time
-import requests
-import socket
-import json
+import queue
 from pathlib import Path
 import sys
 import os
@@ -20,31 +20,106 @@ import os
 ROOT = Path(__file__).resolve().parents[2]
 sys.path.insert(0, str(ROOT))
 
+# Only the light env loader is imported up front; the engine (requests, asyncio,
+# go-ios) is imported after the window is painted
 from e2eios.utils.env import load_env
 
+ENV_FILE = ROOT / "e2eios" / "config" / ".env"
+
+
+class StartupProfile:
+    """Startup milestones for --profile-startup (seconds since process start)"""
+    
+    # Report once these milestones have both happened (they race each other)
+    FINAL = ("first device scan", "first status")
+    
+    def __init__(self, start=_START):
+        self.start = start
+        self.marks = []
+        self.reported = False
+        self.lock = threading.Lock()
+    
+    def mark(self, name):
+        """Record a milestone; returns True exactly once, when the report is complete"""
+        with self.lock:
+            if name not in (m for m, _ in self.marks):
+                self.marks.append((name, time.perf_counter() - self.start))
+            done = {m for m, _ in self.marks}.issuperset(self.FINAL)
+            if done and not self.reported:
+                self.reported = True
+                return True
+            return False
+    
+    def lines(self):
+        with self.lock:
+            marks = sorted(self.marks, key=lambda m: m[1])
+        lines, previous = [], 0.0
+        for name, at in marks:
+            lines.append(f"{name:<22} t+{at * 1000:7.1f} ms  (+{(at - previous) * 1000:6.1f} ms)")
+            previous = at
+        return lines
+
+
 class ControlPanel:
-    def __init__(self):
+    def __init__(self, engine=None, profile=None):
+        self.profile = profile
+        self.mark("imports")
+        
         self.root = tk.Tk()
         self.root.title("📱 iOS Automation Control Panel")
         self.root.geometry("700x500")
         self.root.configure(bg='#f5f5f5')
         
-        # Load configuration
-        self.env = load_env(ROOT / "e2eios" / "config" / ".env")
-        self.appium_url = self.env.get("APPIUM_URL", "http://127.0.0.1:4723")
-        self.wda_url = self.env.get("WDA_URL", "http://127.0.0.1:8200")
-        self.udid = self.env.get("IOS_UDID", "")
-        self.go_ios_path = self.env.get("GO_IOS_EXE", "C:\\tools\\go-ios\\ios.exe")
+        # Status, devices and services live in the headless engine; the panel only renders them
+        self.engine = engine
+        self.env = engine.env if engine else load_env(ENV_FILE)
         
-        # Status variables
-        self.is_connected = False
-        self.services_running = False
+        # Console sink: worker threads enqueue, a single Tk after() pump drains
+        self.log_queue = queue.Queue()
+        self.console_max_lines = int(self.env.get("CONSOLE_MAX_LINES", "2000"))
+        self.console_batch = int(self.env.get("CONSOLE_BATCH", "200"))
+        self.console_interval_ms = 100
+        
+        # Latest monitor snapshot, applied to the labels by the Tk pump
+        self.pending_status = None
         
         # Setup UI
         self.setup_ui()
+        self.mark("ui built")
         
-        # Start status monitoring
-        self.start_status_monitor()
+        # Paint first; engine import, device scan and status monitor follow in the background
+        self.root.after_idle(self.start_engine)
+    
+    def mark(self, name):
+        if self.profile is not None and self.profile.mark(name):
+            report = self.profile.lines()
+            print("Startup profile:\n  " + "\n  ".join(report))
+            for line in report:
+                self.log_console(f"⏱️ {line}")
+    
+    def start_engine(self):
+        """Runs once the window is up: create and start the engine off the Tk thread"""
+        self.root.update_idletasks()
+        self.mark("window painted")
+        threading.Thread(target=self._start_engine, name="engine-startup", daemon=True).start()
+    
+    def _start_engine(self):
+        try:
+            if self.engine is None:
+                from e2eios.utils.engine import ControlEngine
+                self.mark("engine imported")
+                self.engine = ControlEngine(self.env)
+                self.mark("engine created")
+            self.engine.on_log(self.log_console)
+            self.engine.on_status(self.on_status)
+            
+            # Start device stream, metrics and status monitoring
+            self.engine.start()
+            # First scan shares the inventory's seed `ios list` instead of forcing another one
+            self.refresh_devices(refresh=False, background=False)
+            self.mark("first device scan")
+        except Exception as e:
+            self.log_console(f"💥 Engine startup failed: {e}", "error")
     
     def setup_ui(self):
         """Setup user interface"""
@@ -114,7 +189,12 @@ class ControlPanel:
         # Clear console button
         self.clear_btn = ttk.Button(control_frame, text="🧹 Clear Console", 
                                    command=self.clear_console, width=15)
-        self.clear_btn.grid(row=0, column=4)
+        self.clear_btn.grid(row=0, column=4, padx=(0, 5))
+        
+        # Follow go-ios/WDA log files button
+        self.logs_btn = ttk.Button(control_frame, text="📜 Live Logs", 
+                                  command=self.toggle_log_watch, width=13)
+        self.logs_btn.grid(row=0, column=5)
         
         # Console output
         console_frame = ttk.LabelFrame(main_frame, text="Console Output", padding="10")
@@ -134,7 +214,7 @@ class ControlPanel:
         scrollbar = ttk.Scrollbar(text_frame, orient=tk.VERTICAL, command=self.console_text.yview)
         self.console_text.configure(yscrollcommand=scrollbar.set)
         
-        # Configure color tags for different message types
+        # Configure color tags for different log levels
         self.console_text.tag_config("info", foreground="#ffffff")      # White for info
         self.console_text.tag_config("success", foreground="#4ade80")   # Green for success
         self.console_text.tag_config("warning", foreground="#fbbf24")   # Yellow for warnings
@@ -153,283 +233,136 @@ class ControlPanel:
         # Keyboard shortcuts
         self.root.bind('<Control-l>', lambda e: self.clear_console())  # Ctrl+L to clear
         self.root.bind('<F5>', lambda e: self.refresh_devices())       # F5 to refresh
+        self.root.bind('<F6>', lambda e: self.toggle_log_watch())      # F6 to follow service logs
         
-        # Initial status check
+        self.drain_console()
+        
+        # Initial status check runs once the engine is up (see start_engine)
         self.log_console("🚀 iOS Automation Control Panel initialized")
-        self.log_console("💡 Tip: Use Ctrl+L to clear console, F5 to refresh devices")
-        self.refresh_devices()
+        self.log_console("💡 Tip: Use Ctrl+L to clear console, F5 to refresh devices, F6 for live service logs")
     
     def update_udid_display(self):
-        """Update UDID display with current device info"""
+        """Update UDID display with current device info (never scans; the refresh thread does)"""
         if self.udid:
             # Show current UDID from config
             self.udid_var.set(self.udid)
         else:
-            # Try to detect devices
-            devices = self.list_devices()
-            if devices:
-                detected_udid = devices[0] if devices[0] else "Unknown"
-                self.udid_var.set(f"{detected_udid}")
-            else:
-                self.udid_var.set("Not configured")
+            self.udid_var.set("Detecting...")
     
     def clear_console(self):
         """Clear the console output"""
         self.console_text.delete(1.0, tk.END)
         self.log_console("Console cleared")
     
-    def log_console(self, message, msg_type="info"):
-        """Log message to console with color coding"""
-        timestamp = time.strftime("%H:%M:%S")
-        
-        # Insert timestamp with gray color
-        self.console_text.insert(tk.END, f"[{timestamp}] ", "timestamp")
-        
-        # Determine message type and color
-        if "✅" in message or "successful" in message.lower() or "ok" in message.lower():
-            msg_type = "success"
-        elif "❌" in message or "error" in message.lower() or "failed" in message.lower():
-            msg_type = "error"
-        elif "⚠️" in message or "warning" in message.lower() or "timeout" in message.lower():
-            msg_type = "warning"
-        
-        # Insert message with appropriate color
-        self.console_text.insert(tk.END, f"{message}\n", msg_type)
-        self.console_text.see(tk.END)  # Auto-scroll to bottom
-        self.root.update_idletasks()
+    def log_console(self, message, level="info"):
+        """Queue a console message; safe to call from any thread"""
+        self.log_queue.put((time.strftime("%H:%M:%S"), message, level))
     
-    def run_go_ios_command(self, args, timeout=30):
-        """Run go-ios command and return result"""
+    def drain_console(self):
+        """Tk after() pump: insert queued messages in one batch and trim the buffer"""
+        batch = []
         try:
-            result = subprocess.run([self.go_ios_path] + args, 
-                                  capture_output=True, text=True, timeout=timeout)
-            return result.returncode == 0, result.stdout, result.stderr
-        except Exception as e:
-            return False, "", str(e)
+            while len(batch) < self.console_batch:
+                batch.append(self.log_queue.get_nowait())
+        except queue.Empty:
+            pass
+        
+        if batch:
+            for timestamp, message, level in batch:
+                self.console_text.insert(tk.END, f"[{timestamp}] ", "timestamp")
+                self.console_text.insert(tk.END, f"{message}\n", level)
+            
+            # Bounded ring buffer: drop the oldest lines beyond the cap
+            lines = int(self.console_text.index('end-1c').split('.')[0]) - 1
+            if lines > self.console_max_lines:
+                self.console_text.delete('1.0', f"{lines - self.console_max_lines + 1}.0")
+            self.console_text.see(tk.END)  # Auto-scroll to bottom
+        
+        snapshot, self.pending_status = self.pending_status, None
+        if snapshot is not None:
+            self.update_status_display(snapshot)
+        
+        # Drain again immediately while there is a backlog
+        delay = 10 if not self.log_queue.empty() else self.console_interval_ms
+        self.root.after(delay, self.drain_console)
     
-    def list_devices(self):
-        """List connected iOS devices"""
-        success, stdout, stderr = self.run_go_ios_command(["list"])
-        if success and stdout.strip():
-            try:
-                # Parse JSON response from go-ios list command
-                # Extract JSON from stdout (may contain warning messages before JSON)
-                lines = stdout.strip().split('\n')
-                json_line = None
-                for line in lines:
-                    if line.strip().startswith('{"deviceList"'):
-                        json_line = line.strip()
-                        break
-                
-                if json_line:
-                    data = json.loads(json_line)
-                    return data.get("deviceList", [])
-                else:
-                    # Fallback to old parsing for compatibility
-                    devices = [line.strip() for line in lines if line.strip() and not line.startswith('{"level":')]
-                    return devices
-            except json.JSONDecodeError:
-                # Fallback to old parsing
-                devices = [line.strip() for line in stdout.strip().split('\n') if line.strip()]
-                return devices
-        return []
+    @property
+    def udid(self):
+        return self.engine.udid if self.engine else self.env.get("IOS_UDID", "")
     
-    def check_service_status(self, url, service_name):
-        """Check if a service is running"""
-        try:
-            response = requests.get(f"{url}/status", timeout=5)
-            return response.status_code == 200
-        except Exception:
-            return False
+    def list_devices(self, refresh=False):
+        """List connected iOS devices from the in-memory inventory"""
+        return self.engine.list_devices(refresh=refresh) if self.engine else []
     
-    def check_port_open(self, port):
-        """Check if a port is open"""
-        try:
-            sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
-            sock.settimeout(2)
-            result = sock.connect_ex(('127.0.0.1', int(port)))
-            sock.close()
-            return result == 0
-        except Exception:
-            return False
+    def run_engine_action(self, action, *args):
+        """Run an engine method on a worker thread so the UI never blocks"""
+        if self.engine is None:
+            self.log_console("⏳ Still starting up, try again in a moment", "warning")
+            return
+        threading.Thread(target=getattr(self.engine, action), args=args, daemon=True).start()
+    
+    def on_status(self, snapshot):
+        """Engine callback (monitor thread): hand the snapshot to the Tk pump"""
+        self.pending_status = snapshot
+        self.mark("first status")
     
-    def update_status_display(self):
+    def update_status_display(self, snapshot):
         """Update status indicators"""
         # Check Appium
-        appium_running = self.check_service_status(self.appium_url, "Appium")
-        if appium_running:
+        if snapshot["appium"].ok:
             self.appium_status.config(text="✅ Connected", fg="green")
         else:
             self.appium_status.config(text="❌ Disconnected", fg="red")
         
-        # Check WDA (just port check since it might not have /status endpoint)
-        wda_port = self.wda_url.split(':')[-1]
-        wda_running = self.check_port_open(wda_port)
-        if wda_running:
+        # Check WDA
+        if snapshot["wda"].ok:
             self.wda_status.config(text="✅ Running", fg="green")
         else:
             self.wda_status.config(text="❌ Not Running", fg="red")
         
         # Check device connection
         if self.udid:
-            devices = self.list_devices()
-            device_connected = any(self.udid in device for device in devices)
-            if device_connected:
+            if self.engine.is_connected:
                 self.device_status.config(text="✅ Connected", fg="green")
-                self.is_connected = True
             else:
                 self.device_status.config(text="❌ Not Connected", fg="red")
-                self.is_connected = False
         else:
             self.device_status.config(text="⚠️ UDID Not Configured", fg="orange")
-            self.is_connected = False
-        
-        # Update services status
-        self.services_running = appium_running and wda_running
     
-    def start_status_monitor(self):
-        """Start periodic status monitoring"""
-        def monitor():
-            while True:
-                try:
-                    self.update_status_display()
-                    time.sleep(5)  # Check every 5 seconds
-                except Exception as e:
-                    print(f"Status monitor error: {e}")
-                    time.sleep(10)
-        
-        monitor_thread = threading.Thread(target=monitor, daemon=True)
-        monitor_thread.start()
-    
-    def refresh_devices(self):
+    def refresh_devices(self, refresh=True, background=True):
         """Refresh device list and update UDID display"""
-        def refresh():
-            self.log_console("Refreshing device list...")
-            devices = self.list_devices()
-            
+        if self.engine is None:
+            self.log_console("⏳ Still starting up, try again in a moment", "warning")
+            return
+        
+        def scan():
+            devices = self.engine.refresh_devices(refresh=refresh)
             if devices:
-                self.log_console(f"Found {len(devices)} device(s):")
-                for device in devices:
-                    self.log_console(f"  - {device}")
-                
-                # Update UDID display
-                self.update_udid_display()
-                
-                # Update UDID if not configured
-                if not self.udid and devices:
-                    first_device = devices[0] if devices[0] else ""
-                    if first_device:
-                        self.udid = first_device
-                        self.udid_var.set(first_device)
-                        self.log_console(f"Auto-detected device UDID: {first_device}")
+                self.udid_var.set(self.udid or devices[0])
             else:
-                self.log_console("No devices found. Make sure your iOS device is connected and trusted.")
                 self.udid_var.set("No devices found")
         
+        if not background:
+            scan()
+            return
         # Run in thread to avoid blocking UI
-        threading.Thread(target=refresh, daemon=True).start()
+        threading.Thread(target=scan, daemon=True).start()
     
     def start_services(self):
-        """Start required services using PowerShell script"""
-        def start():
-            self.log_console("Starting services...")
-            
-            if not self.udid:
-                self.log_console("❌ No device UDID configured!")
-                return
-            
-            # Run the PowerShell start script
-            start_script = ROOT / "tools" / "start.ps1"
-            
-            if not start_script.exists():
-                self.log_console("❌ Start script not found!")
-                return
-            
-            try:
-                self.log_console("Running start.ps1 script...")
-                result = subprocess.run([
-                    "powershell.exe", "-ExecutionPolicy", "Bypass", 
-                    "-File", str(start_script)
-                ], capture_output=True, text=True, timeout=120)
-                
-                if result.returncode == 0:
-                    self.log_console("✅ Services startup completed!")
-                    self.log_console("You can now run your automation scripts.")
-                else:
-                    self.log_console("❌ Service startup failed!")
-                    if result.stderr:
-                        self.log_console(f"Error: {result.stderr[:200]}...")
-                        
-            except subprocess.TimeoutExpired:
-                self.log_console("⚠️ Service startup timed out")
-            except Exception as e:
-                self.log_console(f"❌ Error starting services: {e}")
-        
-        # Run in thread
-        threading.Thread(target=start, daemon=True).start()
+        """Start DDI mount, forward and WDA through the engine"""
+        self.run_engine_action("start_services")
     
     def stop_services(self):
-        """Stop running services"""
-        def stop():
-            self.log_console("Stopping services...")
-            
-            try:
-                # Stop any running go-ios processes
-                subprocess.run(["taskkill", "/f", "/im", "ios.exe"], 
-                              capture_output=True, text=True)
-                self.log_console("✅ Stopped go-ios processes")
-                
-                # Note: Appium should be stopped manually if running
-                self.log_console("ℹ️ Please stop Appium server manually if running")
-                
-            except Exception as e:
-                self.log_console(f"⚠️ Error stopping services: {e}")
-        
-        # Run in thread
-        threading.Thread(target=stop, daemon=True).start()
+        """Stop the processes started by the engine"""
+        self.run_engine_action("stop_services")
     
     def test_connection(self):
         """Test connection to device and services"""
-        def test():
-            self.log_console("Testing connections...")
-            
-            # Test device connection
-            if self.is_connected:
-                self.log_console("✅ Device connected")
-                
-                # Try to get device info
-                success, stdout, stderr = self.run_go_ios_command(["info", "--udid", self.udid])
-                if success:
-                    self.log_console("✅ Device info retrieved successfully")
-                else:
-                    self.log_console("⚠️ Could not retrieve device info")
-            else:
-                self.log_console("❌ Device not connected")
-            
-            # Test Appium service
-            try:
-                response = requests.get(f"{self.appium_url}/status", timeout=5)
-                if response.status_code == 200:
-                    self.log_console("✅ Appium server responding")
-                else:
-                    self.log_console("❌ Appium server not responding")
-            except Exception:
-                self.log_console("❌ Cannot connect to Appium server")
-            
-            # Test WDA service
-            try:
-                response = requests.get(f"{self.wda_url}/status", timeout=5)
-                if response.status_code == 200:
-                    self.log_console("✅ WebDriverAgent responding")
-                else:
-                    self.log_console("❌ WebDriverAgent not responding")
-            except Exception:
-                self.log_console("❌ Cannot connect to WebDriverAgent")
-            
-            self.log_console("Connection test completed")
-        
-        # Run in thread
-        threading.Thread(target=test, daemon=True).start()
+        self.run_engine_action("test_connection")
+    
+    def toggle_log_watch(self):
+        """Show new warnings/errors from the go-ios/WDA log files in the console"""
+        self.run_engine_action("toggle_log_watch")
     
     def run(self):
         """Start the control panel"""
@@ -440,12 +373,19 @@ class ControlPanel:
         except KeyboardInterrupt:
             self.log_console("👋 Control panel closed by user")
         except Exception as e:
-            self.log_console(f"💥 Error: {e}")
+            self.log_console(f"💥 Error: {e}", "error")
+        finally:
+            if self.engine is not None:
+                self.engine.close()
 
 
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="iOS Automation Control Panel")
+    parser.add_argument("--profile-startup", action="store_true",
+                        help="Report time spent in imports, UI construction and first status")
+    cli = parser.parse_args()
     try:
-        panel = ControlPanel()
+        panel = ControlPanel(profile=StartupProfile() if cli.profile_startup else None)
         panel.run()
     except Exception as e:
         print(f"Failed to start control panel: {e}")
@@ -0,0 +1,132 @@
+#!/usr/bin/env python3
+"""
+Control Daemon - Headless iOS Automation Manager
+Same engine as the control panel without Tk: prints status as JSON or
+streams it as JSON Lines, starts/stops/tests the services, and serves warm
+Appium sessions to scripts
+"""
+
+import argparse
+import json
+import sys
+import threading
+import time
+from pathlib import Path
+from urllib.parse import urlparse
+
+# Add project root to path
+ROOT = Path(__file__).resolve().parents[2]
+sys.path.insert(0, str(ROOT))
+
+from e2eios.utils.engine import ControlEngine
+from e2eios.utils.env import load_env
+
+
+_emit_lock = threading.Lock()
+
+
+def emit(kind, payload):
+    """Write one JSON line to stdout (monitor, inventory and main threads share it)"""
+    line = json.dumps({'type': kind, 'time': round(time.time(), 3), **payload}, default=str)
+    with _emit_lock:
+        sys.stdout.write(line + "\n")
+        sys.stdout.flush()
+
+
+def serve_sessions(quiet: bool = False) -> int:
+    """Host the session pool until Ctrl+C; open_settings.py and friends lease from it"""
+    from e2eios.utils.session_pool import DEFAULT_BROKER_URL, SessionBroker, SessionKey, SessionPool
+
+    env = load_env(ROOT / "e2eios" / "config" / ".env")
+    broker_url = urlparse(env.get("SESSION_BROKER", DEFAULT_BROKER_URL))
+    appium_url = env.get("APPIUM_URL", "http://127.0.0.1:4723")
+    key = SessionKey(env["IOS_UDID"], env.get("BUNDLE_ID", "com.apple.Preferences"),
+                     env.get("WDA_URL", "http://127.0.0.1:8200"))
+    pool = SessionPool(appium_url)
+    broker = SessionBroker(pool, broker_url.hostname or "127.0.0.1", broker_url.port or 4731).start()
+    broker.warm(key, int(env.get("SESSION_POOL_SIZE", "1")))
+    if not quiet:
+        emit('log', {'level': 'info', 'message': f"Serving Appium sessions for {key.udid} on {broker.url}"})
+    try:
+        while True:
+            time.sleep(60)
+            if not quiet:
+                emit('sessions', broker.stats())
+    except KeyboardInterrupt:
+        pass
+    finally:
+        broker.stop()
+        pool.close()
+    return 0
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Headless control panel: JSON status and service control")
+    parser.add_argument("command", choices=["status", "watch", "start", "stop", "test", "devices", "serve"],
+                        help="status: one probe round; watch: stream status/events as JSON Lines; "
+                             "serve: keep Appium sessions warm and lease them to scripts")
+    parser.add_argument("--interval", type=float, default=None, help="watch: first interval of each probe (adapts from there)")
+    parser.add_argument("--count", type=int, default=0, help="watch: stop after N rounds (0 = forever)")
+    parser.add_argument("--quiet", action="store_true", help="Do not print engine messages")
+    args = parser.parse_args(argv)
+
+    if args.command == "serve":
+        return serve_sessions(args.quiet)
+
+    engine = ControlEngine()
+    if args.interval:
+        engine.monitor_interval = args.interval
+
+    if args.command == "watch":
+        # Everything goes to stdout as typed JSON lines
+        if not args.quiet:
+            engine.on_log(lambda message, level: emit('log', {'level': level, 'message': message}))
+        engine.inventory.subscribe(lambda devices, added, removed: emit(
+            'devices', {'devices': devices, 'added': sorted(added), 'removed': sorted(removed)}))
+        rounds = threading.Semaphore(0)
+
+        def on_status(snapshot):
+            emit('status', engine.status(snapshot))
+            rounds.release()
+
+        engine.on_status(on_status)
+        engine.start()
+        try:
+            seen = 0
+            while not args.count or seen < args.count:
+                rounds.acquire()
+                seen += 1
+        except KeyboardInterrupt:
+            pass
+        finally:
+            engine.close()
+        return 0
+
+    # One-shot commands: messages on stderr, result JSON on stdout
+    if not args.quiet:
+        engine.on_log(lambda message, level: print(f"[{time.strftime('%H:%M:%S')}] {message}", file=sys.stderr))
+    try:
+        if args.command == "status":
+            result = engine.status()
+            ok = result['ok']
+        elif args.command == "devices":
+            devices = engine.list_devices(refresh=True)
+            result, ok = {'devices': devices}, True
+        elif args.command == "start":
+            report = engine.start_services()
+            result = report.to_dict() if report else {'ok': False}
+            ok = result['ok']
+        elif args.command == "stop":
+            result, ok = {'stopped': engine.stop_services()}, True
+        else:
+            engine.check_status()
+            snapshot = engine.test_connection()
+            result, ok = snapshot.to_dict(), snapshot.ok
+    finally:
+        engine.close()
+    print(json.dumps(result, indent=2, default=str))
+    return 0 if ok else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
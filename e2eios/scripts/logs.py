@@ -0,0 +1,78 @@
+#!/usr/bin/env python3
+"""
+Service Log CLI
+Warnings/errors from the go-ios and WebDriverAgent log files in logs/,
+answered from the on-disk index, plus a live follow mode
+"""
+
+import argparse
+import json
+import sys
+import time
+from pathlib import Path
+
+# Add project root to path
+ROOT = Path(__file__).resolve().parents[2]
+sys.path.insert(0, str(ROOT))
+
+from e2eios.utils.log_reader import LogWatcher, ServiceLogs
+from e2eios.utils.logger import get_logger
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Query or follow warnings/errors in the service log files")
+    parser.add_argument("command", choices=["errors", "warnings", "follow", "tail", "index"],
+                        help="errors/warnings: last N minutes; follow: stream new lines; "
+                             "tail: last lines of one file; index: (re)build the indexes")
+    parser.add_argument("name", nargs="?", help="tail: log file name")
+    parser.add_argument("--minutes", type=float, default=10, help="errors/warnings: look back this far")
+    parser.add_argument("--limit", type=int, default=50, help="Show at most this many (most recent) entries")
+    parser.add_argument("--lines", type=int, default=20, help="tail: number of lines")
+    parser.add_argument("--log-dir", type=Path, default=ROOT / "logs")
+    parser.add_argument("--json", action="store_true", help="Print entries as JSON (one per line)")
+    args = parser.parse_args(argv)
+
+    logger = get_logger("Logs")
+    logs = ServiceLogs(args.log_dir)
+
+    def show(entry):
+        if args.json:
+            print(json.dumps(entry.to_dict(), ensure_ascii=False), flush=True)
+        else:
+            getattr(logger, entry.level)(entry.format())
+
+    if args.command == "index":
+        start = time.perf_counter()
+        logs.update(collect=False)
+        files = logs.files()
+        logger.info(f"Indexed {len(files)} file(s) in {time.perf_counter() - start:.2f}s",
+                    {f.path.name: f.count for f in files})
+        return 0
+
+    if args.command == "tail":
+        if not args.name:
+            parser.error("tail needs a log file name")
+        for line in logs.tail(args.name, args.lines):
+            print(line)
+        return 0
+
+    if args.command == "follow":
+        watcher = LogWatcher(logs, show).start()
+        try:
+            while True:
+                time.sleep(1)
+        except KeyboardInterrupt:
+            watcher.stop()
+        return 0
+
+    query = logs.errors if args.command == "errors" else logs.warnings
+    entries = query(args.minutes, limit=args.limit)
+    for entry in entries:
+        show(entry)
+    if not args.json and not entries:
+        logger.info(f"No {args.command} in the last {args.minutes:g} minutes")
+    return 1 if args.command == "errors" and entries else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,9 +1,14 @@
-from time import sleep
+import time
+from contextlib import nullcontext
 from pathlib import Path
-from appium import webdriver
-from appium.options.common import AppiumOptions
 from appium.webdriver.common.appiumby import AppiumBy
 from e2eios.utils.env import load_env
+from e2eios.utils.locator import LocalElement, LocatorEngine
+from e2eios.utils.logger import get_logger
+from e2eios.utils.session_pool import DEFAULT_BROKER_URL, SessionKey, lease_session
+from e2eios.utils.tracing import DriverTracer
+from e2eios.utils.waits import located, wait_until, wait_stats
+from e2eios.utils.wda_direct import WdaDirect
 
 ROOT = Path(__file__).resolve().parents[2]
 ENV = load_env(ROOT / "e2eios" / "config" / ".env")
@@ -12,27 +17,98 @@ APPIUM_URL = ENV.get("APPIUM_URL", "http://127.0.0.1:4723")
 WDA_URL    = ENV.get("WDA_URL", "http://127.0.0.1:8200")
 UDID       = ENV["IOS_UDID"]
 BUNDLE_ID  = ENV.get("BUNDLE_ID", "com.apple.Preferences")  
+TRACE_DIR  = ENV.get("TRACE_DIR")  # set to write a Chrome trace + summary per run
+WDA_DIRECT = ENV.get("WDA_DIRECT")  # e.g. 1 or find,click,gestures: send hot commands straight to WDA
+WAIT_TIMEOUT = float(ENV.get("WAIT_TIMEOUT", "10"))  # seconds to wait for an element to appear
+VISUAL_DIR = ENV.get("VISUAL_DIR")  # e.g. baselines: compare the General screen with a stored screenshot
+SESSION_BROKER = ENV.get("SESSION_BROKER", DEFAULT_BROKER_URL)  # daemon.py serve: warm session instead of a new one
+ARTIFACT_DIR = ENV.get("ARTIFACT_DIR")  # e.g. artifacts: keep each run's final screenshot + page source (deduplicated)
+LOGGER = get_logger("OpenSettings")
 
-opts = AppiumOptions()
-opts.set_capability("platformName", "iOS")
-opts.set_capability("appium:automationName", "XCUITest")
-opts.set_capability("appium:udid", UDID)
-opts.set_capability("appium:webDriverAgentUrl", WDA_URL)  # WDA ya levantado
-opts.set_capability("appium:bundleId", BUNDLE_ID)
-opts.set_capability("appium:noReset", True)
-opts.set_capability("appium:autoAcceptAlerts", True)
-opts.set_capability("appium:newCommandTimeout", 120)
-
-driver = webdriver.Remote(APPIUM_URL, options=opts)
-
-sleep(1)
-driver.activate_app(BUNDLE_ID)
-
-try:
-    el = driver.find_element(AppiumBy.IOS_PREDICATE, 'label == "Generali" OR label == "General"')
-    el.click()
-    print("Tap su Generali/General OK")
-except Exception as e:
-    print("Elemento 'Generali/General' non trovato subito:", e)
-
-driver.quit()
+# Clock, battery and signal change between runs; pixels, generous enough for 3x screens
+STATUS_BAR = (0, 0, 10000, 150)
+
+# Same capabilities as before (WDA ya levantado), leased from daemon.py serve when it is running
+KEY = SessionKey(udid=UDID, bundle_id=BUNDLE_ID, wda_url=WDA_URL)
+
+
+def run(driver, tracer=None):
+    # Group the WebDriver commands by screen when tracing
+    screen = tracer.screen if tracer else (lambda name: nullcontext())
+    with screen("launch"):
+        driver.activate_app(BUNDLE_ID)
+
+    # Resolve locators against one page-source fetch per poll; only the tap goes to WDA
+    locator = LocatorEngine(driver)
+    predicate = 'label == "Generali" OR label == "General"'
+    with screen("Settings"):
+        try:
+            # Returns as soon as the row is on screen instead of sleeping first and trying once
+            result = wait_until(located(locator, AppiumBy.IOS_PREDICATE, predicate), timeout=WAIT_TIMEOUT,
+                                name="Generali/General", logger=LOGGER, raise_on_timeout=False)
+            if result.ok:
+                element = result.value
+                if isinstance(element, LocalElement):
+                    locator.tap(element)
+                else:
+                    element.click()
+                print("Tap su Generali/General OK")
+                if VISUAL_DIR:
+                    check_general(driver, screen)
+            else:
+                print(f"Elemento 'Generali/General' non trovato dopo {result.elapsed:.1f}s")
+        except Exception as e:
+            print("Elemento 'Generali/General' non trovato:", e)
+
+
+def check_general(driver, screen):
+    """Visual check of the General screen; the first run records its baseline"""
+    # NumPy + Pillow only when VISUAL_DIR is set
+    from e2eios.utils.visual import BaselineStore, VisualChecker, screen_matches
+
+    checker = VisualChecker(BaselineStore(ROOT / VISUAL_DIR), logger=LOGGER)
+    with screen("General"):
+        # Polls until the push animation has settled instead of screenshotting mid-transition
+        match = wait_until(screen_matches(checker, "settings_general", driver, ignore=[STATUS_BAR]),
+                           timeout=WAIT_TIMEOUT, name="settings_general screen", logger=LOGGER,
+                           raise_on_timeout=False)
+        result = match.value if match.ok else checker.check("settings_general", driver, ignore=[STATUS_BAR])
+    print(f"Visual check: {result.to_dict()}")
+
+
+def save_artifacts(driver):
+    """Final screenshot and page source; unchanged screens only add index rows"""
+    # sqlite3 and the store only when ARTIFACT_DIR is set
+    from e2eios.utils.artifacts import ArtifactStore, new_run_id
+
+    run_id = new_run_id("open_settings")
+    with ArtifactStore(ROOT / ARTIFACT_DIR) as store:
+        store.put(driver.get_screenshot_as_png(), run_id, "final", "screenshot", "screen.png")
+        store.put(driver.page_source, run_id, "final", "source", "source.xml")
+        print(f"Artifacts: {run_id} {store.stats()}")
+
+
+if __name__ == "__main__":
+    # Session stays alive in the broker after the run; without one this falls back to create + quit
+    with lease_session(KEY, APPIUM_URL, SESSION_BROKER) as driver:
+        direct = WdaDirect(WDA_URL, WDA_DIRECT) if WDA_DIRECT else None
+        if direct:
+            direct.attach(driver)
+        tracer = DriverTracer("open_settings") if TRACE_DIR else None
+        if tracer:
+            tracer.instrument(driver)
+        try:
+            run(driver, tracer)
+            if ARTIFACT_DIR:
+                save_artifacts(driver)
+        finally:
+            if tracer:
+                DriverTracer.uninstrument(driver)
+                trace_file = Path(TRACE_DIR) / f"open_settings-{time.strftime('%Y%m%d-%H%M%S')}.json"
+                out = tracer.export_chrome_trace(trace_file)
+                print(tracer.format_summary())
+                print(f"Trace: {out}")
+            if direct:
+                WdaDirect.detach(driver)
+                print(f"WDA direct: {direct.stats()}")
+            print(f"Waits: {wait_stats()}")
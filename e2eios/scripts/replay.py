@@ -0,0 +1,86 @@
+#!/usr/bin/env python3
+"""
+Record / Replay CLI
+Records the Appium and WDA HTTP traffic of a real run into a session file,
+then replays it locally so the same script runs without a device
+"""
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+# Add project root to path
+ROOT = Path(__file__).resolve().parents[2]
+sys.path.insert(0, str(ROOT))
+
+from e2eios.utils.env import load_env
+from e2eios.utils.logger import get_logger
+from e2eios.utils.replay import Recorder, Replayer, ReplaySession
+
+
+def run_or_wait(servers, command, logger) -> int:
+    """Run the command against the servers (E2EIOS_*_URL overrides), or serve until Ctrl+C"""
+    overrides = servers.env()
+    if not command:
+        for name, value in overrides.items():
+            logger.info(f"{name}={value}")
+        logger.info("Serving until Ctrl+C")
+        try:
+            while True:
+                time.sleep(1)
+        except KeyboardInterrupt:
+            return 0
+    if command[0] == "--":
+        command = command[1:]
+    if command and command[0].endswith(".py"):
+        command = [sys.executable] + command
+    start = time.perf_counter()
+    code = subprocess.call(command, env={**os.environ, **overrides}, cwd=str(ROOT))
+    logger.info(f"Command finished in {time.perf_counter() - start:.2f}s", {'exit_code': code})
+    return code
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Record Appium/WDA traffic, or replay it without a device")
+    parser.add_argument("mode", choices=["record", "play", "info"])
+    parser.add_argument("session", type=Path, help="Session file (.jsonl.gz is compressed)")
+    parser.add_argument("--speed", type=float, default=0.0,
+                        help="play: 0 answers immediately, 1 keeps recorded latency, 10 is 10x faster")
+    parser.add_argument("--appium-port", type=int, default=0, help="Listen port for Appium (default: any free)")
+    parser.add_argument("--wda-port", type=int, default=0, help="Listen port for WDA (default: any free)")
+    parser.add_argument("command", nargs=argparse.REMAINDER,
+                        help="Command to run against the proxies, e.g. -- e2eios/scripts/open_settings.py")
+    args = parser.parse_args(argv)
+
+    logger = get_logger("Replay")
+    ports = {'appium': args.appium_port, 'wda': args.wda_port}
+
+    if args.mode == "info":
+        print(json.dumps(ReplaySession.load(args.session).summary(), indent=2))
+        return 0
+
+    if args.mode == "record":
+        env = load_env(ROOT / "e2eios" / "config" / ".env")
+        targets = {'appium': env.get("APPIUM_URL", "http://127.0.0.1:4723"),
+                   'wda': env.get("WDA_URL", "http://127.0.0.1:8200")}
+        with Recorder(args.session, targets, ports=ports) as recorder:
+            logger.info("Recording", {t: f"{recorder.urls[t]} -> {u}" for t, u in targets.items()})
+            code = run_or_wait(recorder, args.command, logger)
+        logger.success(f"Recorded {recorder.count} exchanges to {args.session}")
+        return code
+
+    with Replayer(args.session, ports=ports, speed=args.speed) as replayer:
+        logger.info("Replaying", dict(replayer.urls, speed=args.speed or "instant"))
+        code = run_or_wait(replayer, args.command, logger)
+    stats = replayer.stats()
+    misses = sum(s['misses'] for s in stats.values())
+    (logger.warning if misses else logger.success)("Replay finished", {t: s for t, s in stats.items()})
+    return code
+
+
+if __name__ == "__main__":
+    sys.exit(main())
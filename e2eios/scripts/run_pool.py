@@ -0,0 +1,72 @@
+#!/usr/bin/env python3
+"""
+Device Pool Runner
+Runs an automation script on every connected device in parallel,
+each device with its own go-ios forward port and WDA URL
+"""
+
+import argparse
+import sys
+import time
+from pathlib import Path
+
+# Add project root to path
+ROOT = Path(__file__).resolve().parents[2]
+sys.path.insert(0, str(ROOT))
+
+from e2eios.utils.device_pool import DevicePool
+from e2eios.utils.env import load_env
+from e2eios.utils.logger import get_logger
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Run a script on N devices in parallel")
+    parser.add_argument("script", nargs="?", default=str(ROOT / "e2eios" / "scripts" / "open_settings.py"),
+                        help="Python script to run (default: open_settings.py)")
+    parser.add_argument("--runs", type=int, default=None, help="Total runs (default: one per healthy device)")
+    parser.add_argument("--max-devices", type=int, default=None, help="Use at most this many devices")
+    parser.add_argument("--base-port", type=int, default=None, help="First local forward port (default: WDA_URL port)")
+    parser.add_argument("--timeout", type=float, default=600, help="Per-run timeout in seconds")
+    parser.add_argument("--ready-timeout", type=float, default=30, help="Seconds to wait for WDA on every device")
+    args = parser.parse_args(argv)
+
+    logger = get_logger("DevicePool")
+    env = load_env(ROOT / "e2eios" / "config" / ".env")
+
+    pool = DevicePool.from_env(env, base_port=args.base_port, max_devices=args.max_devices)
+    try:
+        devices = pool.prepare(args.ready_timeout)
+        if not devices:
+            logger.error("No devices found. Make sure your iOS devices are connected and trusted.")
+            return 1
+        logger.info(f"Found {len(devices)} device(s)", {d.udid: d.wda_url for d in devices})
+
+        for device in devices:
+            if device.healthy:
+                logger.success("Device ready", {'udid': device.udid, 'wda': device.wda_url,
+                                                'latency': f"{device.last_latency:.3f}s"})
+            else:
+                logger.warning("Device WDA not responding, skipping", {'udid': device.udid, 'wda': device.wda_url})
+
+        start = time.perf_counter()
+        results = pool.run_parallel(args.script, runs=args.runs, timeout=args.timeout)
+        elapsed = time.perf_counter() - start
+        if not results:
+            logger.error("No healthy devices to run on")
+            return 1
+
+        for result in results:
+            context = {'udid': result.udid, 'duration': f"{result.duration:.2f}s", 'code': result.returncode}
+            if result.ok:
+                logger.success("Run completed", context)
+            else:
+                logger.error("Run failed", dict(context, output=result.output[-300:]))
+        passed = sum(1 for r in results if r.ok)
+        logger.info("Pool run finished", {'runs': len(results), 'passed': passed, 'wall_time': f"{elapsed:.2f}s"})
+        return 0 if passed == len(results) else 1
+    finally:
+        pool.close()
+
+
+if __name__ == "__main__":
+    sys.exit(main())
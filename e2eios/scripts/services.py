@@ -0,0 +1,90 @@
+#!/usr/bin/env python3
+"""
+Service Supervisor CLI
+Cross-platform start/stop/status for the go-ios services
+(Developer Disk Image, forward, WebDriverAgent)
+"""
+
+import argparse
+import json
+import sys
+from pathlib import Path
+
+# Add project root to path
+ROOT = Path(__file__).resolve().parents[2]
+sys.path.insert(0, str(ROOT))
+
+from e2eios.utils.devices import DeviceInventory
+from e2eios.utils.disk_image import DiskImageManager
+from e2eios.utils.env import load_env
+from e2eios.utils.goios import get_executor
+from e2eios.utils.logger import get_logger
+from e2eios.utils.supervisor import ServiceSupervisor, default_stages
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Start, stop or inspect the go-ios services")
+    parser.add_argument("command", choices=["start", "stop", "status"])
+    parser.add_argument("--udid", default=None, help="Device UDID (default: IOS_UDID from .env)")
+    parser.add_argument("--json", action="store_true", help="Print the result as JSON")
+    parser.add_argument("--remount", action="store_true", help="Ignore the cached DDI mount state")
+    args = parser.parse_args(argv)
+
+    logger = get_logger("Services")
+    env = load_env(ROOT / "e2eios" / "config" / ".env")
+    go_ios = get_executor(env.get("GO_IOS_EXE", "C:\\tools\\go-ios\\ios.exe"))
+
+    def log(message, level="info"):
+        getattr(logger, level, logger.info)(message)
+
+    supervisor = ServiceSupervisor(go_ios, log=None if args.json else log)
+
+    if args.command == "status":
+        status = supervisor.status()
+        if args.json:
+            print(json.dumps(status, indent=2))
+        else:
+            for name, entry in status.items():
+                state = "running" if entry['alive'] else "dead"
+                logger.info(f"{name}: {state}", {'pid': entry['pid']})
+            if not status:
+                logger.info("No supervised services")
+        return 0
+
+    if args.command == "stop":
+        stopped = supervisor.stop()
+        if args.json:
+            print(json.dumps({'stopped': stopped}))
+        else:
+            logger.success(f"Stopped {', '.join(stopped)}" if stopped else "No supervised services were running")
+        return 0
+
+    # `ios listen` DeviceIDs tell whether the device rebooted since the cached mount
+    inventory = DeviceInventory(go_ios)
+    inventory.start()
+    images = DiskImageManager(go_ios, inventory=inventory)
+    try:
+        if args.remount:
+            images.invalidate(args.udid or env.get("IOS_UDID"))
+        stages = default_stages(env, udid=args.udid, images=images)
+        report = supervisor.start(stages)
+    except ValueError as e:
+        logger.error(str(e))
+        return 2
+    finally:
+        images.close()
+        inventory.stop()
+    if args.json:
+        print(json.dumps(report.to_dict(), indent=2))
+    else:
+        for line in report.timeline():
+            logger.info(line)
+        if report.ok:
+            logger.success(f"Services ready in {report.elapsed:.1f}s")
+        else:
+            logger.error("Service startup failed", {r.name: r.detail for r in report.results if not r.ok})
+    return 0 if report.ok else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -7,23 +7,26 @@ Enhanced with structured logging
 
 import sys
 from pathlib import Path
-import requests
-import time
 
 # Add project root to path
 ROOT = Path(__file__).resolve().parents[2]
 sys.path.insert(0, str(ROOT))
 
 from e2eios.utils.env import load_env
-from e2eios.utils.logger import get_logger
+from e2eios.utils.http_client import get_http_pool
+from e2eios.utils.logger import configure_logging, get_logger
+from e2eios.utils.probes import get_probe_engine, http_status_probe
 
-def test_connection():
+def test_connection(env=None):
     """Test connection to Appium and WebDriverAgent with detailed logging"""
     logger = get_logger("ConnectionTest", enable_debug=True)
     
-    # Load environment
+    # Load environment (callers such as the benchmarks may pass their own)
     logger.info("Starting connection test")
-    env = load_env(ROOT / "e2eios" / "config" / ".env")
+    if env is None:
+        env = load_env(ROOT / "e2eios" / "config" / ".env")
+        configure_logging(log_file=env.get("LOG_FILE"), jsonl_file=env.get("LOG_JSONL"))
+    get_http_pool().configure(env)
     
     appium_url = env.get("APPIUM_URL", "http://127.0.0.1:4723")
     wda_url = env.get("WDA_URL", "http://127.0.0.1:8200")
@@ -39,64 +42,63 @@ def test_connection():
         logger.error("IOS_UDID not found in environment configuration")
         return False
     
+    # Probe Appium and WebDriverAgent concurrently
+    logger.info("Testing Appium server and WebDriverAgent connections")
+    snapshot = get_probe_engine().run([
+        http_status_probe("appium", appium_url, timeout=5),
+        http_status_probe("wda", wda_url, timeout=5),
+    ])
+    
     # Test Appium
-    logger.info("Testing Appium server connection")
-    try:
-        start_time = time.time()
-        response = requests.get(f"{appium_url}/status", timeout=5)
-        response_time = time.time() - start_time
-        
-        logger.log_api_call("Appium", "GET", response.status_code, response_time)
-        
-        if response.status_code == 200:
-            data = response.json()
-            logger.success("Appium server is responsive", {
-                'build': data.get('value', {}).get('build', {}).get('version', 'unknown')
-            })
-            appium_ok = True
-        else:
-            logger.error("Appium server returned error status", {
-                'status_code': response.status_code,
-                'response': response.text[:100]
-            })
-            appium_ok = False
-            
-    except requests.exceptions.ConnectionError:
+    appium = snapshot["appium"]
+    if appium.status_code is not None:
+        logger.log_api_call("Appium", "GET", appium.status_code, appium.latency)
+    
+    if appium.ok:
+        logger.success("Appium server is responsive", {
+            'build': appium.data.get('value', {}).get('build', {}).get('version', 'unknown')
+        })
+        appium_ok = True
+    elif appium.status_code is not None:
+        logger.error("Appium server returned error status", {
+            'status_code': appium.status_code,
+            'response': appium.data
+        })
+        appium_ok = False
+    elif appium.error_type == 'ConnectionError':
         logger.error("Cannot connect to Appium server", {'url': appium_url})
         appium_ok = False
-    except Exception as e:
-        logger.error("Appium connection test failed", exc_info=True)
+    else:
+        logger.error("Appium connection test failed", {'error': appium.error})
         appium_ok = False
     
     # Test WebDriverAgent
-    logger.info("Testing WebDriverAgent connection")
-    try:
-        start_time = time.time()
-        response = requests.get(f"{wda_url}/status", timeout=5)
-        response_time = time.time() - start_time
-        
-        logger.log_api_call("WebDriverAgent", "GET", response.status_code, response_time)
-        
-        if response.status_code == 200:
-            data = response.json()
-            logger.success("WebDriverAgent is responsive", {
-                'device': data.get('value', {}).get('device', 'unknown')
-            })
-            wda_ok = True
-        else:
-            logger.error("WebDriverAgent returned error status", {
-                'status_code': response.status_code,
-                'response': response.text[:100]
-            })
-            wda_ok = False
-            
-    except requests.exceptions.ConnectionError:
+    wda = snapshot["wda"]
+    if wda.status_code is not None:
+        logger.log_api_call("WebDriverAgent", "GET", wda.status_code, wda.latency)
+    
+    if wda.ok:
+        logger.success("WebDriverAgent is responsive", {
+            'device': wda.data.get('value', {}).get('device', 'unknown')
+        })
+        wda_ok = True
+    elif wda.status_code is not None:
+        logger.error("WebDriverAgent returned error status", {
+            'status_code': wda.status_code,
+            'response': wda.data
+        })
+        wda_ok = False
+    elif wda.error_type == 'ConnectionError':
         logger.error("Cannot connect to WebDriverAgent", {'url': wda_url})
         wda_ok = False
-    except Exception as e:
-        logger.error("WebDriverAgent connection test failed", exc_info=True)
+    else:
+        logger.error("WebDriverAgent connection test failed", {'error': wda.error})
         wda_ok = False
     
+    logger.debug("Probe round completed", {'elapsed': f"{snapshot.elapsed:.3f}s"})
+    for stats in get_http_pool().stats().values():
+        logger.debug("HTTP connection pool", stats)
+    
     # Summary
     if appium_ok and wda_ok:
         logger.success("All connections successful - ready for automation!", {
@@ -0,0 +1,386 @@
+#!/usr/bin/env python3
+"""
+Content-Addressed Artifact Store for Appium iOS Automation
+Stores screenshots, page sources and service logs once per distinct content
+(SHA-256, gzip unless already compressed) with a SQLite index of run, step
+and type; identical bytes from static screens or repeated runs cost an index
+row instead of another copy. Reads stream, and gc() applies retention
+"""
+
+import gzip
+import hashlib
+import io
+import os
+import re
+import shutil
+import sqlite3
+import tempfile
+import threading
+import time
+from contextlib import contextmanager
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, BinaryIO, Callable, Dict, Iterator, List, Optional, Tuple, Union
+
+ROOT = Path(__file__).resolve().parents[2]
+ARTIFACT_DIR = ROOT / "artifacts"
+
+CHUNK = 1024 * 1024
+
+# Formats that are already compressed; gzip would only cost CPU
+_COMPRESSED_MAGIC = (b"\x89PNG", b"\xff\xd8\xff", b"\x1f\x8b", b"PK\x03\x04", b"GIF8")
+
+# start.ps1 (image-<ts>.out.log) and the supervisor (wda-<ts>.log) name logs by stage and timestamp
+_LOG_NAME = re.compile(r"^(?P<stage>[A-Za-z0-9_]+)-(?P<ts>\d{8}-\d{6})(?:\.(?P<stream>out|err))?\.log$")
+
+Source = Union[bytes, str, Path, BinaryIO]
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS blobs (
+    sha TEXT PRIMARY KEY,
+    size INTEGER NOT NULL,
+    stored INTEGER NOT NULL,
+    codec TEXT NOT NULL,
+    created REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS artifacts (
+    id INTEGER PRIMARY KEY,
+    run TEXT NOT NULL,
+    step TEXT NOT NULL,
+    kind TEXT NOT NULL,
+    name TEXT NOT NULL,
+    sha TEXT NOT NULL REFERENCES blobs(sha),
+    created REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS artifacts_run ON artifacts(run, step);
+CREATE INDEX IF NOT EXISTS artifacts_sha ON artifacts(sha);
+"""
+
+
+@dataclass
+class Artifact:
+    """One index row: a named artifact of a run step pointing at a blob"""
+    id: int
+    run: str
+    step: str
+    kind: str
+    name: str
+    sha: str
+    size: int
+    created: float
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            'id': self.id,
+            'run': self.run,
+            'step': self.step,
+            'kind': self.kind,
+            'name': self.name,
+            'sha': self.sha,
+            'size': self.size,
+            'created': self.created,
+        }
+
+
+@dataclass
+class GcReport:
+    """What gc() removed (or would remove with dry_run)"""
+    runs: List[str]
+    artifacts: int
+    blobs: int
+    bytes_freed: int
+    dry_run: bool = False
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            'runs': self.runs,
+            'artifacts': self.artifacts,
+            'blobs': self.blobs,
+            'bytes_freed': self.bytes_freed,
+            'dry_run': self.dry_run,
+        }
+
+
+def new_run_id(prefix: str = "run") -> str:
+    return f"{prefix}-{time.strftime('%Y%m%d-%H%M%S')}-{os.getpid()}"
+
+
+class ArtifactStore:
+    """Blobs in <dir>/blobs/<aa>/<sha256>, index in <dir>/index.db"""
+
+    def __init__(self, directory: Path = ARTIFACT_DIR, level: int = 6):
+        self.directory = Path(directory)
+        self.blob_dir = self.directory / "blobs"
+        self.level = level
+        self.blob_dir.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        # Transactions are explicit (see _write); timeout waits for another process's write lock
+        self._db = sqlite3.connect(str(self.directory / "index.db"), check_same_thread=False,
+                                   isolation_level=None, timeout=30)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.executescript(_SCHEMA)
+
+    def close(self):
+        with self._lock:
+            self._db.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def blob_path(self, sha: str) -> Path:
+        return self.blob_dir / sha[:2] / sha
+
+    # ---- writing ----
+
+    @contextmanager
+    def _write(self):
+        """BEGIN IMMEDIATE: one writer at a time across processes (a put() here, a gc() from the CLI)"""
+        with self._lock:
+            self._db.execute("BEGIN IMMEDIATE")
+            try:
+                yield self._db
+            except BaseException:
+                self._db.execute("ROLLBACK")
+                raise
+            self._db.execute("COMMIT")
+
+    def put(self, source: Source, run: str, step: str, kind: str, name: Optional[str] = None,
+            created: Optional[float] = None) -> Artifact:
+        """Store bytes, text, a file or a readable stream; content already stored is only indexed"""
+        if isinstance(source, str):
+            source = source.encode("utf-8")
+        created = time.time() if created is None else created
+        if isinstance(source, Path):
+            with open(source, "rb") as f:
+                sha, size, head = self._hash_stream(f)
+                return self._add(sha, size, run, step, kind, name or source.name, created,
+                                 lambda: self._compress(f, head))
+        if isinstance(source, (bytes, bytearray, memoryview)):
+            data = bytes(source)
+            return self._add(hashlib.sha256(data).hexdigest(), len(data), run, step, kind, name, created,
+                             lambda: self._compress(io.BytesIO(data), data[:8]))
+        # Unseekable stream: one pass that hashes and compresses into a temp file
+        tmp, sha, size = self._compress_stream(source)
+        return self._add(sha, size, run, step, kind, name, created, lambda: (tmp, "gzip"), prepared=(tmp, "gzip"))
+
+    def _add(self, sha: str, size: int, run: str, step: str, kind: str, name: Optional[str], created: float,
+             prepare: Callable[[], Tuple[Path, str]], prepared: Optional[Tuple[Path, str]] = None) -> Artifact:
+        """Blob check, blob insert and artifact insert in one write transaction, so gc() cannot drop
+        the blob in between; compression happens outside it, only when the blob is missing"""
+        name = name or f"{kind}-{sha[:12]}"
+        try:
+            while True:
+                with self._write() as db:
+                    present = db.execute("SELECT 1 FROM blobs WHERE sha = ?", (sha,)).fetchone() is not None \
+                        and self.blob_path(sha).exists()
+                    if not present and prepared is not None:
+                        tmp, codec = prepared
+                        stored = tmp.stat().st_size
+                        path = self.blob_path(sha)
+                        path.parent.mkdir(exist_ok=True)
+                        os.replace(tmp, path)
+                        db.execute("INSERT OR REPLACE INTO blobs (sha, size, stored, codec, created) "
+                                   "VALUES (?, ?, ?, ?, ?)", (sha, size, stored, codec, time.time()))
+                        present = True
+                    if present:
+                        cursor = db.execute(
+                            "INSERT INTO artifacts (run, step, kind, name, sha, created) VALUES (?, ?, ?, ?, ?, ?)",
+                            (run, step, kind, name, sha, created))
+                        return Artifact(cursor.lastrowid, run, step, kind, name, sha, size, created)
+                prepared = prepare()
+        finally:
+            if prepared is not None and prepared[0].exists():
+                prepared[0].unlink()
+
+    def _hash_stream(self, f: BinaryIO):
+        digest = hashlib.sha256()
+        size = 0
+        head = b""
+        for chunk in iter(lambda: f.read(CHUNK), b""):
+            if not head:
+                head = chunk[:8]
+            digest.update(chunk)
+            size += len(chunk)
+        return digest.hexdigest(), size, head
+
+    @contextmanager
+    def _temp(self):
+        """Temp file next to the blobs (same filesystem for os.replace); removed on error"""
+        fd, tmp = tempfile.mkstemp(dir=str(self.blob_dir), suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as out:
+                yield out, Path(tmp)
+        except BaseException:
+            os.unlink(tmp)
+            raise
+
+    def _codec(self, head: bytes) -> str:
+        return "raw" if head.startswith(_COMPRESSED_MAGIC) else "gzip"
+
+    def _compress(self, f: BinaryIO, head: bytes) -> Tuple[Path, str]:
+        codec = self._codec(head)
+        f.seek(0)
+        with self._temp() as (out, tmp):
+            if codec == "gzip":
+                with gzip.GzipFile(fileobj=out, mode="wb", compresslevel=self.level, mtime=0) as gz:
+                    shutil.copyfileobj(f, gz, CHUNK)
+            else:
+                shutil.copyfileobj(f, out, CHUNK)
+        return tmp, codec
+
+    def _compress_stream(self, stream: BinaryIO) -> Tuple[Path, str, int]:
+        digest = hashlib.sha256()
+        size = 0
+        with self._temp() as (out, tmp):
+            with gzip.GzipFile(fileobj=out, mode="wb", compresslevel=self.level, mtime=0) as gz:
+                for chunk in iter(lambda: stream.read(CHUNK), b""):
+                    digest.update(chunk)
+                    size += len(chunk)
+                    gz.write(chunk)
+        return tmp, digest.hexdigest(), size
+
+    def import_logs(self, log_dir: Path, older_than: float = 3600.0, delete: bool = False) -> List[Artifact]:
+        """Store timestamped service logs (<stage>-<ts>[.out|.err].log) that stopped changing; run = services-<ts>"""
+        cutoff = time.time() - older_than
+        stored = []
+        for path in sorted(Path(log_dir).glob("*.log")):
+            match = _LOG_NAME.match(path.name)
+            mtime = path.stat().st_mtime
+            if match is None or mtime > cutoff:
+                continue
+            # Dated by the file, so retention by age treats old logs as old
+            artifact = self.put(path, f"services-{match['ts']}", match['stage'], "log", created=mtime)
+            stored.append(artifact)
+            if delete:
+                path.unlink()
+        return stored
+
+    # ---- reading ----
+
+    def find(self, run: Optional[str] = None, step: Optional[str] = None, kind: Optional[str] = None,
+             name: Optional[str] = None, artifact_id: Optional[int] = None) -> List[Artifact]:
+        clauses, params = [], []
+        for column, value in (("a.run", run), ("a.step", step), ("a.kind", kind), ("a.name", name),
+                              ("a.id", artifact_id)):
+            if value is not None:
+                clauses.append(f"{column} = ?")
+                params.append(value)
+        where = f"WHERE {' AND '.join(clauses)}" if clauses else ""
+        with self._lock:
+            rows = self._db.execute(
+                "SELECT a.id, a.run, a.step, a.kind, a.name, a.sha, b.size, a.created "
+                f"FROM artifacts a JOIN blobs b ON a.sha = b.sha {where} ORDER BY a.id", params).fetchall()
+        return [Artifact(*row) for row in rows]
+
+    def get(self, artifact_id: int) -> Artifact:
+        found = self.find(artifact_id=artifact_id)
+        if not found:
+            raise KeyError(f"Unknown artifact: {artifact_id}")
+        return found[0]
+
+    def runs(self) -> List[Dict[str, Any]]:
+        """Runs, newest first, with artifact count and logical size"""
+        with self._lock:
+            rows = self._db.execute(
+                "SELECT a.run, COUNT(*), SUM(b.size), MIN(a.created), MAX(a.created) "
+                "FROM artifacts a JOIN blobs b ON a.sha = b.sha GROUP BY a.run ORDER BY MAX(a.created) DESC").fetchall()
+        return [{'run': r[0], 'artifacts': r[1], 'bytes': r[2], 'first': r[3], 'last': r[4]} for r in rows]
+
+    def open(self, ref: Union[Artifact, str]) -> BinaryIO:
+        """Readable stream of the original bytes (decompressed on the fly)"""
+        sha = ref.sha if isinstance(ref, Artifact) else ref
+        with self._lock:
+            row = self._db.execute("SELECT codec FROM blobs WHERE sha = ?", (sha,)).fetchone()
+        if row is None:
+            raise KeyError(f"Unknown blob: {sha}")
+        path = self.blob_path(sha)
+        return gzip.open(path, "rb") if row[0] == "gzip" else open(path, "rb")
+
+    def read(self, ref: Union[Artifact, str]) -> bytes:
+        with self.open(ref) as f:
+            return f.read()
+
+    def iter_chunks(self, ref: Union[Artifact, str], size: int = CHUNK) -> Iterator[bytes]:
+        with self.open(ref) as f:
+            yield from iter(lambda: f.read(size), b"")
+
+    def export(self, ref: Union[Artifact, str], dest: Path) -> Path:
+        dest = Path(dest)
+        dest.parent.mkdir(parents=True, exist_ok=True)
+        with self.open(ref) as src, open(dest, "wb") as out:
+            shutil.copyfileobj(src, out, CHUNK)
+        return dest
+
+    # ---- retention ----
+
+    def gc(self, keep_runs: Optional[int] = None, older_than_days: Optional[float] = None,
+           dry_run: bool = False) -> GcReport:
+        """Drop runs beyond the newest keep_runs and/or older than the cutoff, then blobs nothing references"""
+        with self._write() as db:
+            # Runs, orphans and the file deletes all under the write lock: a put() elsewhere either indexed
+            # its artifact first (blob kept) or runs after this commit and writes the blob again
+            runs = db.execute("SELECT run, MAX(created) FROM artifacts GROUP BY run ORDER BY MAX(created) DESC").fetchall()
+            expired = set()
+            if keep_runs is not None:
+                expired.update(run for run, _ in runs[keep_runs:])
+            if older_than_days is not None:
+                cutoff = time.time() - older_than_days * 86400
+                expired.update(run for run, last in runs if last < cutoff)
+            expired_runs = sorted(expired)
+
+            db.execute("CREATE TEMP TABLE IF NOT EXISTS expired (run TEXT PRIMARY KEY)")
+            db.execute("DELETE FROM expired")
+            db.executemany("INSERT INTO expired VALUES (?)", [(r,) for r in expired_runs])
+            artifacts = db.execute("SELECT COUNT(*) FROM artifacts WHERE run IN (SELECT run FROM expired)").fetchone()[0]
+            # Blobs still referenced by a run that survives stay
+            orphans = db.execute(
+                "SELECT sha, stored FROM blobs WHERE sha NOT IN "
+                "(SELECT sha FROM artifacts WHERE run NOT IN (SELECT run FROM expired))").fetchall()
+            if not dry_run:
+                db.execute("DELETE FROM artifacts WHERE run IN (SELECT run FROM expired)")
+                db.executemany("DELETE FROM blobs WHERE sha = ?", [(sha,) for sha, _ in orphans])
+                for sha, _ in orphans:
+                    try:
+                        self.blob_path(sha).unlink()
+                    except FileNotFoundError:
+                        pass
+            db.execute("DELETE FROM expired")
+
+        freed = sum(stored for _, stored in orphans)
+        if not dry_run:
+            self._sweep_temp()
+            with self._lock:
+                self._db.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+        return GcReport(expired_runs, artifacts, len(orphans), freed, dry_run)
+
+    def _sweep_temp(self, max_age: float = 3600.0):
+        """Temp files left by a crash mid-write"""
+        cutoff = time.time() - max_age
+        for tmp in self.blob_dir.glob("*.tmp"):
+            # Another process may finish (rename) or drop its temp file meanwhile
+            try:
+                if tmp.stat().st_mtime < cutoff:
+                    tmp.unlink()
+            except FileNotFoundError:
+                pass
+
+    def stats(self) -> Dict[str, Any]:
+        """Logical bytes (as written by callers) versus bytes actually on disk"""
+        with self._lock:
+            blobs, unique, stored = self._db.execute(
+                "SELECT COUNT(*), COALESCE(SUM(size), 0), COALESCE(SUM(stored), 0) FROM blobs").fetchone()
+            artifacts, logical = self._db.execute(
+                "SELECT COUNT(*), COALESCE(SUM(b.size), 0) FROM artifacts a JOIN blobs b ON a.sha = b.sha").fetchone()
+            runs = self._db.execute("SELECT COUNT(DISTINCT run) FROM artifacts").fetchone()[0]
+        return {
+            'runs': runs,
+            'artifacts': artifacts,
+            'blobs': blobs,
+            'logical_bytes': logical,
+            'unique_bytes': unique,
+            'stored_bytes': stored,
+            'saving': round(1 - stored / logical, 4) if logical else 0.0,
+        }
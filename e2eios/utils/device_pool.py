@@ -0,0 +1,268 @@
+#!/usr/bin/env python3
+"""
+Device Pool Orchestrator for Appium iOS Automation
+Discovers attached devices, gives each its own local `ios forward` port and
+WDA URL, leases devices to jobs and runs a script on N devices in parallel
+"""
+
+import os
+import socket
+import subprocess
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional, Sequence
+
+from e2eios.utils.devices import DeviceInventory
+from e2eios.utils.env import OVERRIDE_PREFIX
+from e2eios.utils.goios import GoIosExecutor, get_executor
+from e2eios.utils.probes import ProbeSnapshot, get_probe_engine, http_status_probe
+
+ROOT = Path(__file__).resolve().parents[2]
+
+
+@dataclass
+class PooledDevice:
+    """One device in the pool with its dedicated forward port"""
+    udid: str
+    forward_port: int
+    wda_url: str
+    healthy: bool = False
+    leased_by: Optional[str] = None
+    last_check: float = 0.0
+    last_latency: Optional[float] = None
+    forward_proc: Optional[subprocess.Popen] = field(default=None, repr=False)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            'udid': self.udid,
+            'forward_port': self.forward_port,
+            'wda_url': self.wda_url,
+            'healthy': self.healthy,
+            'leased_by': self.leased_by,
+            'last_latency': self.last_latency,
+        }
+
+
+@dataclass
+class JobResult:
+    """Outcome of running a script on one device"""
+    udid: str
+    returncode: int
+    duration: float
+    output: str = ""
+
+    @property
+    def ok(self) -> bool:
+        return self.returncode == 0
+
+
+class NoDeviceAvailable(Exception):
+    """Raised when no device can be leased before the timeout"""
+
+
+def _port_in_use(host: str, port: int) -> bool:
+    with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as sock:
+        sock.settimeout(0.2)
+        return sock.connect_ex((host, port)) == 0
+
+
+def device_env(device) -> Dict[str, str]:
+    """Environment that points a child process at one device (anything with udid and wda_url)"""
+    env = dict(os.environ)
+    env[f"{OVERRIDE_PREFIX}IOS_UDID"] = device.udid
+    env[f"{OVERRIDE_PREFIX}WDA_URL"] = device.wda_url
+    env["PYTHONPATH"] = os.pathsep.join(filter(None, [str(ROOT), env.get("PYTHONPATH")]))
+    return env
+
+
+class DevicePool:
+    """Per-device forward ports, health checks and leasing"""
+
+    def __init__(self, executor: GoIosExecutor, inventory: Optional[DeviceInventory] = None,
+                 base_port: int = 8200, wda_device_port: int = 8100,
+                 host: str = "127.0.0.1", max_devices: Optional[int] = None):
+        self.executor = executor
+        self.inventory = inventory or DeviceInventory(executor, use_listen=False)
+        self.base_port = base_port
+        self.wda_device_port = wda_device_port
+        self.host = host
+        self.max_devices = max_devices
+
+        self._devices: Dict[str, PooledDevice] = {}
+        self._cond = threading.Condition()
+        self.inventory.subscribe(self._on_devices_changed)
+
+    @classmethod
+    def from_env(cls, env: Dict[str, str], base_port: Optional[int] = None,
+                 max_devices: Optional[int] = None) -> "DevicePool":
+        """Pool for the .env go-ios binary; forward ports start at WDA_BASE_PORT, else the WDA_URL port"""
+        base_port = base_port or int(env.get("WDA_BASE_PORT",
+                                             env.get("WDA_URL", "http://127.0.0.1:8200").rsplit(":", 1)[-1]))
+        return cls(get_executor(env.get("GO_IOS_EXE", "C:\\tools\\go-ios\\ios.exe")),
+                   base_port=base_port, max_devices=max_devices)
+
+    # ---- discovery & forwards ----
+
+    def discover(self, refresh: bool = True) -> List[PooledDevice]:
+        """Sync the pool with attached devices and assign forward ports to new ones"""
+        attached = self.inventory.devices(refresh=refresh)
+        if self.max_devices:
+            attached = attached[:self.max_devices]
+        with self._cond:
+            for udid in attached:
+                if udid not in self._devices:
+                    port = self._next_free_port()
+                    self._devices[udid] = PooledDevice(udid, port, f"http://{self.host}:{port}")
+            self._cond.notify_all()
+            return list(self._devices.values())
+
+    def _next_free_port(self) -> int:
+        taken = {d.forward_port for d in self._devices.values()}
+        port = self.base_port
+        while port in taken or _port_in_use(self.host, port):
+            port += 1
+        return port
+
+    def _on_devices_changed(self, devices, added, removed):
+        with self._cond:
+            for udid in removed:
+                device = self._devices.pop(udid, None)
+                if device:
+                    self._stop_forward(device)
+            self._cond.notify_all()
+
+    def start_forwards(self):
+        """Start `ios forward <port> 8100 --udid <udid>` for every device that needs one"""
+        for device in self.devices():
+            if device.forward_proc is not None and device.forward_proc.poll() is None:
+                continue
+            if _port_in_use(self.host, device.forward_port):
+                continue
+            device.forward_proc = self.executor.spawn(
+                ["forward", str(device.forward_port), str(self.wda_device_port), "--udid", device.udid],
+                stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+            )
+
+    def _stop_forward(self, device: PooledDevice):
+        proc = device.forward_proc
+        if proc is not None and proc.poll() is None:
+            proc.terminate()
+            try:
+                proc.wait(timeout=5)
+            except subprocess.TimeoutExpired:
+                proc.kill()
+        device.forward_proc = None
+
+    def prepare(self, ready_timeout: float = 30.0) -> List[PooledDevice]:
+        """Discover devices, start their forwards and wait up to ready_timeout for every WDA to answer.
+        Returns the discovered devices; those still not answering are left unhealthy"""
+        if not self.discover():
+            return []
+        self.start_forwards()
+        deadline = time.monotonic() + ready_timeout
+        while not self.health_check().ok and time.monotonic() < deadline:
+            time.sleep(1)
+        return self.devices()
+
+    # ---- health ----
+
+    def health_check(self, timeout: float = 5.0) -> ProbeSnapshot:
+        """Probe every device's WDA /status concurrently"""
+        devices = self.devices()
+        snapshot = get_probe_engine().run(
+            [http_status_probe(d.udid, d.wda_url, timeout=timeout) for d in devices]
+        )
+        with self._cond:
+            for device in devices:
+                result = snapshot.get(device.udid)
+                if result is not None:
+                    device.healthy = result.ok
+                    device.last_latency = result.latency
+                    device.last_check = snapshot.started_at
+            self._cond.notify_all()
+        return snapshot
+
+    # ---- leasing ----
+
+    def devices(self) -> List[PooledDevice]:
+        with self._cond:
+            return list(self._devices.values())
+
+    def acquire(self, job: str = "job", udid: Optional[str] = None,
+                timeout: Optional[float] = None, require_healthy: bool = True) -> PooledDevice:
+        """Lease a free device (optionally a specific UDID), waiting up to timeout"""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._cond:
+            while True:
+                for device in self._devices.values():
+                    if device.leased_by is None and (udid is None or device.udid == udid) \
+                            and (device.healthy or not require_healthy):
+                        device.leased_by = job
+                        return device
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    raise NoDeviceAvailable(f"No device available for {job}")
+                self._cond.wait(remaining)
+
+    def release(self, device: PooledDevice):
+        with self._cond:
+            device.leased_by = None
+            self._cond.notify_all()
+
+    @contextmanager
+    def lease(self, job: str = "job", udid: Optional[str] = None,
+              timeout: Optional[float] = None, require_healthy: bool = True) -> Iterator[PooledDevice]:
+        device = self.acquire(job, udid, timeout, require_healthy)
+        try:
+            yield device
+        finally:
+            self.release(device)
+
+    # ---- parallel runs ----
+
+    def device_env(self, device: PooledDevice) -> Dict[str, str]:
+        """Environment that points a script at one pooled device"""
+        return device_env(device)
+
+    def run_script(self, device: PooledDevice, script: str, args: Sequence[str] = (),
+                   timeout: float = 600) -> JobResult:
+        """Run a Python script against one leased device"""
+        start = time.perf_counter()
+        try:
+            proc = subprocess.run([sys.executable, str(script), *args], env=self.device_env(device),
+                                  capture_output=True, text=True, timeout=timeout)
+            returncode, output = proc.returncode, (proc.stdout + proc.stderr)
+        except subprocess.TimeoutExpired as e:
+            returncode, output = -1, f"timed out after {timeout}s: {e}"
+        return JobResult(device.udid, returncode, time.perf_counter() - start, output[-2000:])
+
+    def run_parallel(self, script: str, runs: Optional[int] = None, args: Sequence[str] = (),
+                     timeout: float = 600, lease_timeout: Optional[float] = 60) -> List[JobResult]:
+        """Run a script `runs` times (default: once per healthy device), one lease per run"""
+        healthy = [d for d in self.devices() if d.healthy]
+        if not healthy:
+            return []
+        runs = runs or len(healthy)
+
+        def job(index: int) -> JobResult:
+            try:
+                with self.lease(f"{Path(script).stem}#{index}", timeout=lease_timeout) as device:
+                    return self.run_script(device, script, args, timeout)
+            except NoDeviceAvailable as e:
+                return JobResult("", -1, 0.0, str(e))
+
+        with ThreadPoolExecutor(max_workers=len(healthy), thread_name_prefix="pool-job") as pool:
+            return list(pool.map(job, range(runs)))
+
+    def close(self):
+        """Stop the forwards started by this pool"""
+        for device in self.devices():
+            self._stop_forward(device)
+
+    def to_dict(self) -> List[Dict[str, Any]]:
+        return [d.to_dict() for d in self.devices()]
@@ -0,0 +1,221 @@
+#!/usr/bin/env python3
+"""
+Device Inventory for Appium iOS Automation
+Keeps the set of attached iOS devices in memory, updated from a single
+long-running `ios listen` stream, with a TTL-cached `ios list` fallback
+"""
+
+import json
+import subprocess
+import threading
+import time
+from typing import Callable, Dict, List, Optional, Set, Tuple
+
+from e2eios.utils.goios import GoIosExecutor
+
+# callback(devices, added, removed)
+Subscriber = Callable[[List[str], Set[str], Set[str]], None]
+
+
+def parse_device_list(stdout: str) -> List[str]:
+    """Parse the output of `ios list` (may contain log lines before the JSON)"""
+    if not stdout.strip():
+        return []
+    lines = stdout.strip().split('\n')
+    for line in lines:
+        if line.strip().startswith('{"deviceList"'):
+            try:
+                return json.loads(line.strip()).get("deviceList", []) or []
+            except json.JSONDecodeError:
+                break
+    # Fallback to old parsing for compatibility
+    return [line.strip() for line in lines if line.strip() and not line.startswith('{"level":')]
+
+
+def parse_listen_event(line: str) -> Optional[Tuple[str, int, Optional[str]]]:
+    """Parse one `ios listen` line into (message_type, device_id, udid)"""
+    line = line.strip()
+    if not line.startswith('{'):
+        return None
+    try:
+        data = json.loads(line)
+    except json.JSONDecodeError:
+        return None
+    message_type = data.get("MessageType")
+    if message_type not in ("Attached", "Detached"):
+        return None
+    properties = data.get("Properties") or {}
+    device_id = data.get("DeviceID", properties.get("DeviceID"))
+    return message_type, device_id, properties.get("SerialNumber")
+
+
+class DeviceInventory:
+    """In-memory set of attached devices with change notifications"""
+
+    def __init__(self, executor: GoIosExecutor, ttl: float = 10.0,
+                 use_listen: bool = True, max_backoff: float = 60.0):
+        self.executor = executor
+        self.ttl = ttl
+        self.use_listen = use_listen
+        self.max_backoff = max_backoff
+
+        self._lock = threading.RLock()
+        self._devices: Dict[str, Optional[int]] = {}  # udid -> usbmux DeviceID
+        self._listed_at = 0.0
+        self._subscribers: List[Subscriber] = []
+
+        self._listen_proc: Optional[subprocess.Popen] = None
+        self._listen_thread: Optional[threading.Thread] = None
+        self._listen_alive = False
+        self._stopped = threading.Event()
+
+    # ---- lifecycle ----
+
+    def start(self):
+        """Start following the `ios listen` event stream"""
+        with self._lock:
+            if not self.use_listen or self._listen_thread is not None:
+                return
+            # Each loop gets its own stop event, so one left over from an earlier stop() can never be revived
+            self._stopped = threading.Event()
+            self._listen_thread = threading.Thread(target=self._listen_loop, args=(self._stopped,),
+                                                   name="device-listen", daemon=True)
+            self._listen_thread.start()
+
+    def stop(self, timeout: float = 5.0):
+        """Stop the event stream and wait up to timeout for the listen loop to exit"""
+        with self._lock:
+            self._stopped.set()
+            proc, self._listen_proc = self._listen_proc, None
+            thread, self._listen_thread = self._listen_thread, None
+            if proc and proc.poll() is None:
+                proc.terminate()
+        if thread is not None and thread is not threading.current_thread():
+            thread.join(timeout)
+
+    @property
+    def streaming(self) -> bool:
+        """True while the listen stream is feeding the inventory"""
+        return self._listen_alive
+
+    # ---- queries ----
+
+    def devices(self, refresh: bool = False) -> List[str]:
+        """Current device UDIDs; only spawns `ios list` when the stream is down and the cache is stale"""
+        with self._lock:
+            fresh = time.monotonic() - self._listed_at < self.ttl
+            if not refresh and (self._listen_alive or fresh) and self._listed_at:
+                return list(self._devices)
+        return self._list_now()
+
+    def is_connected(self, udid: str) -> bool:
+        """True when the UDID is in the inventory"""
+        return any(udid in device for device in self.devices())
+
+    def device_id(self, udid: str) -> Optional[int]:
+        """usbmux DeviceID from the listen stream; it changes every time the device re-attaches"""
+        with self._lock:
+            return self._devices.get(udid)
+
+    def wait_device_id(self, udid: str, timeout: float = 2.0) -> Optional[int]:
+        """device_id(), giving a just-started listen stream up to timeout to report the device"""
+        deadline = time.monotonic() + timeout
+        while True:
+            device_id = self.device_id(udid)
+            if device_id is not None or self._listen_thread is None or time.monotonic() >= deadline:
+                return device_id
+            time.sleep(0.05)
+
+    def subscribe(self, callback: Subscriber) -> Callable[[], None]:
+        """Register a change callback; returns an unsubscribe function"""
+        with self._lock:
+            self._subscribers.append(callback)
+
+        def unsubscribe():
+            with self._lock:
+                if callback in self._subscribers:
+                    self._subscribers.remove(callback)
+        return unsubscribe
+
+    # ---- internals ----
+
+    def _list_now(self) -> List[str]:
+        success, stdout, stderr = self.executor.run(["list"], timeout=30)
+        listed = parse_device_list(stdout) if success else []
+        with self._lock:
+            self._listed_at = time.monotonic()
+            previous = dict(self._devices)
+            self._devices = {udid: previous.get(udid) for udid in listed}
+        self._notify(previous)
+        return listed
+
+    def _apply_event(self, message_type: str, device_id: Optional[int], udid: Optional[str]):
+        with self._lock:
+            previous = dict(self._devices)
+            if message_type == "Attached" and udid:
+                self._devices[udid] = device_id
+            elif message_type == "Detached":
+                for known, known_id in previous.items():
+                    if (udid and known == udid) or (device_id is not None and known_id == device_id):
+                        del self._devices[known]
+        self._notify(previous)
+
+    def _notify(self, previous: Dict[str, Optional[int]]):
+        with self._lock:
+            current = list(self._devices)
+            subscribers = list(self._subscribers)
+        added = set(current) - set(previous)
+        removed = set(previous) - set(current)
+        if not added and not removed:
+            return
+        for callback in subscribers:
+            try:
+                callback(current, added, removed)
+            except Exception as e:
+                print(f"Device subscriber error: {e}")
+
+    def _listen_loop(self, stopped: threading.Event):
+        backoff = 1.0
+        while not stopped.is_set():
+            started = time.monotonic()
+            try:
+                proc = self.executor.spawn(
+                    ["listen"], stdout=subprocess.PIPE, stderr=subprocess.DEVNULL,
+                    text=True, bufsize=1,
+                )
+            except Exception as e:
+                if backoff == 1.0:
+                    print(f"Device listen error: {e}")
+                stopped.wait(backoff)
+                backoff = min(backoff * 2, self.max_backoff)
+                continue
+            # stop() may have run while spawning; it only terminates the proc it can see under the lock
+            with self._lock:
+                if stopped.is_set():
+                    proc.terminate()
+                    proc.wait()
+                    break
+                self._listen_proc = proc
+
+            # Seed the set once; from here on the stream keeps it current
+            self._list_now()
+            self._listen_alive = True
+            try:
+                for line in proc.stdout:
+                    event = parse_listen_event(line)
+                    if event:
+                        self._apply_event(*event)
+            finally:
+                self._listen_alive = False
+                with self._lock:
+                    if self._listen_proc is proc:
+                        self._listen_proc = None
+                if proc.poll() is None:
+                    proc.terminate()
+                proc.wait()
+                proc.stdout.close()
+
+            if time.monotonic() - started > 30:
+                backoff = 1.0
+            stopped.wait(backoff)
+            backoff = min(backoff * 2, self.max_backoff)
@@ -0,0 +1,215 @@
+#!/usr/bin/env python3
+"""
+Developer Disk Image Manager for Appium iOS Automation
+Remembers which devices already have a DDI mounted (per UDID and iOS
+version) in a small JSON cache, picks the matching image from devimages/
+by version instead of letting `ios image auto` search for one, and forgets
+a device when it detaches or reboots. Entries that the `ios listen` DeviceID
+cannot confirm are checked with `ios image list` before they are trusted
+"""
+
+import json
+import re
+import threading
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Callable, Dict, Optional
+
+from e2eios.utils.devices import DeviceInventory
+from e2eios.utils.goios import GoIosExecutor
+
+ROOT = Path(__file__).resolve().parents[2]
+
+DMG_NAME = "DeveloperDiskImage.dmg"
+
+# iOS 17+ uses personalized images that only `image auto` can fetch
+PERSONALIZED_FROM = 17
+
+# Mounted image signatures as printed by `ios image list`
+SIGNATURE = re.compile(r"\b[0-9A-Fa-f]{32,}\b")
+
+
+def parse_product_version(stdout: str) -> Optional[str]:
+    """ProductVersion from `ios info` output (may contain log lines before the JSON)"""
+    for line in stdout.splitlines():
+        line = line.strip()
+        if not line.startswith('{') or 'ProductVersion' not in line:
+            continue
+        try:
+            version = json.loads(line).get("ProductVersion")
+        except json.JSONDecodeError:
+            continue
+        if version:
+            return str(version)
+    return None
+
+
+@dataclass
+class MountResult:
+    """Outcome of ensure_mounted()"""
+    udid: str
+    status: str  # 'cached' | 'mounted' | 'failed'
+    version: Optional[str] = None
+    image: Optional[str] = None
+    duration: float = 0.0
+    detail: str = ""
+
+    @property
+    def ok(self) -> bool:
+        return self.status in ('cached', 'mounted')
+
+
+class DiskImageManager:
+    """Mount-state cache in front of `ios image mount` / `ios image auto`"""
+
+    def __init__(self, executor: GoIosExecutor, image_dir: Optional[Path] = None,
+                 cache_file: Optional[Path] = None, max_age: float = 12 * 3600,
+                 inventory: Optional[DeviceInventory] = None, listen_grace: float = 2.0):
+        self.executor = executor
+        self.image_dir = Path(image_dir) if image_dir else ROOT / "devimages"
+        self.cache_file = Path(cache_file) if cache_file else ROOT / "logs" / "ddi_cache.json"
+        self.max_age = max_age
+        self.inventory = inventory
+        self.listen_grace = listen_grace
+
+        self._lock = threading.Lock()
+        self._cache: Dict[str, Dict[str, Any]] = self._load()
+        self._unsubscribe: Optional[Callable[[], None]] = None
+        if inventory is not None:
+            self._unsubscribe = inventory.subscribe(self._on_devices_changed)
+
+    # ---- cache ----
+
+    def is_mounted(self, udid: str, version: Optional[str] = None) -> bool:
+        """Cheap check against the cache only; no go-ios process is started.
+        Only entries whose usbmux DeviceID matches the attached device count"""
+        return self._cache_check(udid, version) is True
+
+    def _cache_check(self, udid: str, version: Optional[str] = None) -> Optional[bool]:
+        """True: entry confirmed by the DeviceID; False: no usable entry; None: entry the cache cannot confirm"""
+        with self._lock:
+            entry = self._cache.get(udid)
+        if not entry:
+            return False
+        if version is not None and entry.get('version') != version:
+            return False
+        if time.time() - entry.get('mounted_at', 0) > self.max_age:
+            return False
+        recorded_id = entry.get('device_id')
+        current_id = None
+        if recorded_id is not None and self.inventory is not None:
+            current_id = self.inventory.wait_device_id(udid, self.listen_grace)
+        if recorded_id is None or current_id is None:
+            # Recorded without `ios listen`, or it has not reported the device yet: a reboot would go unnoticed
+            return None
+        if current_id != recorded_id:
+            # A different usbmux DeviceID means the device re-attached (e.g. rebooted) since the mount
+            self.invalidate(udid)
+            return False
+        return True
+
+    def images_listed(self, udid: str, timeout: float = 15) -> bool:
+        """Ask the device: True when `ios image list` reports a mounted image signature"""
+        success, stdout, _ = self.executor.run(["image", "list", "--udid", udid], timeout=timeout, use_cache=False)
+        return success and any(sig != udid for sig in SIGNATURE.findall(stdout))
+
+    def invalidate(self, udid: Optional[str] = None):
+        """Forget one device (or all of them)"""
+        with self._lock:
+            if udid is None:
+                self._cache.clear()
+            elif self._cache.pop(udid, None) is None:
+                return
+        self._save()
+
+    def _record(self, udid: str, version: Optional[str], image: Optional[str]):
+        entry = {
+            'version': version,
+            'image': image,
+            'mounted_at': time.time(),
+            'device_id': self.inventory.device_id(udid) if self.inventory is not None else None,
+        }
+        with self._lock:
+            self._cache[udid] = entry
+        self._save()
+
+    def _on_devices_changed(self, devices, added, removed):
+        for udid in removed:
+            self.invalidate(udid)
+
+    def _load(self) -> Dict[str, Dict[str, Any]]:
+        try:
+            data = json.loads(self.cache_file.read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            return {}
+        return {k: v for k, v in data.items() if isinstance(v, dict)}
+
+    def _save(self):
+        with self._lock:
+            data = json.dumps(self._cache, indent=2)
+        try:
+            self.cache_file.parent.mkdir(parents=True, exist_ok=True)
+            self.cache_file.write_text(data, encoding="utf-8")
+        except OSError:
+            pass
+
+    # ---- images ----
+
+    def device_version(self, udid: str, timeout: float = 30) -> Optional[str]:
+        """iOS version from `ios info` (cached by the executor)"""
+        success, stdout, _ = self.executor.run(["info", "--udid", udid], timeout=timeout)
+        return parse_product_version(stdout) if success else None
+
+    def image_for(self, version: Optional[str]) -> Optional[Path]:
+        """devimages/<version>/DeveloperDiskImage.dmg, trying 15.7.1 -> 15.7 -> 15 (no directory scan)"""
+        if not version:
+            return None
+        parts = version.split('.')
+        for n in range(len(parts), 0, -1):
+            dmg = self.image_dir / '.'.join(parts[:n]) / DMG_NAME
+            if dmg.is_file():
+                return dmg
+        return None
+
+    # ---- mounting ----
+
+    def ensure_mounted(self, udid: str, timeout: float = 120) -> MountResult:
+        """Skip when cached; otherwise mount the matching local image, or fall back to `image auto`"""
+        start = time.perf_counter()
+        with self._lock:
+            cached = self._cache.get(udid, {})
+        check = self._cache_check(udid)
+        if check is None:
+            # One short go-ios call instead of trusting an entry that may predate a reboot
+            check = self.images_listed(udid)
+            if check:
+                self._record(udid, cached.get('version'), cached.get('image'))
+            else:
+                self.invalidate(udid)
+        if check:
+            return MountResult(udid, 'cached', cached.get('version'), cached.get('image'),
+                               time.perf_counter() - start)
+
+        version = self.device_version(udid)
+        image = self.image_for(version)
+        major = int(version.split('.')[0]) if version and version.split('.')[0].isdigit() else 0
+        if image is not None and major < PERSONALIZED_FROM:
+            args = ["image", "mount", f"--path={image}", "--udid", udid]
+        else:
+            args = ["image", "auto", f"--basedir={self.image_dir}", "--udid", udid]
+        success, stdout, stderr = self.executor.run(args, timeout=timeout, use_cache=False)
+        output = (stdout + stderr).lower()
+        if success or "already mounted" in output or "already a developer image mounted" in output:
+            self._record(udid, version, str(image) if image else None)
+            return MountResult(udid, 'mounted', version, str(image) if image else None,
+                               time.perf_counter() - start)
+
+        lines = (stderr or stdout).strip().splitlines()
+        return MountResult(udid, 'failed', version, str(image) if image else None,
+                           time.perf_counter() - start, lines[-1] if lines else "non-zero exit code")
+
+    def close(self):
+        if self._unsubscribe is not None:
+            self._unsubscribe()
+            self._unsubscribe = None
@@ -0,0 +1,409 @@
+#!/usr/bin/env python3
+"""
+Control Engine for Appium iOS Automation
+GUI-independent core of the control panel: configuration, status probes,
+device inventory, service start/stop and connection tests. The Tk panel
+and the CLI daemon are both thin views that subscribe to its log and
+status events
+"""
+
+import threading
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional
+
+from e2eios.utils.devices import DeviceInventory
+from e2eios.utils.disk_image import DiskImageManager
+from e2eios.utils.env import load_env
+from e2eios.utils.goios import get_executor
+from e2eios.utils.http_client import get_http_pool
+from e2eios.utils.log_reader import LogEntry, LogWatcher, ServiceLogs
+from e2eios.utils.probe_schedule import ProbeScheduler, ScheduleConfig
+from e2eios.utils.probes import Probe, ProbeSnapshot, get_probe_engine, http_status_probe, url_port_probe
+from e2eios.utils.supervisor import ServiceSupervisor, StartupReport, default_stages
+
+ROOT = Path(__file__).resolve().parents[2]
+ENV_FILE = ROOT / "e2eios" / "config" / ".env"
+
+# log listener(message, level); status listener(snapshot)
+LogListener = Callable[[str, str], None]
+StatusListener = Callable[[ProbeSnapshot], None]
+
+
+class ControlEngine:
+    """Status, devices and services without any UI"""
+
+    def __init__(self, env: Optional[Dict[str, str]] = None, env_file: Path = ENV_FILE):
+        # Load configuration
+        self.env = env if env is not None else load_env(env_file)
+        self.appium_url = self.env.get("APPIUM_URL", "http://127.0.0.1:4723")
+        self.wda_url = self.env.get("WDA_URL", "http://127.0.0.1:8200")
+        self.udid = self.env.get("IOS_UDID", "")
+        self.go_ios_path = self.env.get("GO_IOS_EXE", "C:\\tools\\go-ios\\ios.exe")
+        get_http_pool().configure(self.env)
+
+        # Status variables
+        self.is_connected = False
+        self.services_running = False
+        self.starting = False
+        self.last_snapshot: Optional[ProbeSnapshot] = None
+        self.probe_engine = get_probe_engine()
+        # Per-probe adaptive intervals and circuit breakers for the status monitor
+        self.probe_schedule = ProbeScheduler(ScheduleConfig.from_env(self.env))
+
+        self._lock = threading.Lock()
+        self._log_listeners: List[LogListener] = []
+        self._status_listeners: List[StatusListener] = []
+        self._monitor_thread: Optional[threading.Thread] = None
+        self._stopped = threading.Event()
+        self._wake_monitor = threading.Event()
+
+        # Every go-ios invocation goes through one executor (concurrency cap + dedup)
+        self.go_ios = get_executor(self.go_ios_path, int(self.env.get("GO_IOS_MAX_PROCS", "4")))
+
+        # Device inventory follows `ios listen` instead of polling `ios list`
+        self.inventory = DeviceInventory(self.go_ios, ttl=float(self.env.get("DEVICE_LIST_TTL", "10")))
+        self.inventory.subscribe(self._on_devices_changed)
+
+        # Image/forward/WDA processes are started and stopped by PID, not via start.ps1/taskkill
+        self.supervisor = ServiceSupervisor(self.go_ios, log=self.log)
+        self.disk_images = DiskImageManager(self.go_ios, inventory=self.inventory)
+
+        # Indexed go-ios/WDA log files; LOG_WATCH=warning|error echoes new lines as engine messages
+        self.service_logs = ServiceLogs(self.supervisor.log_dir)
+        self.log_watcher: Optional[LogWatcher] = None
+
+        # Optional Prometheus endpoint fed by the status monitor (METRICS_PORT=9108)
+        self.metrics = None
+        self.metrics_server = None
+        if self.env.get("METRICS_PORT"):
+            from e2eios.utils.metrics import MonitorMetrics
+            self.metrics = MonitorMetrics()
+            self.metrics.track_schedule(self.probe_schedule)
+            self.metrics.track_executor(self.go_ios)
+            self.metrics.track_supervisor(self.supervisor)
+
+    @property
+    def monitor_interval(self) -> float:
+        return self.probe_schedule.config.base
+
+    @monitor_interval.setter
+    def monitor_interval(self, seconds: float):
+        self.probe_schedule.config.base = seconds
+
+    # ---- events ----
+
+    def on_log(self, listener: LogListener) -> Callable[[], None]:
+        """Receive every engine message; returns an unsubscribe function"""
+        return self._add_listener(self._log_listeners, listener)
+
+    def on_status(self, listener: StatusListener) -> Callable[[], None]:
+        """Receive every status snapshot; returns an unsubscribe function"""
+        return self._add_listener(self._status_listeners, listener)
+
+    def _add_listener(self, listeners: list, listener) -> Callable[[], None]:
+        with self._lock:
+            listeners.append(listener)
+
+        def unsubscribe():
+            with self._lock:
+                if listener in listeners:
+                    listeners.remove(listener)
+        return unsubscribe
+
+    def log(self, message: str, level: str = "info"):
+        with self._lock:
+            listeners = list(self._log_listeners)
+        for listener in listeners:
+            try:
+                listener(message, level)
+            except Exception as e:
+                print(f"Log listener error: {e}")
+
+    def _emit_status(self, snapshot: ProbeSnapshot):
+        with self._lock:
+            listeners = list(self._status_listeners)
+        for listener in listeners:
+            try:
+                listener(snapshot)
+            except Exception as e:
+                print(f"Status listener error: {e}")
+
+    # ---- lifecycle ----
+
+    def start(self, monitor: bool = True):
+        """Start the device stream, the metrics endpoint and (optionally) the status monitor"""
+        self.inventory.start()
+        if self.metrics is not None and self.metrics_server is None:
+            from e2eios.utils.metrics import start_metrics_server
+            try:
+                self.metrics_server = start_metrics_server(self.metrics, int(self.env["METRICS_PORT"]),
+                                                           self.env.get("METRICS_HOST", "127.0.0.1"))
+                self.log(f"📈 Metrics available at {self.metrics_server.url}")
+            except OSError as e:
+                self.log(f"⚠️ Could not start metrics endpoint: {e}", "warning")
+        if self.env.get("LOG_WATCH"):
+            self.start_log_watch(self.env["LOG_WATCH"])
+        if monitor:
+            self.start_status_monitor()
+
+    def close(self):
+        self._stopped.set()
+        self._wake_monitor.set()
+        self.inventory.stop()
+        self.stop_log_watch()
+        if self.metrics_server is not None:
+            self.metrics_server.stop()
+            self.metrics_server = None
+
+    # ---- devices ----
+
+    def run_go_ios_command(self, args, timeout=30):
+        """Run go-ios command and return result"""
+        return self.go_ios.run(args, timeout=timeout)
+
+    def list_devices(self, refresh: bool = False) -> List[str]:
+        """List connected iOS devices from the in-memory inventory"""
+        return self.inventory.devices(refresh=refresh)
+
+    def _on_devices_changed(self, devices, added, removed):
+        """Inventory callback: log attach/detach events"""
+        for udid in sorted(added):
+            self.log(f"📱 Device attached: {udid}")
+        for udid in sorted(removed):
+            self.log(f"⚠️ Device detached: {udid}", "warning")
+
+    def refresh_devices(self, refresh: bool = True) -> List[str]:
+        """Re-list devices and auto-detect the UDID when none is configured"""
+        self.log("Refreshing device list...")
+        devices = self.list_devices(refresh=refresh)
+        if devices:
+            self.log(f"Found {len(devices)} device(s):")
+            for device in devices:
+                self.log(f"  - {device}")
+            if not self.udid and devices[0]:
+                self.udid = devices[0]
+                self.log(f"Auto-detected device UDID: {self.udid}", "success")
+        else:
+            self.log("No devices found. Make sure your iOS device is connected and trusted.")
+        return devices
+
+    # ---- status ----
+
+    def device_probe(self, timeout=30) -> Probe:
+        """Probe that lists devices and checks the configured UDID is attached"""
+        def check(t):
+            devices = self.list_devices()
+            connected = bool(self.udid) and any(self.udid in device for device in devices)
+            return connected, devices
+        return Probe("device", check, timeout)
+
+    def status_probes(self) -> List[Probe]:
+        """Probes run on every status monitor tick"""
+        probes = [
+            http_status_probe("appium", self.appium_url, timeout=5),
+            # WDA: just port check since it might not have /status endpoint
+            url_port_probe("wda", self.wda_url, timeout=2, default_port=8200),
+        ]
+        if self.udid:
+            probes.append(self.device_probe())
+        return probes
+
+    def check_status(self, due_only: bool = False) -> ProbeSnapshot:
+        """One probe round (all probes, or only the scheduled ones); updates the flags and notifies listeners"""
+        probes = self.status_probes()
+        if due_only:
+            due = self.probe_schedule.due(p.name for p in probes)
+            probes = [p for p in probes if p.name in due]
+        # All probes run concurrently; the round costs as much as the slowest one
+        snapshot = self.probe_engine.run(probes)
+        for message, level in self.probe_schedule.record(snapshot):
+            self.log(message, level)
+        if self.metrics is not None:
+            self.metrics.observe(snapshot)
+        # Probes that were not due keep their last result
+        snapshot = self.probe_schedule.merge(snapshot)
+        self.is_connected = "device" in snapshot and snapshot["device"].ok
+        self.services_running = snapshot["appium"].ok and snapshot["wda"].ok
+        self.last_snapshot = snapshot
+        self._emit_status(snapshot)
+        return snapshot
+
+    def status(self, snapshot: Optional[ProbeSnapshot] = None) -> Dict[str, Any]:
+        """JSON-serializable status (runs a probe round if none was given)"""
+        snapshot = snapshot or self.check_status()
+        data = snapshot.to_dict()
+        data.update({
+            'udid': self.udid or None,
+            'is_connected': self.is_connected,
+            'services_running': self.services_running,
+            'devices': self.list_devices(),
+            'services': self.supervisor.status(),
+            'schedule': self.probe_schedule.stats(),
+        })
+        return data
+
+    def start_status_monitor(self):
+        """Start status monitoring; each probe runs on its own adaptive schedule"""
+        if self._monitor_thread is not None:
+            return
+        self._stopped.clear()
+
+        def monitor():
+            while not self._stopped.is_set():
+                try:
+                    self.check_status(due_only=True)
+                    delay = self.probe_schedule.next_delay()
+                except Exception as e:
+                    print(f"Status monitor error: {e}")
+                    delay = 10
+                self._wake_monitor.wait(delay)
+                self._wake_monitor.clear()
+
+        self._monitor_thread = threading.Thread(target=monitor, name="status-monitor", daemon=True)
+        self._monitor_thread.start()
+
+    def recheck_status(self):
+        """Poll every probe soon and fast again (services were just started or stopped)"""
+        self.probe_schedule.reset()
+        self._wake_monitor.set()
+
+    # ---- service logs ----
+
+    @property
+    def log_watch_running(self) -> bool:
+        return self.log_watcher is not None and self.log_watcher.running
+
+    def start_log_watch(self, level: str = "warning"):
+        """Follow the service log files and log every new warning/error line"""
+        if self.log_watch_running:
+            return
+
+        def forward(entry: LogEntry):
+            self.log(f"📜 [{entry.source}] {entry.message}", entry.level)
+
+        self.log_watcher = LogWatcher(self.service_logs, forward, level=level).start()
+        self.log(f"📜 Following {self.service_logs.log_dir} for new {level} lines")
+
+    def stop_log_watch(self):
+        if self.log_watcher is not None:
+            self.log_watcher.stop()
+            self.log_watcher = None
+
+    def toggle_log_watch(self) -> bool:
+        """Start or stop following the service logs; returns whether it is now running"""
+        if self.log_watch_running:
+            self.stop_log_watch()
+            self.log("📜 Stopped following service logs")
+            return False
+        self.start_log_watch(self.env.get("LOG_WATCH") or "warning")
+        return True
+
+    def recent_errors(self, minutes: float = 10, limit: int = 20) -> List[LogEntry]:
+        """Errors from the service logs in the last N minutes (served from the index)"""
+        return self.service_logs.errors(minutes, limit=limit)
+
+    # ---- services ----
+
+    def start_services(self) -> Optional[StartupReport]:
+        """Start DDI mount, forward and WDA through the service supervisor"""
+        if not self.udid:
+            self.log("❌ No device UDID configured!", "error")
+            return None
+        if self.starting:
+            self.log("⚠️ Service startup already in progress", "warning")
+            return None
+
+        self.starting = True
+        self.log("Starting services...")
+        try:
+            report = self.supervisor.start(default_stages(self.env, udid=self.udid, images=self.disk_images))
+        except Exception as e:
+            self.log(f"❌ Error starting services: {e}", "error")
+            return None
+        finally:
+            self.starting = False
+            self.recheck_status()
+
+        for line in report.timeline():
+            self.log(f"   {line}")
+        for result in report.results:
+            if result.ok:
+                continue
+            if result.name in report.optional:
+                self.log(f"⚠️ {result.name} {result.status}: {result.detail}", "warning")
+            else:
+                self.log(f"❌ {result.name} {result.status}: {result.detail}", "error")
+
+        if report.ok:
+            self.log(f"✅ Services ready in {report.elapsed:.1f}s", "success")
+            self.log("You can now run your automation scripts.")
+        else:
+            self.log("❌ Service startup failed! Check the logs folder.", "error")
+            for entry in self.recent_errors(minutes=5, limit=5):
+                self.log(f"   {entry.source}: {entry.message}", "error")
+        return report
+
+    def stop_services(self) -> List[str]:
+        """Stop the processes started by the supervisor"""
+        self.log("Stopping services...")
+        stopped: List[str] = []
+        try:
+            stopped = self.supervisor.stop()
+            if stopped:
+                self.log(f"✅ Stopped {', '.join(stopped)}", "success")
+            else:
+                self.log("No supervised services were running")
+
+            # Note: Appium should be stopped manually if running
+            self.log("ℹ️ Please stop Appium server manually if running")
+
+        except Exception as e:
+            self.log(f"⚠️ Error stopping services: {e}", "warning")
+        self.recheck_status()
+        return stopped
+
+    def test_connection(self) -> ProbeSnapshot:
+        """Test connection to device and services"""
+        self.log("Testing connections...")
+
+        probes = [
+            http_status_probe("appium", self.appium_url, timeout=5),
+            http_status_probe("wda", self.wda_url, timeout=5),
+        ]
+        if self.is_connected:
+            def device_info(t):
+                success, stdout, stderr = self.run_go_ios_command(["info", "--udid", self.udid], timeout=t)
+                return success, stdout
+            probes.append(Probe("device_info", device_info, timeout=30))
+        snapshot = self.probe_engine.run(probes)
+
+        # Test device connection
+        if self.is_connected:
+            self.log("✅ Device connected", "success")
+            if snapshot["device_info"].ok:
+                self.log("✅ Device info retrieved successfully", "success")
+            else:
+                self.log("⚠️ Could not retrieve device info", "warning")
+        else:
+            self.log("❌ Device not connected", "error")
+
+        # Test Appium service
+        appium = snapshot["appium"]
+        if appium.ok:
+            self.log(f"✅ Appium server responding ({appium.latency * 1000:.0f} ms)", "success")
+        elif appium.status_code is not None:
+            self.log("❌ Appium server not responding", "error")
+        else:
+            self.log("❌ Cannot connect to Appium server", "error")
+
+        # Test WDA service
+        wda = snapshot["wda"]
+        if wda.ok:
+            self.log(f"✅ WebDriverAgent responding ({wda.latency * 1000:.0f} ms)", "success")
+        elif wda.status_code is not None:
+            self.log("❌ WebDriverAgent not responding", "error")
+        else:
+            self.log("❌ Cannot connect to WebDriverAgent", "error")
+
+        self.log(f"Connection test completed in {snapshot.elapsed:.2f}s")
+        return snapshot
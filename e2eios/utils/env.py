@@ -1,14 +1,21 @@
+import os
 from pathlib import Path
 
+# Process environment variables with this prefix override .env values,
+# e.g. E2EIOS_IOS_UDID=... replaces IOS_UDID (used to run a script per device)
+OVERRIDE_PREFIX = "E2EIOS_"
+
 def load_env(path):
     env = {}
     p = Path(path)
-    if not p.exists():
-        return env
-    for raw in p.read_text(encoding="utf-8").splitlines():
-        line = raw.strip()
-        if not line or line.startswith("#") or "=" not in line:
-            continue
-        k, v = line.split("=", 1)
-        env[k.strip()] = v.strip().strip('"').strip("'")
+    if p.exists():
+        for raw in p.read_text(encoding="utf-8").splitlines():
+            line = raw.strip()
+            if not line or line.startswith("#") or "=" not in line:
+                continue
+            k, v = line.split("=", 1)
+            env[k.strip()] = v.strip().strip('"').strip("'")
+    for k, v in os.environ.items():
+        if k.startswith(OVERRIDE_PREFIX) and len(k) > len(OVERRIDE_PREFIX):
+            env[k[len(OVERRIDE_PREFIX):]] = v
     return env
@@ -0,0 +1,187 @@
+#!/usr/bin/env python3
+"""
+Human-like Gestures for Appium iOS Automation
+Builds tap, swipe, scroll, drag and pinch paths with NumPy (Bezier curves,
+minimum-jerk velocity profile, tapered jitter) in one vectorized step per
+gesture, and sends each gesture as a single W3C Actions request. A seeded
+GestureEngine produces the same paths on every run
+"""
+
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+
+# Selenium's Command.W3C_ACTIONS, as a plain string so this module doesn't need selenium
+W3C_ACTIONS = "actions"
+
+Point = Tuple[float, float]
+Area = Tuple[float, float, float, float]  # x, y, width, height
+
+
+def minimum_jerk(t: np.ndarray) -> np.ndarray:
+    """Progress along the path for normalized time t: slow start, fast middle, slow end"""
+    return t ** 3 * (10 - 15 * t + 6 * t ** 2)
+
+
+def cubic_bezier(p0, p1, p2, p3, s: np.ndarray) -> np.ndarray:
+    """Points on a cubic Bezier curve for parameters s (n,) -> (n, 2)"""
+    s = s[:, None]
+    u = 1 - s
+    return (u ** 3) * p0 + 3 * (u ** 2) * s * p1 + 3 * u * (s ** 2) * p2 + (s ** 3) * p3
+
+
+@dataclass
+class Gesture:
+    """Finger paths sampled on a shared timeline: points (fingers, n, 2), durations (n,) in ms"""
+    name: str
+    points: np.ndarray
+    durations: np.ndarray
+    hold_ms: int = 0
+    settle_ms: int = 0
+
+    @property
+    def fingers(self) -> int:
+        return self.points.shape[0]
+
+    @property
+    def duration_ms(self) -> int:
+        return int(self.durations.sum()) + self.hold_ms + self.settle_ms
+
+    def compact(self) -> "Gesture":
+        """Drop samples where no finger moved to a new pixel, keeping the timeline intact"""
+        if self.points.shape[1] <= 2:
+            return self
+        moved = np.any(self.points[:, 1:] != self.points[:, :-1], axis=(0, 2))
+        keep = np.concatenate(([True], moved))
+        keep[-1] = True
+        elapsed = np.cumsum(self.durations)[keep]
+        durations = np.diff(elapsed, prepend=0)
+        durations[0] = self.durations[0]
+        return Gesture(self.name, self.points[:, keep], durations, self.hold_ms, self.settle_ms)
+
+    def to_actions(self) -> Dict[str, Any]:
+        """W3C Actions payload: one touch pointer per finger, all tracks the same length so they move together"""
+        gesture = self.compact()
+        durations = gesture.durations.tolist()
+        sources = []
+        for finger, track in enumerate(gesture.points.tolist()):
+            (x0, y0), rest = track[0], track[1:]
+            actions: List[Dict[str, Any]] = [
+                {'type': 'pointerMove', 'duration': 0, 'x': x0, 'y': y0, 'origin': 'viewport'},
+                {'type': 'pointerDown', 'button': 0},
+            ]
+            if gesture.hold_ms:
+                actions.append({'type': 'pause', 'duration': gesture.hold_ms})
+            actions.extend({'type': 'pointerMove', 'duration': d, 'x': x, 'y': y, 'origin': 'viewport'}
+                           for (x, y), d in zip(rest, durations[1:]))
+            if gesture.settle_ms:
+                actions.append({'type': 'pause', 'duration': gesture.settle_ms})
+            actions.append({'type': 'pointerUp', 'button': 0})
+            sources.append({'type': 'pointer', 'id': f"finger{finger + 1}",
+                            'parameters': {'pointerType': 'touch'}, 'actions': actions})
+        return {'actions': sources}
+
+
+class GestureEngine:
+    """Generates gestures; the same seed always gives the same paths"""
+
+    def __init__(self, seed: Optional[int] = None, rate: float = 60.0, jitter: float = 1.5,
+                 curvature: float = 0.12, screen: Optional[Tuple[int, int]] = None):
+        self.rng = np.random.default_rng(seed)
+        self.rate = rate            # samples per second along a path
+        self.jitter = jitter        # hand tremor, pixels (standard deviation)
+        self.curvature = curvature  # sideways bow of a path, as a fraction of its length
+        self.screen = screen        # (width, height) to clip points to, in points
+
+    # ---- building blocks ----
+
+    def _timeline(self, duration: float, samples: Optional[int]) -> Tuple[np.ndarray, np.ndarray]:
+        n = samples or max(2, int(round(duration * self.rate)) + 1)
+        t = np.linspace(0.0, 1.0, n)
+        # Rounding the cumulative time keeps the total exact while every step is whole milliseconds
+        elapsed = np.round(t * duration * 1000).astype(np.int64)
+        return t, np.diff(elapsed, prepend=0)
+
+    def _finish(self, points: np.ndarray) -> np.ndarray:
+        points = np.rint(points)
+        if self.screen is not None:
+            width, height = self.screen
+            points[..., 0] = np.clip(points[..., 0], 0, width - 1)
+            points[..., 1] = np.clip(points[..., 1], 0, height - 1)
+        return points.astype(np.int64)
+
+    def _tremor(self, t: np.ndarray, fingers: int = 1) -> np.ndarray:
+        """Jitter that fades out at both ends so the path still starts and ends where asked"""
+        taper = np.sin(np.pi * t)[None, :, None]
+        return self.rng.normal(0.0, self.jitter, (fingers, len(t), 2)) * taper
+
+    def path(self, start: Point, end: Point, duration: float, samples: Optional[int] = None) -> Tuple[np.ndarray, np.ndarray]:
+        """(points (n, 2), durations (n,)) along a bowed Bezier curve with a minimum-jerk speed profile"""
+        p0 = np.asarray(start, dtype=float)
+        p3 = np.asarray(end, dtype=float)
+        delta = p3 - p0
+        length = float(np.hypot(*delta)) or 1.0
+        normal = np.array([-delta[1], delta[0]]) / length
+        bends = self.rng.normal(0.0, self.curvature * length, 2)
+        p1 = p0 + delta * 0.3 + normal * bends[0]
+        p2 = p0 + delta * 0.7 + normal * bends[1]
+
+        t, durations = self._timeline(duration, samples)
+        points = cubic_bezier(p0, p1, p2, p3, minimum_jerk(t)) + self._tremor(t)[0]
+        return points, durations
+
+    # ---- gestures ----
+
+    def tap(self, x: float, y: float, press: Tuple[float, float] = (0.05, 0.12)) -> Gesture:
+        """Press and release near (x, y) with a human press time"""
+        offset = self.rng.normal(0.0, self.jitter, 2)
+        points = self._finish(np.array([[[x, y]]], dtype=float) + offset)
+        hold = int(self.rng.uniform(*press) * 1000)
+        return Gesture("tap", points, np.zeros(1, dtype=np.int64), hold_ms=hold)
+
+    def swipe(self, start: Point, end: Point, duration: float = 0.35, samples: Optional[int] = None) -> Gesture:
+        points, durations = self.path(start, end, duration * self.rng.uniform(0.9, 1.1), samples)
+        return Gesture("swipe", self._finish(points[None]), durations)
+
+    def scroll(self, direction: str = "down", area: Optional[Area] = None, distance: float = 0.6,
+               duration: float = 0.45) -> Gesture:
+        """Scroll the content in `direction` (the finger moves the other way) within area or the screen"""
+        if area is None:
+            if self.screen is None:
+                raise ValueError("scroll() needs an area or an engine with a screen size")
+            area = (0, 0, self.screen[0], self.screen[1])
+        x, y, width, height = area
+        cx = x + width * self.rng.uniform(0.4, 0.6)
+        cy = y + height * self.rng.uniform(0.4, 0.6)
+        vectors = {'down': (0, -1), 'up': (0, 1), 'right': (-1, 0), 'left': (1, 0)}
+        if direction not in vectors:
+            raise ValueError(f"Unknown scroll direction: {direction}")
+        dx, dy = vectors[direction]
+        half = np.array([dx * width, dy * height]) * distance / 2
+        gesture = self.swipe((cx - half[0], cy - half[1]), (cx + half[0], cy + half[1]), duration)
+        gesture.name = f"scroll-{direction}"
+        return gesture
+
+    def drag(self, start: Point, end: Point, duration: float = 0.8, hold: float = 0.6) -> Gesture:
+        """Long-press to pick up, move, and pause briefly before dropping"""
+        points, durations = self.path(start, end, duration)
+        return Gesture("drag", self._finish(points[None]), durations, hold_ms=int(hold * 1000),
+                       settle_ms=int(self.rng.uniform(0.08, 0.2) * 1000))
+
+    def pinch(self, center: Point, start_radius: float, end_radius: float, duration: float = 0.5,
+              samples: Optional[int] = None) -> Gesture:
+        """Two fingers on opposite sides of center; end_radius > start_radius zooms in"""
+        t, durations = self._timeline(duration, samples)
+        radius = start_radius + (end_radius - start_radius) * minimum_jerk(t)
+        angle = self.rng.uniform(0, np.pi)
+        direction = np.array([np.cos(angle), np.sin(angle)])
+        offsets = radius[:, None] * direction
+        c = np.asarray(center, dtype=float)
+        points = np.stack([c + offsets, c - offsets]) + self._tremor(t, fingers=2)
+        return Gesture("pinch", self._finish(points), durations)
+
+
+def perform(driver, gesture: Gesture) -> Any:
+    """Send the whole gesture in one W3C Actions request (driver: Appium/Selenium WebDriver)"""
+    return driver.execute(W3C_ACTIONS, gesture.to_actions())
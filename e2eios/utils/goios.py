@@ -0,0 +1,223 @@
+#!/usr/bin/env python3
+"""
+go-ios Command Executor for Appium iOS Automation
+Runs go-ios commands on an asyncio subprocess backend with a cap on
+concurrent child processes, coalescing of identical in-flight commands,
+a short-lived cache for read-only commands and per-command timing
+"""
+
+import asyncio
+import subprocess
+import threading
+import time
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+Result = Tuple[bool, str, str]
+
+# Read-only commands whose output can be reused for a few seconds
+DEFAULT_CACHE_TTLS = {
+    'info': 30.0,
+    'version': 300.0,
+}
+
+
+class CommandStats:
+    """Timing counters for one go-ios command"""
+
+    def __init__(self):
+        self.calls = 0
+        self.executed = 0
+        self.failures = 0
+        self.cache_hits = 0
+        self.coalesced = 0
+        self.total_time = 0.0
+        self.max_time = 0.0
+        self.last_time = 0.0
+
+    def record(self, duration: float, success: bool):
+        self.executed += 1
+        self.total_time += duration
+        self.max_time = max(self.max_time, duration)
+        self.last_time = duration
+        if not success:
+            self.failures += 1
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            'calls': self.calls,
+            'executed': self.executed,
+            'failures': self.failures,
+            'cache_hits': self.cache_hits,
+            'coalesced': self.coalesced,
+            'total_time': round(self.total_time, 4),
+            'avg_time': round(self.total_time / self.executed, 4) if self.executed else 0.0,
+            'max_time': round(self.max_time, 4),
+            'last_time': round(self.last_time, 4),
+        }
+
+
+class GoIosExecutor:
+    """Single entry point for every go-ios invocation"""
+
+    def __init__(self, go_ios_path: str, max_concurrency: int = 4,
+                 cache_ttls: Optional[Dict[str, float]] = None):
+        self.go_ios_path = go_ios_path
+        self.max_concurrency = max_concurrency
+        self.cache_ttls = dict(DEFAULT_CACHE_TTLS if cache_ttls is None else cache_ttls)
+
+        self._lock = threading.Lock()
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._semaphore: Optional[asyncio.Semaphore] = None
+        self._inflight: Dict[Tuple[str, ...], asyncio.Future] = {}
+        self._cache: Dict[Tuple[str, ...], Tuple[float, Result]] = {}
+        self._stats: Dict[str, CommandStats] = {}
+        self._running = 0
+        self._spawned: List[subprocess.Popen] = []
+
+    # ---- event loop ----
+
+    def _ensure_loop(self) -> asyncio.AbstractEventLoop:
+        with self._lock:
+            if self._loop is None:
+                loop = asyncio.new_event_loop()
+                ready = threading.Event()
+
+                def serve():
+                    asyncio.set_event_loop(loop)
+                    self._semaphore = asyncio.Semaphore(self.max_concurrency)
+                    ready.set()
+                    loop.run_forever()
+
+                threading.Thread(target=serve, name="go-ios-executor", daemon=True).start()
+                ready.wait()
+                self._loop = loop
+            return self._loop
+
+    # ---- public API ----
+
+    def run(self, args: Sequence[str], timeout: float = 30, use_cache: bool = True) -> Result:
+        """Run a go-ios command and block until it finishes; returns (success, stdout, stderr)"""
+        loop = self._ensure_loop()
+        future = asyncio.run_coroutine_threadsafe(self.run_async(args, timeout, use_cache), loop)
+        try:
+            return future.result(timeout=timeout + 5)
+        except Exception as e:
+            return False, "", str(e)
+
+    async def run_async(self, args: Sequence[str], timeout: float = 30, use_cache: bool = True) -> Result:
+        """Coroutine version of run(); must be awaited on the executor loop"""
+        key = tuple(str(a) for a in args)
+        stats = self._stats_for(key)
+        stats.calls += 1
+
+        ttl = self.cache_ttls.get(key[0] if key else '', 0)
+        if use_cache and ttl:
+            cached = self._cache.get(key)
+            if cached and time.monotonic() - cached[0] < ttl:
+                stats.cache_hits += 1
+                return cached[1]
+
+        # Identical command already running: share its result
+        shared = self._inflight.get(key)
+        if shared is not None:
+            stats.coalesced += 1
+            return await asyncio.shield(shared)
+
+        future = asyncio.get_running_loop().create_future()
+        self._inflight[key] = future
+        try:
+            result = await self._execute(key, timeout)
+            if ttl and result[0]:
+                self._cache[key] = (time.monotonic(), result)
+            future.set_result(result)
+            return result
+        except Exception as e:
+            future.set_exception(e)
+            # Nobody else may be waiting; retrieve it so asyncio doesn't warn
+            future.exception()
+            raise
+        finally:
+            if not future.done():
+                future.cancel()
+            self._inflight.pop(key, None)
+
+    def spawn(self, args: Sequence[str], **popen_kwargs) -> subprocess.Popen:
+        """Start a long-running go-ios process (listen, forward, runwda) tracked by the executor"""
+        proc = subprocess.Popen([self.go_ios_path] + [str(a) for a in args], **popen_kwargs)
+        with self._lock:
+            self._spawned = [p for p in self._spawned if p.poll() is None]
+            self._spawned.append(proc)
+        self._stats_for(tuple(str(a) for a in args)).calls += 1
+        return proc
+
+    def invalidate(self, command: Optional[str] = None):
+        """Drop cached results (all, or for one command such as 'info')"""
+        for key in list(self._cache):
+            if command is None or (key and key[0] == command):
+                self._cache.pop(key, None)
+
+    @property
+    def running(self) -> int:
+        """Number of short-lived commands currently executing"""
+        return self._running
+
+    @property
+    def spawned(self) -> int:
+        """Number of long-running processes still alive"""
+        with self._lock:
+            return sum(1 for p in self._spawned if p.poll() is None)
+
+    def stats(self) -> Dict[str, Dict[str, Any]]:
+        """Per-command timing and cache counters"""
+        return {name: s.to_dict() for name, s in sorted(self._stats.items())}
+
+    # ---- internals ----
+
+    def _stats_for(self, key: Tuple[str, ...]) -> CommandStats:
+        name = key[0] if key else ''
+        with self._lock:
+            if name not in self._stats:
+                self._stats[name] = CommandStats()
+            return self._stats[name]
+
+    async def _execute(self, key: Tuple[str, ...], timeout: float) -> Result:
+        stats = self._stats_for(key)
+        async with self._semaphore:
+            self._running += 1
+            start = time.perf_counter()
+            try:
+                result = await self._communicate(key, timeout)
+            finally:
+                self._running -= 1
+            stats.record(time.perf_counter() - start, result[0])
+            return result
+
+    async def _communicate(self, key: Tuple[str, ...], timeout: float) -> Result:
+        try:
+            proc = await asyncio.create_subprocess_exec(
+                self.go_ios_path, *key,
+                stdout=asyncio.subprocess.PIPE, stderr=asyncio.subprocess.PIPE,
+            )
+        except Exception as e:
+            return False, "", str(e)
+        try:
+            stdout, stderr = await asyncio.wait_for(proc.communicate(), timeout)
+        except asyncio.TimeoutError:
+            proc.kill()
+            await proc.wait()
+            return False, "", f"Command '{' '.join(key)}' timed out after {timeout} seconds"
+        return (proc.returncode == 0,
+                stdout.decode('utf-8', errors='replace'),
+                stderr.decode('utf-8', errors='replace'))
+
+
+_executors: Dict[str, GoIosExecutor] = {}
+_executors_lock = threading.Lock()
+
+
+def get_executor(go_ios_path: str, max_concurrency: int = 4) -> GoIosExecutor:
+    """Shared executor per go-ios binary"""
+    with _executors_lock:
+        if go_ios_path not in _executors:
+            _executors[go_ios_path] = GoIosExecutor(go_ios_path, max_concurrency)
+        return _executors[go_ios_path]
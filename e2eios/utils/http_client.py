@@ -0,0 +1,161 @@
+#!/usr/bin/env python3
+"""
+Pooled HTTP Client for Appium iOS Automation
+One keep-alive requests.Session per endpoint (Appium, WDA) with configurable
+pool sizes and timeouts, plus counters for reused versus new connections
+"""
+
+import threading
+from typing import Any, Dict, Optional
+from urllib.parse import urlparse
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.connectionpool import HTTPConnectionPool, HTTPSConnectionPool
+
+DEFAULT_POOL_SIZE = 4
+DEFAULT_TIMEOUT = 5.0
+
+
+class ConnectionCounters:
+    """Thread-safe request/connection counters for one endpoint"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.requests = 0
+        self.new_connections = 0
+
+    def add(self, requests_made: int = 0, new_connections: int = 0):
+        with self._lock:
+            self.requests += requests_made
+            self.new_connections += new_connections
+
+    @property
+    def reused_connections(self) -> int:
+        return max(0, self.requests - self.new_connections)
+
+    def to_dict(self) -> Dict[str, int]:
+        return {
+            'requests': self.requests,
+            'new_connections': self.new_connections,
+            'reused_connections': self.reused_connections,
+        }
+
+
+def _counting_pool(base, counters: ConnectionCounters):
+    """Subclass a urllib3 pool so it reports requests and fresh connections"""
+    class CountingPool(base):
+        def _new_conn(self):
+            counters.add(new_connections=1)
+            return super()._new_conn()
+
+        def _make_request(self, *args, **kwargs):
+            counters.add(requests_made=1)
+            return super()._make_request(*args, **kwargs)
+
+    return CountingPool
+
+
+class CountingAdapter(HTTPAdapter):
+    """HTTPAdapter whose connection pools feed a ConnectionCounters"""
+
+    def __init__(self, counters: ConnectionCounters, **kwargs):
+        self.counters = counters
+        super().__init__(**kwargs)
+
+    def init_poolmanager(self, *args, **kwargs):
+        super().init_poolmanager(*args, **kwargs)
+        self.poolmanager.pool_classes_by_scheme = {
+            'http': _counting_pool(HTTPConnectionPool, self.counters),
+            'https': _counting_pool(HTTPSConnectionPool, self.counters),
+        }
+
+
+class EndpointClient:
+    """Keep-alive session bound to one base URL"""
+
+    def __init__(self, base_url: str, pool_size: int = DEFAULT_POOL_SIZE,
+                 timeout: float = DEFAULT_TIMEOUT):
+        self.base_url = base_url.rstrip('/')
+        self.timeout = timeout
+        self.counters = ConnectionCounters()
+        self.session = requests.Session()
+        adapter = CountingAdapter(self.counters, pool_connections=1, pool_maxsize=pool_size)
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+
+    def url(self, path: str) -> str:
+        if path.startswith(('http://', 'https://')):
+            return path
+        return f"{self.base_url}/{path.lstrip('/')}"
+
+    def request(self, method: str, path: str, **kwargs) -> requests.Response:
+        kwargs.setdefault('timeout', self.timeout)
+        return self.session.request(method, self.url(path), **kwargs)
+
+    def get(self, path: str, **kwargs) -> requests.Response:
+        return self.request('GET', path, **kwargs)
+
+    def post(self, path: str, **kwargs) -> requests.Response:
+        return self.request('POST', path, **kwargs)
+
+    def delete(self, path: str, **kwargs) -> requests.Response:
+        return self.request('DELETE', path, **kwargs)
+
+    def stats(self) -> Dict[str, Any]:
+        return dict(self.counters.to_dict(), base_url=self.base_url)
+
+    def close(self):
+        self.session.close()
+
+
+class HttpClientPool:
+    """Registry of EndpointClients keyed by scheme://host:port"""
+
+    def __init__(self, pool_size: int = DEFAULT_POOL_SIZE, timeout: float = DEFAULT_TIMEOUT):
+        self.pool_size = pool_size
+        self.timeout = timeout
+        self._clients: Dict[str, EndpointClient] = {}
+        self._lock = threading.Lock()
+
+    def configure(self, env: Dict[str, str]):
+        """Read HTTP_POOL_SIZE / HTTP_TIMEOUT from a loaded .env"""
+        self.pool_size = int(env.get("HTTP_POOL_SIZE", self.pool_size))
+        self.timeout = float(env.get("HTTP_TIMEOUT", self.timeout))
+
+    def client(self, url: str) -> EndpointClient:
+        """Client for the endpoint that serves url"""
+        parsed = urlparse(url)
+        key = f"{parsed.scheme}://{parsed.netloc}"
+        with self._lock:
+            if key not in self._clients:
+                self._clients[key] = EndpointClient(key, self.pool_size, self.timeout)
+            return self._clients[key]
+
+    def stats(self) -> Dict[str, Dict[str, Any]]:
+        with self._lock:
+            return {key: c.stats() for key, c in self._clients.items()}
+
+    def close(self):
+        with self._lock:
+            for c in self._clients.values():
+                c.close()
+            self._clients.clear()
+
+
+_default_pool: Optional[HttpClientPool] = None
+_default_lock = threading.Lock()
+
+
+def get_http_pool() -> HttpClientPool:
+    """Process-wide client pool shared by every script"""
+    global _default_pool
+    with _default_lock:
+        if _default_pool is None:
+            _default_pool = HttpClientPool()
+        return _default_pool
+
+
+def get_client(url: str) -> EndpointClient:
+    """Keep-alive client for the endpoint serving url (e.g. APPIUM_URL, WDA_URL)"""
+    return get_http_pool().client(url)
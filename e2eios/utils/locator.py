@@ -0,0 +1,351 @@
+#!/usr/bin/env python3
+"""
+Local Locator Engine for Appium iOS Automation
+Fetches the page source once per screen state, indexes it by label, name,
+type and accessibility id, and resolves XPath / simple iOS predicate
+locators locally; only actions (and unresolvable locators) go to WDA
+"""
+
+import re
+import time
+import xml.etree.ElementTree as ET
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from e2eios.utils.logger import AppiumLogger, get_logger
+
+# AppiumBy values, as plain strings so this module doesn't need appium
+BY_PREDICATE = "-ios predicate string"
+BY_XPATH = "xpath"
+BY_ACCESSIBILITY_ID = "accessibility id"
+BY_NAME = "name"
+BY_CLASS_NAME = "class name"
+
+INDEXED_ATTRS = ('label', 'name', 'type')
+
+
+class LocatorError(Exception):
+    """Raised for locators the local engine cannot evaluate"""
+
+
+class LocalElement:
+    """Element resolved from the cached page source"""
+
+    def __init__(self, node: ET.Element, order: int):
+        self.node = node
+        self.order = order
+        self.attrs = node.attrib
+
+    @property
+    def type(self) -> str:
+        return self.attrs.get('type', self.node.tag)
+
+    @property
+    def name(self) -> Optional[str]:
+        return self.attrs.get('name')
+
+    @property
+    def label(self) -> Optional[str]:
+        return self.attrs.get('label')
+
+    @property
+    def rect(self) -> Dict[str, int]:
+        return {k: int(float(self.attrs.get(k, 0) or 0)) for k in ('x', 'y', 'width', 'height')}
+
+    @property
+    def center(self) -> Tuple[int, int]:
+        r = self.rect
+        return r['x'] + r['width'] // 2, r['y'] + r['height'] // 2
+
+    def get_attribute(self, name: str) -> Optional[str]:
+        return self.attrs.get(_attr_name(name))
+
+    def __repr__(self):
+        return f"<LocalElement {self.type} name={self.name!r} label={self.label!r}>"
+
+
+class PageIndex:
+    """Parsed page source with attribute indexes"""
+
+    def __init__(self, source: str):
+        self.source = source
+        self.root = ET.fromstring(source)
+        self.elements: List[LocalElement] = []
+        self._by_node: Dict[int, LocalElement] = {}
+        self.index: Dict[str, Dict[str, List[LocalElement]]] = {a: {} for a in INDEXED_ATTRS}
+        for order, node in enumerate(self.root.iter()):
+            if node is self.root and 'type' not in node.attrib:
+                continue
+            element = LocalElement(node, order)
+            self.elements.append(element)
+            self._by_node[id(node)] = element
+            for attr in INDEXED_ATTRS:
+                value = element.type if attr == 'type' else node.attrib.get(attr)
+                if value is not None:
+                    self.index[attr].setdefault(value, []).append(element)
+
+    def lookup(self, attr: str, value: str) -> List[LocalElement]:
+        return self.index.get(attr, {}).get(value, [])
+
+    def xpath(self, expression: str) -> List[LocalElement]:
+        path = expression.strip()
+        if path.startswith('//'):
+            path = '.' + path
+        elif path.startswith('/'):
+            path = '.' + path[path.index('/', 1):] if path.count('/') > 1 else '.'
+        try:
+            nodes = self.root.findall(path)
+        except (SyntaxError, KeyError) as e:
+            raise LocatorError(f"Unsupported XPath for local lookup: {expression} ({e})")
+        return [self._by_node[id(n)] for n in nodes if id(n) in self._by_node]
+
+
+# ---- iOS predicate subset ----
+
+_TOKEN = re.compile(r'''\s*(?:(?P<str>"(?:[^"\\]|\\.)*"|'(?:[^'\\]|\\.)*')|(?P<op>==|!=|=|\(|\))|(?P<word>[A-Za-z_][\w.]*(?:\[[cd]+\])?)|(?P<num>-?\d+(?:\.\d+)?))''')
+
+_COMPARISONS = {
+    '==': lambda a, b: a == b,
+    '=': lambda a, b: a == b,
+    '!=': lambda a, b: a != b,
+    'CONTAINS': lambda a, b: a is not None and b in a,
+    'BEGINSWITH': lambda a, b: a is not None and a.startswith(b),
+    'ENDSWITH': lambda a, b: a is not None and a.endswith(b),
+}
+
+
+def _attr_name(name: str) -> str:
+    # wdName / wdLabel / elementType style aliases used by XCUITest predicates
+    if name.startswith('wd') and len(name) > 2:
+        name = name[2].lower() + name[3:]
+    return 'type' if name == 'elementType' else name
+
+
+def _tokenize(text: str) -> List[Tuple[str, str]]:
+    tokens, pos = [], 0
+    text = text.strip()
+    while pos < len(text):
+        m = _TOKEN.match(text, pos)
+        if not m or m.end() == pos:
+            raise LocatorError(f"Cannot parse predicate near: {text[pos:]!r}")
+        kind = m.lastgroup
+        tokens.append((kind, m.group(kind)))
+        pos = m.end()
+    return tokens
+
+
+class Predicate:
+    """Compiled subset of NSPredicate: comparisons joined by AND / OR / NOT"""
+
+    def __init__(self, text: str):
+        self.text = text
+        self._tokens = _tokenize(text)
+        self._pos = 0
+        self.tree = self._parse_or()
+        if self._pos != len(self._tokens):
+            raise LocatorError(f"Unexpected token in predicate: {self._tokens[self._pos][1]!r}")
+
+    # Grammar: or := and (OR and)* ; and := not (AND not)* ; not := NOT not | atom
+    def _peek(self) -> Optional[Tuple[str, str]]:
+        return self._tokens[self._pos] if self._pos < len(self._tokens) else None
+
+    def _take(self) -> Tuple[str, str]:
+        token = self._peek()
+        if token is None:
+            raise LocatorError(f"Unexpected end of predicate: {self.text!r}")
+        self._pos += 1
+        return token
+
+    def _is_word(self, *words) -> bool:
+        token = self._peek()
+        return token is not None and token[0] == 'word' and token[1].upper() in words
+
+    def _parse_or(self):
+        node = self._parse_and()
+        while self._is_word('OR'):
+            self._take()
+            node = ('or', node, self._parse_and())
+        return node
+
+    def _parse_and(self):
+        node = self._parse_not()
+        while self._is_word('AND'):
+            self._take()
+            node = ('and', node, self._parse_not())
+        return node
+
+    def _parse_not(self):
+        if self._is_word('NOT'):
+            self._take()
+            return ('not', self._parse_not())
+        token = self._peek()
+        if token == ('op', '('):
+            self._take()
+            node = self._parse_or()
+            if self._take() != ('op', ')'):
+                raise LocatorError(f"Missing ')' in predicate: {self.text!r}")
+            return node
+        return self._parse_comparison()
+
+    def _parse_comparison(self):
+        kind, attr = self._take()
+        if kind != 'word':
+            raise LocatorError(f"Expected attribute name, got {attr!r}")
+        kind, op = self._take()
+        modifiers = ''
+        if kind == 'word':
+            match = re.match(r'([A-Za-z]+)(?:\[([cd]+)\])?$', op)
+            if not match:
+                raise LocatorError(f"Unsupported predicate operator: {op!r}")
+            op, modifiers = match.group(1).upper(), match.group(2) or ''
+        if op not in _COMPARISONS:
+            raise LocatorError(f"Unsupported predicate operator: {op!r}")
+        kind, raw = self._take()
+        if kind == 'str':
+            value = raw[1:-1].replace('\\"', '"').replace("\\'", "'")
+        elif kind == 'num' or (kind == 'word' and raw.upper() in ('TRUE', 'FALSE', 'YES', 'NO')):
+            value = {'TRUE': '1', 'YES': '1', 'FALSE': '0', 'NO': '0'}.get(raw.upper(), raw)
+        else:
+            raise LocatorError(f"Unsupported predicate value: {raw!r}")
+        return ('cmp', _attr_name(attr), op, value, 'c' in modifiers)
+
+    def equality_terms(self) -> Optional[List[Tuple[str, str]]]:
+        """(attr, value) pairs when the predicate is only OR-ed == on indexed attributes"""
+        terms = []
+
+        def walk(node) -> bool:
+            if node[0] == 'or':
+                return walk(node[1]) and walk(node[2])
+            if node[0] == 'cmp' and node[2] in ('==', '=') and not node[4] and node[1] in INDEXED_ATTRS:
+                terms.append((node[1], node[3]))
+                return True
+            return False
+
+        return terms if walk(self.tree) else None
+
+    def matches(self, element: LocalElement) -> bool:
+        return self._eval(self.tree, element)
+
+    def _eval(self, node, element: LocalElement) -> bool:
+        op = node[0]
+        if op == 'or':
+            return self._eval(node[1], element) or self._eval(node[2], element)
+        if op == 'and':
+            return self._eval(node[1], element) and self._eval(node[2], element)
+        if op == 'not':
+            return not self._eval(node[1], element)
+        _, attr, cmp, value, ignore_case = node
+        actual = element.type if attr == 'type' else element.attrs.get(attr)
+        if attr in ('visible', 'enabled', 'accessible') and actual is not None:
+            actual = '1' if actual.lower() in ('true', '1') else '0'
+        if ignore_case and actual is not None:
+            actual, value = actual.lower(), value.lower()
+        return _COMPARISONS[cmp](actual, value)
+
+
+class LocatorEngine:
+    """Resolves many locators against one page-source fetch"""
+
+    def __init__(self, driver: Any, logger: Optional[AppiumLogger] = None,
+                 max_age: Optional[float] = None):
+        self.driver = driver
+        self.logger = logger or get_logger("Locator")
+        self.max_age = max_age
+        self._page: Optional[PageIndex] = None
+        self._fetched_at = 0.0
+        self._predicates: Dict[str, Predicate] = {}
+        self.hits = 0
+        self.misses = 0
+        self.fetches = 0
+
+    # ---- snapshot ----
+
+    def snapshot(self, force: bool = False) -> PageIndex:
+        """Page index for the current screen state (one round trip when stale)"""
+        stale = self.max_age is not None and time.monotonic() - self._fetched_at > self.max_age
+        if self._page is None or force or stale:
+            self._page = PageIndex(self.driver.page_source)
+            self._fetched_at = time.monotonic()
+            self.fetches += 1
+        return self._page
+
+    def invalidate(self):
+        """Forget the cached page; call after anything that changes the screen"""
+        self._page = None
+
+    # ---- lookups ----
+
+    def find_all(self, by: str, value: str, log: bool = True) -> List[LocalElement]:
+        """Resolve a locator locally; raises LocatorError if it can't be evaluated here (log=False while polling)"""
+        cached = self._page is not None
+        page = self.snapshot()
+        if by == BY_PREDICATE:
+            predicate = self._predicates.get(value)
+            if predicate is None:
+                predicate = self._predicates[value] = Predicate(value)
+            terms = predicate.equality_terms()
+            if terms is not None:
+                found = {id(e): e for attr, v in terms for e in page.lookup(attr, v)}
+                results = sorted(found.values(), key=lambda e: e.order)
+            else:
+                results = [e for e in page.elements if predicate.matches(e)]
+        elif by == BY_XPATH:
+            results = page.xpath(value)
+        elif by in (BY_ACCESSIBILITY_ID, BY_NAME):
+            results = page.lookup('name', value)
+        elif by == BY_CLASS_NAME:
+            results = page.lookup('type', value)
+        else:
+            raise LocatorError(f"Unsupported locator strategy for local lookup: {by}")
+
+        if cached:
+            self.hits += 1
+        else:
+            self.misses += 1
+        if log:
+            self.logger.log_element_search(by, value, bool(results), cached=cached)
+        return results
+
+    def find(self, by: str, value: str, log: bool = True) -> Optional[LocalElement]:
+        """First match or None"""
+        results = self.find_all(by, value, log)
+        return results[0] if results else None
+
+    def find_many(self, locators: Dict[str, Tuple[str, str]], log: bool = True) -> Dict[str, Optional[LocalElement]]:
+        """Resolve a batch of named locators against a single page-source fetch"""
+        return {name: self.find(by, value, log) for name, (by, value) in locators.items()}
+
+    def find_remote(self, by: str, value: str):
+        """Locate through WDA; used when a locator can't be resolved locally"""
+        try:
+            local = self.find(by, value)
+        except LocatorError:
+            local = None
+        if local is not None and local.name:
+            return self.driver.find_element(BY_ACCESSIBILITY_ID, local.name)
+        return self.driver.find_element(by, value)
+
+    # ---- actions (go to WDA) ----
+
+    def tap(self, element: LocalElement):
+        """Tap the element's center with one WDA call, then invalidate the page"""
+        x, y = element.center
+        self.driver.execute_script("mobile: tap", {"x": x, "y": y})
+        self.invalidate()
+
+    def click(self, by: str, value: str) -> bool:
+        """Find locally and tap; returns False when nothing matched"""
+        element = self.find(by, value)
+        if element is None:
+            return False
+        self.tap(element)
+        return True
+
+    def run_action(self, action: Callable[[], Any]) -> Any:
+        """Run an arbitrary driver action and invalidate the cached page"""
+        try:
+            return action()
+        finally:
+            self.invalidate()
+
+    def stats(self) -> Dict[str, int]:
+        return {'hits': self.hits, 'misses': self.misses, 'page_fetches': self.fetches}
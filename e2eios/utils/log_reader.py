@@ -0,0 +1,459 @@
+#!/usr/bin/env python3
+"""
+Service Log Reader for Appium iOS Automation
+Tails the go-ios/WDA log files in logs/ incrementally through mmap, keeps
+a small on-disk index of warning/error line offsets by timestamp next to
+them, and answers "errors in the last N minutes" with a binary search of
+that index instead of rescanning the files
+"""
+
+import json
+import mmap
+import re
+import struct
+import threading
+import time
+import zlib
+from bisect import bisect_left
+from dataclasses import dataclass, field
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+ROOT = Path(__file__).resolve().parents[2]
+
+# Supervisor logs are <stage>-<ts>.log, start.ps1 writes <stage>-<ts>.out.log / .err.log
+DEFAULT_PATTERNS = ("*.log",)
+
+LEVELS = {'warning': 1, 'error': 2}
+LEVEL_NAMES = {v: k for k, v in LEVELS.items()}
+_LEVEL_ALIASES = {
+    'warn': 'warning', 'warning': 'warning',
+    'err': 'error', 'error': 'error', 'fatal': 'error', 'panic': 'error', 'critical': 'error',
+}
+
+# Index file: header, then one fixed-size record per warning/error line (append-only)
+_MAGIC = b"E2ELIDX1"
+_HEADER = struct.Struct("<8sQIId")  # magic, indexed offset, fingerprint length, fingerprint crc, last timestamp
+_RECORD = struct.Struct("<dQB")     # timestamp, line offset, level
+_FINGERPRINT_BYTES = 1024
+
+# Only lines containing one of these (any case) are parsed; bytes.find skips the rest far
+# faster than a case-insensitive regex would
+_NEEDLES = (b"err", b"warn", b"fatal", b"panic", b"critical", b"failed")
+_CHUNK = 4 * 1024 * 1024
+_JSON_FIELD = re.compile(rb'"(level|time|ts)"\s*:\s*"([^"]*)"')
+_PLAIN_TIME = re.compile(rb"^\s*(\d{4}-\d\d-\d\d[ T]\d\d:\d\d:\d\d(?:[.,]\d+)?)")
+_ANY_TIME = re.compile(rb'"(?:time|ts)"\s*:\s*"(\d{4}-[^"]+)"|^\s*(\d{4}-\d\d-\d\d[ T]\d\d:\d\d:\d\d(?:[.,]\d+)?)',
+                       re.M)
+_PLAIN_ERROR = re.compile(rb"(?i)\b(?:error|fatal|panic|critical|failed)\b")
+_PLAIN_WARNING = re.compile(rb"(?i)\bwarn(?:ing)?\b")
+
+# How far back an untimestamped line looks for the previous timestamp
+_TIME_LOOKBEHIND = 64 * 1024
+
+
+def parse_timestamp(value) -> Optional[float]:
+    """Unix time from an ISO-8601 string as written by go-ios (logrus) or the e2eios logger"""
+    if isinstance(value, bytes):
+        value = value.decode("ascii", "replace")
+    value = value.strip().replace(",", ".")
+    if value.endswith("Z"):
+        value = value[:-1] + "+00:00"
+    # fromisoformat() takes at most 6 fractional digits; go-ios writes up to 9
+    match = re.match(r"(.*?\.\d{6})\d*(.*)$", value)
+    if match:
+        value = match.group(1) + match.group(2)
+    try:
+        return datetime.fromisoformat(value).timestamp()
+    except ValueError:
+        return None
+
+
+def _candidate_lines(mm: mmap.mmap, start: int, end: int):
+    """(start, stop) offsets of the lines in [start, end) that contain a level keyword; end follows a newline"""
+    pos = start
+    while pos < end:
+        stop = min(end, pos + _CHUNK)
+        if stop < end:
+            cut = mm.rfind(b"\n", pos, stop)
+            stop = cut + 1 if cut >= 0 else mm.find(b"\n", stop, end) + 1
+        chunk = mm[pos:stop].lower()
+        hits = set()
+        for needle in _NEEDLES:
+            i = chunk.find(needle)
+            while i >= 0:
+                hits.add(chunk.rfind(b"\n", 0, i) + 1)
+                i = chunk.find(needle, chunk.find(b"\n", i))
+        for line_start in sorted(hits):
+            yield pos + line_start, pos + chunk.find(b"\n", line_start)
+        pos = stop
+
+
+def classify_line(line: bytes) -> Tuple[Optional[str], Optional[float]]:
+    """(normalized level or None, timestamp or None) without decoding the whole line"""
+    stripped = line.lstrip()
+    if stripped.startswith(b"{"):
+        fields = dict(_JSON_FIELD.findall(stripped))
+        level = fields.get(b"level", b"").decode("ascii", "replace").lower()
+        stamp = fields.get(b"time") or fields.get(b"ts")
+        return _LEVEL_ALIASES.get(level), parse_timestamp(stamp) if stamp else None
+
+    match = _PLAIN_TIME.match(line)
+    stamp = parse_timestamp(match.group(1)) if match else None
+    if _PLAIN_ERROR.search(line):
+        return 'error', stamp
+    if _PLAIN_WARNING.search(line):
+        return 'warning', stamp
+    return None, stamp
+
+
+@dataclass
+class LogEntry:
+    """One warning/error line read back through the index"""
+    source: str
+    offset: int
+    timestamp: float
+    level: str
+    message: str
+    data: Dict[str, Any] = field(default_factory=dict)
+
+    @classmethod
+    def from_line(cls, source: str, offset: int, timestamp: float, level: str, line: bytes) -> "LogEntry":
+        text = line.decode("utf-8", "replace").strip()
+        data: Dict[str, Any] = {}
+        message = text
+        if text.startswith("{"):
+            try:
+                data = json.loads(text)
+            except ValueError:
+                data = {}
+            if isinstance(data, dict):
+                message = str(data.get("msg") or data.get("message") or text)
+                error = data.get("err") or data.get("error")
+                if error:
+                    message += f" ({error})"
+            else:
+                data = {}
+        return cls(source, offset, timestamp, level, message, data)
+
+    def format(self) -> str:
+        stamp = datetime.fromtimestamp(self.timestamp).strftime("%H:%M:%S")
+        return f"{stamp} [{self.source}] {self.message}"
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            'source': self.source,
+            'offset': self.offset,
+            'time': round(self.timestamp, 3),
+            'level': self.level,
+            'message': self.message,
+        }
+
+
+class LogFile:
+    """One log file plus its index; update() indexes whatever was appended since the last call"""
+
+    def __init__(self, path: Path, index_path: Path):
+        self.path = Path(path)
+        self.index_path = Path(index_path)
+        self._lock = threading.Lock()
+        self._offset = 0
+        self._fp_len = 0
+        self._fp_crc = 0
+        self._last_ts = 0.0
+        self._count = 0
+        self._loaded = False
+
+    @property
+    def indexed_offset(self) -> int:
+        return self._offset
+
+    @property
+    def count(self) -> int:
+        """Warning/error lines indexed so far"""
+        return self._count
+
+    # ---- index file ----
+
+    def _load_index(self):
+        self._loaded = True
+        try:
+            with open(self.index_path, "rb") as f:
+                header = f.read(_HEADER.size)
+                size = f.seek(0, 2)
+        except OSError:
+            return
+        if len(header) != _HEADER.size:
+            return
+        magic, offset, fp_len, fp_crc, last_ts = _HEADER.unpack(header)
+        if magic != _MAGIC:
+            return
+        self._offset, self._fp_len, self._fp_crc, self._last_ts = offset, fp_len, fp_crc, last_ts
+        self._count = (size - _HEADER.size) // _RECORD.size
+
+    def _write_index(self, records: List[bytes], reset: bool = False):
+        self.index_path.parent.mkdir(parents=True, exist_ok=True)
+        header = _HEADER.pack(_MAGIC, self._offset, self._fp_len, self._fp_crc, self._last_ts)
+        if reset or not self.index_path.exists():
+            with open(self.index_path, "wb") as f:
+                f.write(header)
+                f.write(b"".join(records))
+            return
+        with open(self.index_path, "r+b") as f:
+            # Records go in before the header so a crash never leaves the header ahead of them
+            f.seek(_HEADER.size + self._count * _RECORD.size)
+            f.write(b"".join(records))
+            f.truncate()
+            f.seek(0)
+            f.write(header)
+
+    def _reset(self):
+        self._offset = self._fp_len = self._fp_crc = 0
+        self._last_ts = 0.0
+        self._count = 0
+
+    # ---- indexing ----
+
+    def update(self, collect: bool = True) -> List[LogEntry]:
+        """Index lines appended since the last call and return the new warnings/errors (if collect)"""
+        with self._lock:
+            if not self._loaded:
+                self._load_index()
+            try:
+                stat = self.path.stat()
+            except OSError:
+                return []
+            if stat.st_size == self._offset and self._fp_len:
+                return []
+
+            if stat.st_size == 0:
+                if self._offset:
+                    self._reset()
+                    self._write_index([], reset=True)
+                return []
+            with open(self.path, "rb") as f:
+                with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                    return self._scan(mm, stat.st_mtime, collect)
+
+    def _scan(self, mm: mmap.mmap, mtime: float, collect: bool) -> List[LogEntry]:
+        size = len(mm)
+        reset = False
+        # Truncated, rotated or replaced under the same name: start over
+        if size < self._offset or (self._fp_len and zlib.crc32(mm[:self._fp_len]) != self._fp_crc):
+            self._reset()
+            reset = True
+        if self._fp_len < _FINGERPRINT_BYTES and size > self._fp_len:
+            self._fp_len = min(size, _FINGERPRINT_BYTES)
+            self._fp_crc = zlib.crc32(mm[:self._fp_len])
+
+        # Only complete lines; a half-written last line is picked up next time
+        end = mm.rfind(b"\n", self._offset) + 1
+        if end <= self._offset:
+            if reset:
+                self._write_index([], reset=True)
+            return []
+
+        records: List[bytes] = []
+        entries: List[LogEntry] = []
+        source = self.path.name
+        for start, stop in _candidate_lines(mm, self._offset, end):
+            line = mm[start:stop]
+            level, stamp = classify_line(line)
+            if level is None:
+                continue
+            if stamp is None:
+                stamp = self._previous_timestamp(mm, start) or mtime
+            self._last_ts = stamp
+            records.append(_RECORD.pack(stamp, start, LEVELS[level]))
+            if collect:
+                entries.append(LogEntry.from_line(source, start, stamp, level, line))
+
+        self._offset = end
+        self._write_index(records, reset=reset)
+        self._count += len(records)
+        return entries
+
+    def _previous_timestamp(self, mm: mmap.mmap, line_start: int) -> Optional[float]:
+        """Timestamp of the closest earlier line that has one (e.g. xcodebuild output between go-ios lines)"""
+        last = None
+        for match in _ANY_TIME.finditer(mm, max(0, line_start - _TIME_LOOKBEHIND), line_start):
+            last = match
+        if last is None:
+            return self._last_ts or None
+        return parse_timestamp(last.group(1) or last.group(2))
+
+    # ---- queries ----
+
+    def query(self, since: Optional[float] = None, until: Optional[float] = None,
+              level: str = 'warning', limit: Optional[int] = None) -> List[LogEntry]:
+        """Indexed lines with since <= timestamp < until at or above `level` (binary search, no rescan)"""
+        self.update(collect=False)
+        minimum = LEVELS[_LEVEL_ALIASES.get(level, level)]
+        entries: List[LogEntry] = []
+        with self._lock:
+            if not self._count:
+                return entries
+            with open(self.index_path, "rb") as idx, open(self.path, "rb") as log, \
+                    mmap.mmap(idx.fileno(), 0, access=mmap.ACCESS_READ) as index, \
+                    mmap.mmap(log.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                count = min(self._count, (len(index) - _HEADER.size) // _RECORD.size)
+                # Lines are indexed in file order, so timestamps are (nearly) sorted
+                records = _IndexView(index, count)
+                first = bisect_left(records, since) if since is not None else 0
+                for i in range(first, count):
+                    stamp, offset, code = _RECORD.unpack_from(index, _HEADER.size + i * _RECORD.size)
+                    if until is not None and stamp >= until:
+                        break
+                    if code < minimum:
+                        continue
+                    stop = mm.find(b"\n", offset)
+                    line = mm[offset:stop if stop >= 0 else len(mm)]
+                    entries.append(LogEntry.from_line(self.path.name, offset, stamp, LEVEL_NAMES[code], line))
+                    if limit and len(entries) >= limit:
+                        break
+        return entries
+
+    def tail(self, lines: int = 20) -> List[str]:
+        """Last N lines, read backwards from the end of the mapping"""
+        try:
+            with open(self.path, "rb") as f:
+                if f.seek(0, 2) == 0:
+                    return []
+                with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                    end = len(mm)
+                    if mm[end - 1:end] == b"\n":
+                        end -= 1
+                    start = end
+                    for _ in range(lines):
+                        start = mm.rfind(b"\n", 0, start)
+                        if start < 0:
+                            break
+                    text = mm[start + 1:end]
+        except OSError:
+            return []
+        return text.decode("utf-8", "replace").splitlines()
+
+
+class _IndexView:
+    """Timestamps of the index records as a sequence, so bisect can search the mapping directly"""
+
+    def __init__(self, index: mmap.mmap, count: int):
+        self.index = index
+        self.count = count
+
+    def __len__(self):
+        return self.count
+
+    def __getitem__(self, i):
+        return _RECORD.unpack_from(self.index, _HEADER.size + i * _RECORD.size)[0]
+
+
+class ServiceLogs:
+    """All service log files in one directory; indexes live in <log_dir>/.index/"""
+
+    def __init__(self, log_dir: Optional[Path] = None, patterns: Sequence[str] = DEFAULT_PATTERNS,
+                 index_dir: Optional[Path] = None):
+        self.log_dir = Path(log_dir) if log_dir else ROOT / "logs"
+        self.patterns = tuple(patterns)
+        self.index_dir = Path(index_dir) if index_dir else self.log_dir / ".index"
+        self._files: Dict[Path, LogFile] = {}
+        self._lock = threading.Lock()
+
+    def files(self) -> List[LogFile]:
+        """Log files currently on disk, oldest first"""
+        paths = set()
+        for pattern in self.patterns:
+            paths.update(p for p in self.log_dir.glob(pattern) if p.is_file())
+        with self._lock:
+            for path in paths:
+                if path not in self._files:
+                    self._files[path] = LogFile(path, self.index_dir / (path.name + ".idx"))
+            for path in list(self._files):
+                if path not in paths:
+                    del self._files[path]
+            files = list(self._files.values())
+
+        def mtime(log_file: LogFile) -> float:
+            try:
+                return log_file.path.stat().st_mtime
+            except OSError:
+                return 0.0
+        return sorted(files, key=mtime)
+
+    def update(self, collect: bool = True) -> List[LogEntry]:
+        """New warnings/errors across all files since the last call"""
+        entries: List[LogEntry] = []
+        for log_file in self.files():
+            entries.extend(log_file.update(collect))
+        entries.sort(key=lambda e: e.timestamp)
+        return entries
+
+    def query(self, since: Optional[float] = None, until: Optional[float] = None,
+              level: str = 'warning', limit: Optional[int] = None) -> List[LogEntry]:
+        """Warnings/errors from every file, merged by timestamp (most recent `limit` if given)"""
+        entries: List[LogEntry] = []
+        for log_file in self.files():
+            entries.extend(log_file.query(since, until, level))
+        entries.sort(key=lambda e: e.timestamp)
+        return entries[-limit:] if limit else entries
+
+    def errors(self, minutes: float = 10, limit: Optional[int] = None) -> List[LogEntry]:
+        """Errors in the last N minutes"""
+        return self.query(since=time.time() - minutes * 60, level='error', limit=limit)
+
+    def warnings(self, minutes: float = 10, limit: Optional[int] = None) -> List[LogEntry]:
+        """Warnings and errors in the last N minutes"""
+        return self.query(since=time.time() - minutes * 60, level='warning', limit=limit)
+
+    def tail(self, name: str, lines: int = 20) -> List[str]:
+        """Last N lines of one file (by name)"""
+        for log_file in self.files():
+            if log_file.path.name == name:
+                return log_file.tail(lines)
+        return []
+
+
+class LogWatcher:
+    """Background thread that polls ServiceLogs and reports newly written warnings/errors"""
+
+    def __init__(self, logs: ServiceLogs, callback: Callable[[LogEntry], None],
+                 interval: float = 1.0, level: str = 'warning'):
+        self.logs = logs
+        self.callback = callback
+        self.interval = interval
+        self.minimum = LEVELS[_LEVEL_ALIASES.get(level, level)]
+        self._stopped = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self) -> "LogWatcher":
+        if self.running:
+            return self
+        self._stopped.clear()
+        self._thread = threading.Thread(target=self._run, name="log-watcher", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._stopped.set()
+        if self._thread is not None:
+            self._thread.join(timeout=self.interval + 1)
+            self._thread = None
+
+    def _run(self):
+        # Catch up silently (this also builds missing indexes); only report what is written from now on
+        try:
+            self.logs.update(collect=False)
+        except Exception as e:
+            print(f"Log watcher error: {e}")
+        while not self._stopped.wait(self.interval):
+            try:
+                for entry in self.logs.update():
+                    if LEVELS[entry.level] >= self.minimum:
+                        self.callback(entry)
+            except Exception as e:
+                print(f"Log watcher error: {e}")
@@ -2,18 +2,60 @@
 """
 Centralized Logging Utility for Appium iOS Automation
 Provides consistent logging with timestamps, levels, and error context
+Records are filtered by level up front, handed to a background thread and
+formatted lazily there, then written in batches to pluggable sinks
+(console, rotating text file, JSON Lines)
 """
 
+import atexit
+import json
+import os
+import queue
 import sys
+import threading
+import time
 import traceback
 from datetime import datetime
 from pathlib import Path
-from typing import Optional, Dict, Any
-import json
+from typing import Optional, Dict, Any, List, NamedTuple
+
+LEVEL_NUMS = {
+    'DEBUG': 10,
+    'INFO': 20,
+    'SUCCESS': 25,
+    'WARNING': 30,
+    'ERROR': 40,
+    'CRITICAL': 50
+}
+
+
+class LogRecord(NamedTuple):
+    """Raw log event; formatting is deferred to the sinks"""
+    created: float
+    level: str
+    component: str
+    message: str
+    context: Optional[Dict[str, Any]]
+    exc_text: Optional[str]
+    session_id: str
+
+
+class LogSink:
+    """Base class for log destinations; receives records in batches"""
+
+    def emit(self, records: List[LogRecord]):
+        raise NotImplementedError
+
+    def flush(self):
+        pass
+
+    def close(self):
+        self.flush()
+
+
+class ConsoleSink(LogSink):
+    """Colourless console output with icons, matching the original print format"""
 
-class AppiumLogger:
-    """Centralized logger for all automation scripts"""
-    
     LEVELS = {
         'DEBUG': '🔍',
         'INFO': 'ℹ️',
@@ -22,7 +64,224 @@ class AppiumLogger:
         'ERROR': '❌',
         'CRITICAL': '🚨'
     }
-    
+
+    EXC_PREFIX = {
+        'ERROR': '🔍 Exception details: ',
+        'CRITICAL': '🚨 Critical exception: '
+    }
+
+    def __init__(self, stream=None):
+        self.stream = stream
+
+    def format(self, record: LogRecord) -> str:
+        """Format log message with timestamp and level"""
+        timestamp = time.strftime("%H:%M:%S", time.localtime(record.created))
+        icon = self.LEVELS.get(record.level, '📋')
+
+        # Base message
+        formatted = f"{icon} [{timestamp}] [{record.level}] {record.component}: {record.message}"
+
+        # Add context if provided
+        if record.context:
+            context_str = ", ".join([f"{k}={v}" for k, v in record.context.items()])
+            formatted += f" | {context_str}"
+
+        if record.exc_text:
+            formatted += f"\n{self.EXC_PREFIX.get(record.level, '')}{record.exc_text}"
+        return formatted
+
+    def emit(self, records: List[LogRecord]):
+        stream = self.stream or sys.stdout
+        text = "\n".join(self.format(r) for r in records) + "\n"
+        try:
+            stream.write(text)
+        except UnicodeEncodeError:
+            # Fallback for Windows terminals that don't support UTF-8
+            stream.write(text.encode('ascii', 'replace').decode('ascii'))
+
+    def flush(self):
+        (self.stream or sys.stdout).flush()
+
+
+class RotatingFileSink(LogSink):
+    """Plain-text file that rolls over to .1, .2, ... when it grows past max_bytes"""
+
+    def __init__(self, path, max_bytes: int = 10 * 1024 * 1024, backup_count: int = 5):
+        self.path = Path(path)
+        self.max_bytes = max_bytes
+        self.backup_count = backup_count
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._file = open(self.path, 'a', encoding='utf-8')
+
+    def format(self, record: LogRecord) -> str:
+        timestamp = datetime.fromtimestamp(record.created).strftime("%Y-%m-%d %H:%M:%S.%f")[:-3]
+        line = f"{timestamp} [{record.level}] {record.component}: {record.message}"
+        if record.context:
+            line += " | " + ", ".join([f"{k}={v}" for k, v in record.context.items()])
+        if record.exc_text:
+            line += "\n" + record.exc_text.rstrip("\n")
+        return line
+
+    def emit(self, records: List[LogRecord]):
+        self._file.write("\n".join(self.format(r) for r in records) + "\n")
+        if self.max_bytes and self._file.tell() >= self.max_bytes:
+            self._rollover()
+
+    def _rollover(self):
+        self._file.close()
+        for i in range(self.backup_count - 1, 0, -1):
+            src = self.path.with_name(f"{self.path.name}.{i}")
+            if src.exists():
+                os.replace(src, self.path.with_name(f"{self.path.name}.{i + 1}"))
+        if self.backup_count > 0:
+            os.replace(self.path, self.path.with_name(f"{self.path.name}.1"))
+        else:
+            self.path.unlink()
+        self._file = open(self.path, 'a', encoding='utf-8')
+
+    def flush(self):
+        self._file.flush()
+
+    def close(self):
+        self._file.close()
+
+
+class JsonlSink(RotatingFileSink):
+    """One JSON object per line, for machine consumption"""
+
+    def format(self, record: LogRecord) -> str:
+        data = {
+            'ts': datetime.fromtimestamp(record.created).isoformat(timespec='milliseconds'),
+            'level': record.level,
+            'component': record.component,
+            'message': record.message,
+            'session_id': record.session_id,
+        }
+        if record.context:
+            data['context'] = record.context
+        if record.exc_text:
+            data['exc'] = record.exc_text
+        return json.dumps(data, ensure_ascii=False, default=str)
+
+
+class LogBackend:
+    """Background thread that drains a queue of records into the sinks in batches"""
+
+    def __init__(self, sinks: Optional[List[LogSink]] = None, batch_size: int = 256):
+        self.sinks: List[LogSink] = sinks if sinks is not None else [ConsoleSink()]
+        self.batch_size = batch_size
+        self._queue: "queue.SimpleQueue" = queue.SimpleQueue()
+        self._thread: Optional[threading.Thread] = None
+        self._start_lock = threading.Lock()
+
+    def submit(self, record: LogRecord):
+        if self._thread is None:
+            self._start()
+        self._queue.put(record)
+
+    def _start(self):
+        with self._start_lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="log-writer", daemon=True)
+                self._thread.start()
+
+    def _run(self):
+        while True:
+            item = self._queue.get()
+            batch = []
+            waiters = []
+            stop = False
+            while True:
+                if item is None:
+                    stop = True
+                elif isinstance(item, threading.Event):
+                    waiters.append(item)
+                else:
+                    batch.append(item)
+                if len(batch) >= self.batch_size:
+                    break
+                try:
+                    item = self._queue.get_nowait()
+                except queue.Empty:
+                    break
+            if batch:
+                self._write(batch)
+            if waiters or stop:
+                for sink in self.sinks:
+                    try:
+                        sink.flush()
+                    except Exception:
+                        pass
+            for event in waiters:
+                event.set()
+            if stop:
+                return
+
+    def _write(self, batch: List[LogRecord]):
+        for sink in self.sinks:
+            try:
+                sink.emit(batch)
+            except Exception as e:
+                sys.stderr.write(f"[logger] sink {type(sink).__name__} failed: {e}\n")
+
+    def flush(self, timeout: float = 5.0):
+        """Block until everything queued so far has been written"""
+        if self._thread is None or not self._thread.is_alive():
+            return
+        done = threading.Event()
+        self._queue.put(done)
+        done.wait(timeout)
+
+    def set_sinks(self, sinks: List[LogSink]):
+        """Replace the sinks, closing the previous file sinks"""
+        self.flush()
+        old, self.sinks = self.sinks, sinks
+        for sink in old:
+            if sink not in sinks and not isinstance(sink, ConsoleSink):
+                sink.close()
+
+    def shutdown(self):
+        """Flush pending records and stop the writer thread"""
+        self.flush()
+        if self._thread is not None and self._thread.is_alive():
+            self._queue.put(None)
+            self._thread.join(timeout=5.0)
+        for sink in self.sinks:
+            try:
+                sink.close()
+            except Exception:
+                pass
+
+
+_backend = LogBackend()
+atexit.register(_backend.shutdown)
+
+
+def configure_logging(console: bool = True, log_file: Optional[str] = None,
+                      jsonl_file: Optional[str] = None, max_bytes: int = 10 * 1024 * 1024,
+                      backup_count: int = 5, extra_sinks: Optional[List[LogSink]] = None):
+    """Choose the sinks used by every logger in the process"""
+    sinks: List[LogSink] = []
+    if console:
+        sinks.append(ConsoleSink())
+    if log_file:
+        sinks.append(RotatingFileSink(log_file, max_bytes, backup_count))
+    if jsonl_file:
+        sinks.append(JsonlSink(jsonl_file, max_bytes, backup_count))
+    sinks.extend(extra_sinks or [])
+    _backend.set_sinks(sinks)
+
+
+def flush_logs(timeout: float = 5.0):
+    """Wait until queued log records have been written"""
+    _backend.flush(timeout)
+
+
+class AppiumLogger:
+    """Centralized logger for all automation scripts"""
+
+    LEVELS = ConsoleSink.LEVELS
+
     COLORS = {
         'DEBUG': '\033[36m',     # Cyan
         'INFO': '\033[37m',      # White
@@ -32,114 +291,119 @@ class AppiumLogger:
         'CRITICAL': '\033[35m',  # Magenta
         'RESET': '\033[0m'       # Reset
     }
-    
-    def __init__(self, component: str = "Unknown", enable_debug: bool = False):
+
+    def __init__(self, component: str = "Unknown", enable_debug: bool = False,
+                 backend: Optional[LogBackend] = None):
         self.component = component
         self.enable_debug = enable_debug
+        self.min_level = LEVEL_NUMS['DEBUG'] if enable_debug else LEVEL_NUMS['INFO']
         self.session_id = datetime.now().strftime("%Y%m%d-%H%M%S")
-        
-    def _format_message(self, level: str, message: str, context: Optional[Dict[str, Any]] = None) -> str:
-        """Format log message with timestamp and level"""
-        timestamp = datetime.now().strftime("%H:%M:%S")
-        icon = self.LEVELS.get(level, '📋')
-        
-        # Base message
-        formatted = f"[{timestamp}] [{level}] {self.component}: {message}"
-        
-        # Add context if provided
-        if context:
-            context_str = ", ".join([f"{k}={v}" for k, v in context.items()])
-            formatted += f" | {context_str}"
-            
-        return f"{icon} {formatted}"
-    
-    def _safe_print(self, message: str):
-        """Safely print message handling Unicode encoding issues"""
-        try:
-            print(message)
-        except UnicodeEncodeError:
-            # Fallback for Windows terminals that don't support UTF-8
-            safe_message = message.encode('ascii', 'replace').decode('ascii')
-            print(safe_message)
-    
+        self.backend = backend or _backend
+
+    def is_enabled(self, level: str) -> bool:
+        """Cheap level check; use it to skip building expensive context"""
+        return LEVEL_NUMS[level] >= self.min_level
+
+    def _log(self, level: str, message: str, context: Optional[Dict[str, Any]] = None,
+             exc_info: bool = False):
+        if LEVEL_NUMS[level] < self.min_level:
+            return
+        exc_text = None
+        if exc_info:
+            tb = traceback.format_exc()
+            if tb != "NoneType: None\n":
+                exc_text = tb
+        # Copy now: the record is formatted later on the writer thread, after the caller may reuse the dict
+        self.backend.submit(LogRecord(time.time(), level, self.component, message,
+                                      dict(context) if context else None, exc_text, self.session_id))
+
     def debug(self, message: str, context: Optional[Dict[str, Any]] = None):
         """Log debug message (only if debug enabled)"""
-        if self.enable_debug:
-            self._safe_print(self._format_message('DEBUG', message, context))
-    
+        self._log('DEBUG', message, context)
+
     def info(self, message: str, context: Optional[Dict[str, Any]] = None):
         """Log info message"""
-        self._safe_print(self._format_message('INFO', message, context))
-    
+        self._log('INFO', message, context)
+
     def success(self, message: str, context: Optional[Dict[str, Any]] = None):
         """Log success message"""
-        self._safe_print(self._format_message('SUCCESS', message, context))
-    
+        self._log('SUCCESS', message, context)
+
     def warning(self, message: str, context: Optional[Dict[str, Any]] = None):
         """Log warning message"""
-        self._safe_print(self._format_message('WARNING', message, context))
-    
+        self._log('WARNING', message, context)
+
     def error(self, message: str, context: Optional[Dict[str, Any]] = None, exc_info: bool = False):
         """Log error message with optional exception info"""
-        self._safe_print(self._format_message('ERROR', message, context))
-        
-        if exc_info:
-            tb = traceback.format_exc()
-            if tb != "NoneType: None\n":
-                try:
-                    print(f"🔍 Exception details: {tb}")
-                except UnicodeEncodeError:
-                    print(f"[!] Exception details: {tb}")
-    
+        self._log('ERROR', message, context, exc_info)
+
     def critical(self, message: str, context: Optional[Dict[str, Any]] = None, exc_info: bool = True):
         """Log critical error with exception info"""
-        print(self._format_message('CRITICAL', message, context))
-        
-        if exc_info:
-            tb = traceback.format_exc()
-            if tb != "NoneType: None\n":
-                print(f"🚨 Critical exception: {tb}")
-    
-    def log_element_search(self, selector_type: str, selector_value: str, found: bool, attempts: int = 1):
-        """Log element search results with debug info"""
+        self._log('CRITICAL', message, context, exc_info)
+
+    def flush(self, timeout: float = 5.0):
+        """Wait until this logger's queued records have been written"""
+        self.backend.flush(timeout)
+
+    def log_element_search(self, selector_type: str, selector_value: str, found: bool, attempts: int = 1,
+                           cached: Optional[bool] = None):
+        """Log element search results with debug info (cached: page-source cache hit/miss)"""
+        if found and not self.is_enabled('DEBUG'):
+            return
         context = {
             'selector': f"{selector_type}='{selector_value}'",
             'attempts': attempts
         }
-        
+        if cached is not None:
+            context['cache'] = 'hit' if cached else 'miss'
+
         if found:
             self.debug(f"Element found", context)
         else:
             self.warning(f"Element not found", context)
-    
+
+    def log_wait(self, name: str, elapsed: float, success: bool, polls: int = 1, timeout: Optional[float] = None):
+        """Log how long a wait actually took (the data for tightening timeouts)"""
+        context = {'wait': name, 'elapsed': f"{elapsed:.3f}s", 'polls': polls}
+        if timeout is not None:
+            context['timeout'] = f"{timeout:g}s"
+
+        if success:
+            self.info("Wait satisfied", context)
+        else:
+            self.warning("Wait timed out", context)
+
     def log_action(self, action: str, target: str, success: bool, duration: Optional[float] = None):
         """Log user action with result"""
         context = {'target': target}
         if duration:
             context['duration'] = f"{duration:.2f}s"
-            
+
         if success:
             self.success(f"Action '{action}' completed", context)
         else:
             self.error(f"Action '{action}' failed", context)
-    
+
     def log_session_start(self, session_type: str, config: Dict[str, Any]):
         """Log session start with configuration"""
         self.info(f"Starting {session_type} session", {'session_id': self.session_id})
         for key, value in config.items():
             self.info(f"Config: {key} = {value}")
-    
+
     def log_session_stats(self, stats: Dict[str, Any]):
         """Log session statistics"""
         self.info("Session Statistics:", stats)
-    
-    def log_screen_state(self, screen: str, elements_found: Optional[list] = None):
-        """Log current screen state detection"""
+
+    def log_screen_state(self, screen: str, elements_found: Optional[list] = None,
+                         details: Optional[Dict[str, Any]] = None):
+        """Log current screen state detection (details: e.g. visual diff or hash distance)"""
         context = {'screen': screen}
         if elements_found:
             context['elements'] = len(elements_found)
+        if details:
+            context.update(details)
         self.info("Screen state detected", context)
-    
+
     def log_api_call(self, api: str, method: str, status_code: int, response_time: Optional[float] = None):
         """Log API calls and responses"""
         context = {
@@ -149,7 +413,7 @@ class AppiumLogger:
         }
         if response_time:
             context['response_time'] = f"{response_time:.3f}s"
-            
+
         if 200 <= status_code < 300:
             self.success("API call successful", context)
         elif 400 <= status_code < 500:
@@ -175,4 +439,4 @@ def log_error(component: str, message: str, exc_info: bool = False, **context):
 def log_success(component: str, message: str, **context):
     """Quick success log"""
     logger = get_logger(component)
-    logger.success(message, context if context else None)
\ No newline at end of file
+    logger.success(message, context if context else None)
@@ -0,0 +1,308 @@
+#!/usr/bin/env python3
+"""
+Prometheus Metrics for Appium iOS Automation
+Minimal counter/gauge/histogram registry rendered in the Prometheus text
+format and served on a local /metrics endpoint. MonitorMetrics turns the
+status monitor's probe snapshots, go-ios executor stats and supervisor
+counters into metrics without running any probes of its own
+"""
+
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+from e2eios.utils.probes import ProbeSnapshot
+
+# Probe latencies range from sub-millisecond port checks to multi-second `ios list`
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+LabelValues = Tuple[str, ...]
+
+
+def _escape(value: Any) -> str:
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _format_value(value: float) -> str:
+    if value == float('inf'):
+        return "+Inf"
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+class Metric:
+    """Base class: a named family of samples keyed by label values"""
+    kind = "untyped"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+        self._values: Dict[LabelValues, Any] = {}
+
+    def _key(self, labels: Dict[str, Any]) -> LabelValues:
+        if set(labels) != set(self.labelnames):
+            raise ValueError(f"{self.name} expects labels {self.labelnames}, got {tuple(labels)}")
+        return tuple(str(labels[n]) for n in self.labelnames)
+
+    def _labels(self, key: LabelValues, extra: Optional[Tuple[str, str]] = None) -> str:
+        pairs = list(zip(self.labelnames, key))
+        if extra:
+            pairs.append(extra)
+        if not pairs:
+            return ""
+        return "{" + ",".join(f'{n}="{_escape(v)}"' for n, v in pairs) + "}"
+
+    def samples(self) -> List[str]:
+        with self._lock:
+            return [f"{self.name}{self._labels(key)} {_format_value(value)}"
+                    for key, value in sorted(self._values.items())]
+
+    def render(self) -> List[str]:
+        return [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"] + self.samples()
+
+
+class Counter(Metric):
+    kind = "counter"
+
+    def inc(self, amount: float = 1.0, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def set_total(self, value: float, **labels):
+        """For totals that are already counted elsewhere (e.g. executor stats)"""
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = value
+
+
+class Gauge(Metric):
+    kind = "gauge"
+
+    def set(self, value: float, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = value
+
+    def inc(self, amount: float = 1.0, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+
+class Histogram(Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                 buckets: Sequence[float] = DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value: float, **labels):
+        key = self._key(labels)
+        with self._lock:
+            state = self._values.get(key)
+            if state is None:
+                state = self._values[key] = [[0] * len(self.buckets), 0.0, 0]
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    state[0][i] += 1
+            state[1] += value
+            state[2] += 1
+
+    def samples(self) -> List[str]:
+        lines = []
+        with self._lock:
+            items = sorted((k, (list(v[0]), v[1], v[2])) for k, v in self._values.items())
+        for key, (counts, total, count) in items:
+            for bound, bucket_count in zip(self.buckets, counts):
+                lines.append(f"{self.name}_bucket{self._labels(key, ('le', _format_value(bound)))} {bucket_count}")
+            lines.append(f"{self.name}_bucket{self._labels(key, ('le', '+Inf'))} {count}")
+            lines.append(f"{self.name}_sum{self._labels(key)} {_format_value(total)}")
+            lines.append(f"{self.name}_count{self._labels(key)} {count}")
+        return lines
+
+
+class MetricsRegistry:
+    """Holds metric families; collectors refresh pulled values right before rendering"""
+
+    def __init__(self):
+        self._metrics: Dict[str, Metric] = {}
+        self._collectors: List[Callable[[], None]] = []
+        self._lock = threading.Lock()
+
+    def _register(self, metric: Metric) -> Metric:
+        with self._lock:
+            existing = self._metrics.get(metric.name)
+            if existing is not None:
+                if type(existing) is not type(metric) or existing.labelnames != metric.labelnames:
+                    raise ValueError(f"Metric {metric.name} already registered with a different shape")
+                return existing
+            self._metrics[metric.name] = metric
+            return metric
+
+    def counter(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Counter:
+        return self._register(Counter(name, documentation, labelnames))
+
+    def gauge(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Gauge:
+        return self._register(Gauge(name, documentation, labelnames))
+
+    def histogram(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                  buckets: Sequence[float] = DEFAULT_BUCKETS) -> Histogram:
+        return self._register(Histogram(name, documentation, labelnames, buckets))
+
+    def add_collector(self, collector: Callable[[], None]):
+        """collector() is called on every scrape to update pulled metrics"""
+        with self._lock:
+            self._collectors.append(collector)
+
+    def render(self) -> str:
+        with self._lock:
+            collectors = list(self._collectors)
+            metrics = list(self._metrics.values())
+        for collector in collectors:
+            try:
+                collector()
+            except Exception as e:
+                print(f"Metrics collector error: {e}")
+        lines: List[str] = []
+        for metric in metrics:
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path.split("?", 1)[0] not in ("/metrics", "/"):
+            self.send_error(404)
+            return
+        body = self.server.registry.render().encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", CONTENT_TYPE)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class MetricsServer:
+    """Background HTTP server exposing a registry on /metrics"""
+
+    def __init__(self, registry: MetricsRegistry, host: str = "127.0.0.1", port: int = 9108):
+        self.registry = registry
+        self.httpd = ThreadingHTTPServer((host, port), _MetricsHandler)
+        self.httpd.daemon_threads = True
+        self.httpd.registry = registry
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def url(self) -> str:
+        host, port = self.httpd.server_address[:2]
+        return f"http://{host}:{port}/metrics"
+
+    def start(self) -> "MetricsServer":
+        self._thread = threading.Thread(target=self.httpd.serve_forever, name="metrics-server", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+
+class MonitorMetrics:
+    """Status-monitor metrics: probe snapshots are pushed, executor/supervisor stats are pulled"""
+
+    def __init__(self, registry: Optional[MetricsRegistry] = None):
+        self.registry = registry or MetricsRegistry()
+        r = self.registry
+        self.probe_latency = r.histogram("e2eios_probe_latency_seconds", "Probe latency", ["probe"])
+        self.probe_up = r.gauge("e2eios_probe_up", "1 if the last probe succeeded", ["probe"])
+        self.probe_failures = r.counter("e2eios_probe_failures_total", "Failed probes", ["probe"])
+        self.probe_timeouts = r.counter("e2eios_probe_timeouts_total", "Probes that hit their deadline", ["probe"])
+        self.round_seconds = r.histogram("e2eios_monitor_round_seconds", "Duration of a full probe round")
+        self.rounds = r.counter("e2eios_monitor_rounds_total", "Probe rounds run by the status monitor")
+        self.devices = r.gauge("e2eios_devices_attached", "Devices reported by the last device probe")
+        self.last_round = r.gauge("e2eios_monitor_last_round_timestamp_seconds", "Unix time of the last probe round")
+
+    def observe(self, snapshot: ProbeSnapshot):
+        """Record one monitor round"""
+        self.rounds.inc()
+        self.round_seconds.observe(snapshot.elapsed)
+        self.last_round.set(snapshot.started_at)
+        for name, result in snapshot.results.items():
+            self.probe_latency.observe(result.latency, probe=name)
+            self.probe_up.set(1 if result.ok else 0, probe=name)
+            if not result.ok:
+                self.probe_failures.inc(probe=name)
+            if result.timed_out:
+                self.probe_timeouts.inc(probe=name)
+        device = snapshot.get("device")
+        if device is not None and isinstance(device.data, list):
+            self.devices.set(len(device.data))
+
+    def track_executor(self, executor):
+        """Export GoIosExecutor counters on every scrape"""
+        r = self.registry
+        calls = r.counter("e2eios_goios_calls_total", "go-ios invocations requested", ["command"])
+        executed = r.counter("e2eios_goios_executions_total", "go-ios processes actually run", ["command"])
+        failures = r.counter("e2eios_goios_failures_total", "go-ios processes that failed", ["command"])
+        cache_hits = r.counter("e2eios_goios_cache_hits_total", "go-ios calls served from cache", ["command"])
+        seconds = r.counter("e2eios_goios_seconds_total", "Wall time spent in go-ios processes", ["command"])
+        running = r.gauge("e2eios_goios_running", "Short-lived go-ios processes currently running")
+        spawned = r.gauge("e2eios_goios_spawned", "Long-running go-ios processes alive")
+
+        def collect():
+            for command, stats in executor.stats().items():
+                calls.set_total(stats['calls'], command=command)
+                executed.set_total(stats['executed'], command=command)
+                failures.set_total(stats['failures'], command=command)
+                cache_hits.set_total(stats['cache_hits'], command=command)
+                seconds.set_total(stats['total_time'], command=command)
+            running.set(executor.running)
+            spawned.set(executor.spawned)
+
+        r.add_collector(collect)
+
+    def track_supervisor(self, supervisor):
+        """Export ServiceSupervisor start/restart counters and liveness on every scrape"""
+        r = self.registry
+        starts = r.counter("e2eios_service_starts_total", "Service processes started", ["stage"])
+        restarts = r.counter("e2eios_service_restarts_total", "Service processes restarted after dying", ["stage"])
+        alive = r.gauge("e2eios_service_up", "1 if the supervised process is alive", ["stage"])
+
+        def collect():
+            for stage, counts in supervisor.counters().items():
+                starts.set_total(counts['starts'], stage=stage)
+                restarts.set_total(counts['restarts'], stage=stage)
+            for stage, entry in supervisor.status().items():
+                alive.set(1 if entry.get('alive') else 0, stage=stage)
+
+        r.add_collector(collect)
+
+    def track_schedule(self, schedule):
+        """Export per-probe intervals and circuit breaker states on every scrape"""
+        r = self.registry
+        interval = r.gauge("e2eios_probe_interval_seconds", "Current polling interval of a probe", ["probe"])
+        breaker = r.gauge("e2eios_probe_breaker_open", "1 if the probe's circuit breaker is open or half-open", ["probe"])
+        rate = r.gauge("e2eios_probes_per_minute", "Probes run per minute over the last 5 minutes")
+
+        def collect():
+            stats = schedule.stats()
+            rate.set(stats['probes_per_minute'])
+            for name, entry in stats['probes'].items():
+                interval.set(entry['interval'], probe=name)
+                breaker.set(0 if entry['breaker'] == 'closed' else 1, probe=name)
+
+        r.add_collector(collect)
+
+
+def start_metrics_server(metrics: MonitorMetrics, port: int, host: str = "127.0.0.1") -> MetricsServer:
+    return MetricsServer(metrics.registry, host, port).start()
@@ -0,0 +1,208 @@
+#!/usr/bin/env python3
+"""
+Adaptive Probe Scheduling for Appium iOS Automation
+Gives every status probe its own interval: stable services are polled less
+and less often, a service whose state just changed is polled fast, and a
+circuit breaker moves repeatedly failing probes to exponential backoff with
+single half-open retries
+"""
+
+import threading
+import time
+from collections import deque
+from dataclasses import asdict, dataclass
+from typing import Any, Deque, Dict, Iterable, List, Optional, Set, Tuple
+
+from e2eios.utils.probes import ProbeResult, ProbeSnapshot
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+# Window for the probes-per-minute figure
+RATE_WINDOW = 300.0
+
+
+@dataclass
+class ScheduleConfig:
+    """Knobs trading probe load against detection latency (seconds)"""
+    base: float = 5.0            # first interval for a service, and MONITOR_INTERVAL
+    fast: float = 1.0            # interval right after a service changed state
+    max_interval: float = 30.0   # longest gap for a stable service = worst-case detection latency
+    growth: float = 1.5          # interval multiplier per unchanged result
+    failures: int = 3            # consecutive failures that open the breaker
+    open_base: float = 10.0      # first open period; doubles on every failed half-open retry
+    open_max: float = 120.0      # longest open period = worst-case time to notice a recovery
+
+    @classmethod
+    def from_env(cls, env: Dict[str, str]) -> "ScheduleConfig":
+        return cls(
+            base=float(env.get("MONITOR_INTERVAL", "5")),
+            fast=float(env.get("MONITOR_FAST_INTERVAL", "1")),
+            max_interval=float(env.get("MONITOR_MAX_INTERVAL", "30")),
+            failures=int(env.get("MONITOR_BREAKER_FAILURES", "3")),
+            open_max=float(env.get("MONITOR_BREAKER_MAX", "120")),
+        )
+
+    def to_dict(self) -> Dict[str, Any]:
+        return asdict(self)
+
+
+@dataclass
+class ProbeState:
+    """Scheduling and breaker state of one probe"""
+    name: str
+    interval: float
+    next_due: float = 0.0
+    ok: Optional[bool] = None
+    breaker: str = CLOSED
+    failures: int = 0
+    opens: int = 0
+    open_until: float = 0.0
+    probes: int = 0
+    changes: int = 0
+    last_probe: Optional[float] = None
+    last_change: Optional[float] = None
+    detection_window: Optional[float] = None
+    last_result: Optional[ProbeResult] = None
+
+    def to_dict(self, now: float) -> Dict[str, Any]:
+        return {
+            'ok': self.ok,
+            'breaker': self.breaker,
+            'interval': round(self.interval, 2),
+            'next_in': round(max(0.0, self.next_due - now), 2),
+            'consecutive_failures': self.failures,
+            'probes': self.probes,
+            'changes': self.changes,
+            'last_change': self.last_change,
+            # A change is noticed at most this long after it happens
+            'detect_within': round(self.open_until - now if self.breaker == OPEN else self.interval, 2),
+            # Gap between the last two probes when the last change was seen
+            'last_detection_window': None if self.detection_window is None else round(self.detection_window, 3),
+        }
+
+
+class ProbeScheduler:
+    """Decides which probes are due and keeps the last result of the ones that are not"""
+
+    def __init__(self, config: Optional[ScheduleConfig] = None, clock=time.monotonic):
+        self.config = config or ScheduleConfig()
+        self.clock = clock
+        self._lock = threading.Lock()
+        self._states: Dict[str, ProbeState] = {}
+        self._recent: Deque[float] = deque()
+        self._started = clock()
+
+    def _state(self, name: str) -> ProbeState:
+        state = self._states.get(name)
+        if state is None:
+            state = self._states[name] = ProbeState(name, self.config.base)
+        return state
+
+    # ---- scheduling ----
+
+    def due(self, names: Iterable[str]) -> Set[str]:
+        """Probes to run now; an open breaker whose period ran out lets one half-open probe through"""
+        now = self.clock()
+        due = set()
+        with self._lock:
+            for name in names:
+                state = self._state(name)
+                if state.breaker == OPEN:
+                    if now >= state.open_until:
+                        state.breaker = HALF_OPEN
+                        due.add(name)
+                elif now >= state.next_due:
+                    due.add(name)
+        return due
+
+    def next_delay(self, minimum: float = 0.05) -> float:
+        """Seconds until the next probe is due"""
+        now = self.clock()
+        with self._lock:
+            if not self._states:
+                return self.config.base
+            soonest = min(s.open_until if s.breaker == OPEN else s.next_due for s in self._states.values())
+        return max(minimum, soonest - now)
+
+    def record(self, snapshot: ProbeSnapshot) -> List[Tuple[str, str]]:
+        """Update intervals and breakers from fresh results; returns (message, level) events worth logging"""
+        config = self.config
+        now = self.clock()
+        events: List[Tuple[str, str]] = []
+        with self._lock:
+            for name, result in snapshot.results.items():
+                state = self._state(name)
+                self._recent.append(now)
+                state.probes += 1
+                window = None if state.last_probe is None else now - state.last_probe
+                state.last_probe = now
+                state.last_result = result
+                changed = state.ok is not None and result.ok != state.ok
+                if changed:
+                    state.changes += 1
+                    state.last_change = time.time()
+                    state.detection_window = window
+                state.ok = result.ok
+
+                if result.ok:
+                    if state.breaker != CLOSED:
+                        events.append((f"✅ {name} is back, resuming normal polling", "success"))
+                    state.breaker = CLOSED
+                    state.failures = 0
+                    state.opens = 0
+                else:
+                    state.failures += 1
+                    if state.breaker == HALF_OPEN or state.failures >= config.failures:
+                        state.opens += 1
+                        period = min(config.open_base * 2 ** (state.opens - 1), config.open_max)
+                        if state.breaker == CLOSED:
+                            events.append((f"⚠️ {name} failed {state.failures}x in a row, retrying after "
+                                           f"{period:g}s (backing off up to {config.open_max:g}s)", "warning"))
+                        state.breaker = OPEN
+                        state.open_until = now + period
+                        state.interval = period
+                        continue
+
+                if changed:
+                    state.interval = config.fast
+                elif state.probes > 1:
+                    state.interval = min(max(state.interval, config.fast) * config.growth, config.max_interval)
+                state.next_due = now + state.interval
+
+            while self._recent and self._recent[0] < now - RATE_WINDOW:
+                self._recent.popleft()
+        return events
+
+    def merge(self, snapshot: ProbeSnapshot) -> ProbeSnapshot:
+        """Fresh results plus the last known result of every probe that was not due"""
+        with self._lock:
+            results = {name: s.last_result for name, s in self._states.items() if s.last_result is not None}
+        results.update(snapshot.results)
+        return ProbeSnapshot(snapshot.started_at, snapshot.elapsed, results)
+
+    def reset(self, names: Optional[Iterable[str]] = None):
+        """Close breakers and poll fast again, e.g. right after services were started or stopped"""
+        with self._lock:
+            for name in (names if names is not None else list(self._states)):
+                state = self._state(name)
+                state.breaker = CLOSED
+                state.failures = 0
+                state.opens = 0
+                state.interval = self.config.fast
+                state.next_due = 0.0
+
+    # ---- reporting ----
+
+    def stats(self) -> Dict[str, Any]:
+        """Per-probe intervals, breaker states and detection bounds, plus the overall probe rate"""
+        now = self.clock()
+        with self._lock:
+            recent = sum(1 for t in self._recent if t >= now - RATE_WINDOW)
+            elapsed = min(RATE_WINDOW, max(1.0, now - self._started))
+            return {
+                'config': self.config.to_dict(),
+                'probes_per_minute': round(recent * 60.0 / elapsed, 2),
+                'probes': {name: s.to_dict(now) for name, s in self._states.items()},
+            }
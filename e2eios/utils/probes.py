@@ -0,0 +1,191 @@
+#!/usr/bin/env python3
+"""
+Health Probe Engine for Appium iOS Automation
+Fans out service probes concurrently, each with its own deadline, and
+collects the results into a single snapshot with per-probe latency
+"""
+
+import socket
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeout
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, Iterable, Optional, Tuple
+from urllib.parse import urlparse
+
+import requests
+
+from e2eios.utils.http_client import get_client
+
+
+# A check receives its timeout and returns (ok, data)
+CheckFn = Callable[[float], Tuple[bool, Any]]
+
+
+@dataclass
+class Probe:
+    """A named health check with its own deadline"""
+    name: str
+    check: CheckFn
+    timeout: float = 5.0
+    kind: str = 'custom'
+
+
+@dataclass
+class ProbeResult:
+    """Outcome of a single probe"""
+    name: str
+    ok: bool
+    latency: float
+    data: Any = None
+    status_code: Optional[int] = None
+    error: Optional[str] = None
+    error_type: Optional[str] = None
+    timed_out: bool = False
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            'name': self.name,
+            'ok': self.ok,
+            'latency': round(self.latency, 4),
+            'status_code': self.status_code,
+            'error': self.error,
+            'timed_out': self.timed_out,
+        }
+
+
+@dataclass
+class ProbeSnapshot:
+    """Results of one probe round"""
+    started_at: float
+    elapsed: float
+    results: Dict[str, ProbeResult] = field(default_factory=dict)
+
+    def __getitem__(self, name: str) -> ProbeResult:
+        return self.results[name]
+
+    def __contains__(self, name: str) -> bool:
+        return name in self.results
+
+    def get(self, name: str) -> Optional[ProbeResult]:
+        return self.results.get(name)
+
+    @property
+    def ok(self) -> bool:
+        return all(r.ok for r in self.results.values())
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            'started_at': self.started_at,
+            'elapsed': round(self.elapsed, 4),
+            'ok': self.ok,
+            'probes': {name: r.to_dict() for name, r in self.results.items()},
+        }
+
+
+class HttpCheckError(Exception):
+    """Raised by HTTP checks that got a response with a non-200 status"""
+
+    def __init__(self, status_code: int, body: str):
+        super().__init__(f"HTTP {status_code}")
+        self.status_code = status_code
+        self.body = body
+
+
+class ProbeEngine:
+    """Runs probes in parallel on a small shared thread pool"""
+
+    def __init__(self, max_workers: int = 8):
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="probe")
+
+    def run(self, probes: Iterable[Probe]) -> ProbeSnapshot:
+        """Run all probes at once; a full round costs as much as the slowest probe"""
+        probes = list(probes)
+        started_at = time.time()
+        t0 = time.perf_counter()
+
+        futures = [(probe, self._executor.submit(self._run_one, probe)) for probe in probes]
+
+        snapshot = ProbeSnapshot(started_at=started_at, elapsed=0.0)
+        for probe, future in futures:
+            # Each probe gets its own deadline measured from the start of the round
+            remaining = max(0.0, t0 + probe.timeout - time.perf_counter())
+            try:
+                result = future.result(timeout=remaining + 0.25)
+            except FutureTimeout:
+                result = ProbeResult(
+                    name=probe.name, ok=False, latency=time.perf_counter() - t0,
+                    error=f"deadline of {probe.timeout:.1f}s exceeded",
+                    error_type='Timeout', timed_out=True,
+                )
+            snapshot.results[probe.name] = result
+
+        snapshot.elapsed = time.perf_counter() - t0
+        return snapshot
+
+    def _run_one(self, probe: Probe) -> ProbeResult:
+        start = time.perf_counter()
+        try:
+            ok, data = probe.check(probe.timeout)
+            return ProbeResult(name=probe.name, ok=bool(ok), latency=time.perf_counter() - start,
+                               data=data, status_code=200 if probe.kind == 'http' and ok else None)
+        except HttpCheckError as e:
+            return ProbeResult(name=probe.name, ok=False, latency=time.perf_counter() - start,
+                               data=e.body, status_code=e.status_code,
+                               error=str(e), error_type=type(e).__name__)
+        except Exception as e:
+            return ProbeResult(name=probe.name, ok=False, latency=time.perf_counter() - start,
+                               error=str(e), error_type=type(e).__name__,
+                               timed_out=isinstance(e, (socket.timeout, requests.exceptions.Timeout)))
+
+    def shutdown(self):
+        """Release pool threads"""
+        self._executor.shutdown(wait=False)
+
+
+def http_status_probe(name: str, base_url: str, timeout: float = 5.0) -> Probe:
+    """Probe that succeeds when GET {base_url}/status returns 200"""
+    client = get_client(base_url)
+    url = f"{base_url.rstrip('/')}/status"
+
+    def check(t: float) -> Tuple[bool, Any]:
+        # Pooled keep-alive session: repeated probes reuse the same connection
+        response = client.get(url, timeout=t)
+        if response.status_code != 200:
+            raise HttpCheckError(response.status_code, response.text[:100])
+        try:
+            payload = response.json()
+        except ValueError:
+            payload = {}
+        return True, payload
+
+    return Probe(name, check, timeout, kind='http')
+
+
+def port_probe(name: str, host: str, port: int, timeout: float = 2.0) -> Probe:
+    """Probe that succeeds when a TCP connect to host:port succeeds"""
+    def check(t: float) -> Tuple[bool, Any]:
+        with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as sock:
+            sock.settimeout(t)
+            return sock.connect_ex((host, int(port))) == 0, None
+
+    return Probe(name, check, timeout, kind='port')
+
+
+def url_port_probe(name: str, url: str, timeout: float = 2.0, default_port: int = 80) -> Probe:
+    """Port probe for the host/port of a URL"""
+    parsed = urlparse(url)
+    return port_probe(name, parsed.hostname or '127.0.0.1', parsed.port or default_port, timeout)
+
+
+_default_engine: Optional[ProbeEngine] = None
+_default_lock = threading.Lock()
+
+
+def get_probe_engine() -> ProbeEngine:
+    """Shared probe engine for scripts and the control panel"""
+    global _default_engine
+    with _default_lock:
+        if _default_engine is None:
+            _default_engine = ProbeEngine()
+        return _default_engine
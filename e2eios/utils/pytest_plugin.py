@@ -0,0 +1,280 @@
+#!/usr/bin/env python3
+"""
+Pytest Plugin for Appium iOS Automation
+Records per-test durations and, with --e2eios-devices, splits the collected
+tests across devices (longest first, balanced by history) and runs one pytest
+worker per device with E2EIOS_IOS_UDID / E2EIOS_WDA_URL pointing at it
+"""
+
+import argparse
+import json
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Any, Dict, List
+
+import pytest
+
+from e2eios.utils.device_pool import DevicePool, device_env
+from e2eios.utils.env import load_env
+from e2eios.utils.sharding import DurationHistory, Shard, ShardDevice, lpt_schedule, parse_devices
+
+ROOT = Path(__file__).resolve().parents[2]
+PLUGIN_NAME = "e2eios.utils.pytest_plugin"
+HISTORY_FILE = ".e2eios_durations.json"
+
+# Report files the controller writes from the replayed results; workers must not write them too.
+# Option -> whether it takes a value
+REPORT_OPTIONS = {
+    "--junitxml": True, "--junit-xml": True,
+    "--html": True, "--css": True, "--self-contained-html": False,
+    "--resultlog": True, "--result-log": True, "--report-log": True,
+    "--json-report": False, "--json-report-file": True,
+}
+
+
+def worker_args(args: List[str]) -> List[str]:
+    """The controller's command line minus report-output options (both "--opt value" and "--opt=value")"""
+    kept = []
+    skip_value = False
+    for arg in args:
+        if skip_value:
+            skip_value = False
+            continue
+        name = arg.split("=", 1)[0]
+        if name in REPORT_OPTIONS:
+            skip_value = REPORT_OPTIONS[name] and "=" not in arg
+            continue
+        kept.append(arg)
+    return kept
+
+
+def pytest_addoption(parser):
+    group = parser.getgroup("e2eios", "iOS device sharding")
+    group.addoption("--e2eios-devices", default=None, metavar="SPEC",
+                    help="Shard tests across devices: 'auto' (every connected device, one forward port each) "
+                         "or 'UDID=WDA_URL,UDID=WDA_URL'")
+    group.addoption("--e2eios-durations", default=None, metavar="PATH",
+                    help=f"Duration history file (default: <rootdir>/{HISTORY_FILE})")
+    group.addoption("--e2eios-log-dir", default=None, metavar="DIR",
+                    help="Where each device worker writes pytest-<udid>.log (default: logs/)")
+    group.addoption("--e2eios-ready-timeout", type=float, default=30.0, metavar="SECONDS",
+                    help="With --e2eios-devices=auto, how long to wait for every device's WDA (default: 30)")
+    # Set by the controller on its workers
+    group.addoption("--e2eios-shard", default=None, help=argparse.SUPPRESS)
+    group.addoption("--e2eios-report", default=None, help=argparse.SUPPRESS)
+
+
+def pytest_configure(config):
+    config.addinivalue_line("markers", "device(*udids): run this test only on the given device UDIDs")
+    history_path = Path(config.getoption("e2eios_durations") or config.rootpath / HISTORY_FILE)
+    if config.getoption("e2eios_devices") and not config.getoption("e2eios_shard") \
+            and not config.getoption("collectonly"):
+        plugin = ShardController(config, DurationHistory(history_path))
+    else:
+        plugin = DurationRecorder(config, history_path)
+    config.pluginmanager.register(plugin, "e2eios-sharding")
+
+
+def device_affinity(item) -> List[str]:
+    """UDIDs from every @pytest.mark.device(...) on the test"""
+    return [udid for mark in item.iter_markers("device") for udid in mark.args]
+
+
+def current_device() -> ShardDevice:
+    """The device this process targets (.env values with E2EIOS_ overrides applied)"""
+    env = load_env(ROOT / "e2eios" / "config" / ".env")
+    return ShardDevice(env.get("IOS_UDID", ""), env.get("WDA_URL", "http://127.0.0.1:8200"))
+
+
+@pytest.fixture(scope="session")
+def ios_device() -> ShardDevice:
+    """UDID and WDA URL of the device this worker runs on"""
+    return current_device()
+
+
+class DurationRecorder:
+    """Runs in single-device runs and in shard workers: times tests and applies affinity"""
+
+    def __init__(self, config, history_path: Path):
+        self.config = config
+        self.history_path = history_path
+        self.shard_file = config.getoption("e2eios_shard")
+        self.report_file = config.getoption("e2eios_report")
+        self.udid = current_device().udid
+        self.results: Dict[str, Dict[str, Any]] = {}
+
+    def pytest_collection_modifyitems(self, config, items):
+        if not self.shard_file:
+            return
+        wanted = set(json.loads(Path(self.shard_file).read_text(encoding="utf-8")))
+        selected = [item for item in items if item.nodeid in wanted]
+        deselected = [item for item in items if item.nodeid not in wanted]
+        if deselected:
+            config.hook.pytest_deselected(items=deselected)
+            items[:] = selected
+
+    def pytest_runtest_setup(self, item):
+        udids = device_affinity(item)
+        if udids and self.udid and self.udid not in udids:
+            pytest.skip(f"pinned to {', '.join(udids)}, running on {self.udid}")
+
+    def pytest_runtest_logreport(self, report):
+        entry = self.results.setdefault(report.nodeid, {'outcome': 'passed', 'duration': 0.0,
+                                                         'when': 'call', 'longrepr': None})
+        entry['duration'] += report.duration
+        if report.outcome != 'passed' and entry['outcome'] == 'passed':
+            entry['outcome'] = report.outcome
+            entry['when'] = report.when
+            if report.skipped and isinstance(report.longrepr, tuple):
+                entry['longrepr'] = report.longrepr[2]
+            else:
+                entry['longrepr'] = report.longreprtext
+
+    def pytest_sessionfinish(self, session, exitstatus):
+        if self.report_file:
+            # Worker: the controller merges durations, so the history file has a single writer
+            data = {'udid': self.udid, 'exitstatus': int(exitstatus), 'tests': self.results}
+            Path(self.report_file).write_text(json.dumps(data), encoding="utf-8")
+            return
+        ran = {n: r['duration'] for n, r in self.results.items() if r['outcome'] != 'skipped'}
+        if ran:
+            history = DurationHistory(self.history_path)
+            history.update(ran)
+            history.save()
+
+
+class ShardController:
+    """Schedules the collected tests onto devices and replays the workers' results"""
+
+    def __init__(self, config, history: DurationHistory):
+        self.config = config
+        self.history = history
+        self.shards: List[Shard] = []
+        self.timings: Dict[str, Dict[str, Any]] = {}
+        self.wall_time = 0.0
+        self.log_dir = Path(config.getoption("e2eios_log_dir") or ROOT / "logs")
+        self._pool = None
+
+    # ---- devices ----
+
+    def devices(self) -> List[ShardDevice]:
+        spec = self.config.getoption("e2eios_devices")
+        if spec.strip().lower() != "auto":
+            return parse_devices(spec)
+        self._pool = DevicePool.from_env(load_env(ROOT / "e2eios" / "config" / ".env"))
+        devices = self._pool.prepare(self.config.getoption("e2eios_ready_timeout"))
+        return [ShardDevice(d.udid, d.wda_url) for d in devices if d.healthy]
+
+    def pytest_unconfigure(self, config):
+        if self._pool is not None:
+            self._pool.close()
+
+    # ---- run ----
+
+    @pytest.hookimpl(tryfirst=True)
+    def pytest_runtestloop(self, session):
+        if session.testsfailed and not session.config.option.continue_on_collection_errors:
+            raise session.Interrupted(f"{session.testsfailed} error(s) during collection")
+        if not session.items:
+            return True
+        devices = self.devices()
+        if not devices:
+            raise pytest.UsageError("--e2eios-devices: no healthy devices found")
+
+        items = {item.nodeid: item for item in session.items}
+        affinity = {nodeid: device_affinity(item) for nodeid, item in items.items()}
+        self.shards = [s for s in lpt_schedule(self.history.estimate(items), devices, affinity) if s.nodeids]
+
+        start = time.perf_counter()
+        with tempfile.TemporaryDirectory(prefix="e2eios-shards-") as workdir:
+            reports = self._run_workers(Path(workdir))
+        self.wall_time = time.perf_counter() - start
+
+        durations = {}
+        for shard in self.shards:
+            report = reports.get(shard.device.udid) or {}
+            tests = report.get('tests', {})
+            for nodeid in shard.nodeids:
+                result = tests.get(nodeid) or {
+                    'outcome': 'failed', 'when': 'call', 'duration': 0.0,
+                    'longrepr': f"Worker for {shard.device.udid} exited with code {report.get('exitstatus', '?')} "
+                                f"before reporting this test; see {self._log_path(shard)}",
+                }
+                if result['outcome'] != 'skipped' and nodeid in tests:
+                    durations[nodeid] = result['duration']
+                self._replay(items[nodeid], result)
+        self.history.update(durations)
+        self.history.save()
+        return True
+
+    def _log_path(self, shard: Shard) -> Path:
+        return self.log_dir / f"pytest-{shard.device.udid}.log"
+
+    def _run_workers(self, workdir: Path) -> Dict[str, Dict[str, Any]]:
+        """One pytest process per shard, all at once; returns each worker's report"""
+        args = worker_args(list(self.config.invocation_params.args))
+        procs = []
+        try:
+            for index, shard in enumerate(self.shards):
+                shard_file = workdir / f"shard-{index}.json"
+                report_file = workdir / f"report-{index}.json"
+                shard_file.write_text(json.dumps(shard.nodeids), encoding="utf-8")
+                log_path = self._log_path(shard)
+                log_path.parent.mkdir(parents=True, exist_ok=True)
+                # Same rootdir as the controller so node ids match; "=" keeps the temp paths out of rootdir discovery
+                command = [sys.executable, "-m", "pytest", *args, "-p", PLUGIN_NAME, "-p", "no:cacheprovider",
+                           f"--rootdir={self.config.rootpath}", f"--e2eios-shard={shard_file}",
+                           f"--e2eios-report={report_file}"]
+                log = open(log_path, "w", encoding="utf-8")
+                proc = subprocess.Popen(command, cwd=str(self.config.invocation_params.dir),
+                                        env=device_env(shard.device), stdout=log, stderr=subprocess.STDOUT)
+                procs.append((shard, proc, log, report_file, time.perf_counter()))
+
+            reports = {}
+            for shard, proc, log, report_file, started in procs:
+                returncode = proc.wait()
+                log.close()
+                self.timings[shard.device.udid] = {'elapsed': time.perf_counter() - started, 'returncode': returncode}
+                try:
+                    reports[shard.device.udid] = json.loads(report_file.read_text(encoding="utf-8"))
+                except (OSError, ValueError):
+                    reports[shard.device.udid] = {'exitstatus': returncode, 'tests': {}}
+            return reports
+        finally:
+            for _, proc, log, _, _ in procs:
+                if proc.poll() is None:
+                    proc.terminate()
+                log.close()
+
+    def _replay(self, item, result: Dict[str, Any]):
+        """Feed a worker's result through the normal report hooks (terminal, junitxml, html, exit code)"""
+        hook = self.config.hook
+        hook.pytest_runtest_logstart(nodeid=item.nodeid, location=item.location)
+        longrepr = result.get('longrepr')
+        if result['outcome'] == 'skipped':
+            longrepr = (str(item.path), (item.location[1] or 0) + 1, f"Skipped: {longrepr}")
+        report = pytest.TestReport(item.nodeid, item.location, {k: 1 for k in item.keywords}, result['outcome'],
+                            longrepr, result.get('when', 'call'), duration=result['duration'])
+        hook.pytest_runtest_logreport(report=report)
+        hook.pytest_runtest_logfinish(nodeid=item.nodeid, location=item.location)
+
+    # ---- reporting ----
+
+    def pytest_terminal_summary(self, terminalreporter):
+        if not self.shards:
+            return
+        terminalreporter.write_sep("-", "e2eios device shards")
+        busy = 0.0
+        for shard in self.shards:
+            timing = self.timings.get(shard.device.udid, {})
+            elapsed = timing.get('elapsed', 0.0)
+            busy += elapsed
+            terminalreporter.write_line(
+                f"{shard.device.udid}: {len(shard.nodeids)} tests, predicted {shard.predicted:.1f}s, "
+                f"took {elapsed:.1f}s (exit {timing.get('returncode')}) log: {self._log_path(shard)}")
+        terminalreporter.write_line(
+            f"wall {self.wall_time:.1f}s for {busy:.1f}s of device time on {len(self.shards)} device(s); "
+            f"history: {len(self.history)} tests in {self.history.path}")
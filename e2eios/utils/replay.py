@@ -0,0 +1,380 @@
+#!/usr/bin/env python3
+"""
+HTTP Record and Replay for Appium iOS Automation
+A recording proxy in front of APPIUM_URL/WDA_URL that writes every exchange
+to a gzip JSON Lines session file, and a replay server that answers the same
+requests from that file (in recorded order, optionally with the recorded
+latency scaled down) so scripts can run without a device
+"""
+
+import base64
+import gzip
+import json
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+from e2eios.utils.http_client import EndpointClient
+
+FORMAT = "e2eios-replay/1"
+
+# Session ids differ between runs (and the session pool may reuse one), so they never take part in matching
+_SESSION_ID = re.compile(r"^(/(?:wd/hub/)?session)/[^/]+")
+
+# Hop-by-hop and length headers are recomputed by the server
+_SKIP_HEADERS = {"connection", "keep-alive", "transfer-encoding", "content-length", "content-encoding", "server",
+                 "date"}
+
+# Upstream timeout: creating a session can take a minute on a cold WDA
+PROXY_TIMEOUT = 300.0
+
+
+def _open(path: Path, mode: str):
+    """Text handle; .gz files are compressed transparently"""
+    if path.suffix == ".gz":
+        return gzip.open(path, mode + "t", encoding="utf-8")
+    return open(path, mode, encoding="utf-8")
+
+
+def _encode_body(data: bytes) -> Dict[str, Any]:
+    if not data:
+        return {}
+    try:
+        return {'text': data.decode("utf-8")}
+    except UnicodeDecodeError:
+        return {'b64': base64.b64encode(data).decode("ascii")}
+
+
+def _decode_body(entry: Dict[str, Any]) -> bytes:
+    if entry.get('text') is not None:
+        return entry['text'].encode("utf-8")
+    if entry.get('b64') is not None:
+        return base64.b64decode(entry['b64'])
+    return b""
+
+
+def normalize_path(path: str) -> str:
+    """Path used for matching: session id replaced by a placeholder, trailing slash dropped"""
+    path = _SESSION_ID.sub(r"\1/:id", path)
+    return path.rstrip("/") or "/"
+
+
+def normalize_body(data: bytes) -> str:
+    """Request body used for matching: JSON with sorted keys, otherwise the raw text"""
+    if not data:
+        return ""
+    try:
+        return json.dumps(json.loads(data), sort_keys=True, separators=(",", ":"))
+    except ValueError:
+        return data.decode("utf-8", "replace")
+
+
+class Exchange:
+    """One recorded request/response pair"""
+    __slots__ = ('target', 'at', 'method', 'path', 'request', 'status', 'headers', 'response', 'latency')
+
+    def __init__(self, target: str, at: float, method: str, path: str, request: bytes,
+                 status: int, headers: Dict[str, str], response: bytes, latency: float):
+        self.target = target
+        self.at = at
+        self.method = method
+        self.path = path
+        self.request = request
+        self.status = status
+        self.headers = headers
+        self.response = response
+        self.latency = latency
+
+    @property
+    def key(self) -> Tuple[str, str, str]:
+        return self.method, normalize_path(self.path), normalize_body(self.request)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            'target': self.target,
+            'at': round(self.at, 4),
+            'method': self.method,
+            'path': self.path,
+            'request': _encode_body(self.request),
+            'status': self.status,
+            'headers': self.headers,
+            'response': _encode_body(self.response),
+            'latency': round(self.latency, 4),
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "Exchange":
+        return cls(data['target'], data.get('at', 0.0), data['method'], data['path'],
+                   _decode_body(data.get('request') or {}), data['status'], data.get('headers') or {},
+                   _decode_body(data.get('response') or {}), data.get('latency', 0.0))
+
+
+class SessionWriter:
+    """Appends exchanges from all proxy threads to one session file"""
+
+    def __init__(self, path, targets: Dict[str, str]):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.started = time.perf_counter()
+        self.count = 0
+        self._lock = threading.Lock()
+        self._file = _open(self.path, "w")
+        self._write({'format': FORMAT, 'recorded_at': time.time(), 'targets': targets})
+
+    def _write(self, data: Dict[str, Any]):
+        self._file.write(json.dumps(data, ensure_ascii=False, separators=(",", ":")) + "\n")
+
+    def add(self, exchange: Exchange):
+        with self._lock:
+            if self._file is None:
+                return
+            self._write(exchange.to_dict())
+            self.count += 1
+
+    def close(self):
+        with self._lock:
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+
+
+class ReplaySession:
+    """Recorded exchanges loaded from a session file"""
+
+    def __init__(self, exchanges: List[Exchange], header: Optional[Dict[str, Any]] = None):
+        self.exchanges = exchanges
+        self.header = header or {}
+
+    @classmethod
+    def load(cls, path) -> "ReplaySession":
+        header: Dict[str, Any] = {}
+        exchanges: List[Exchange] = []
+        with _open(Path(path), "r") as f:
+            for line in f:
+                if not line.strip():
+                    continue
+                data = json.loads(line)
+                if 'format' in data:
+                    header = data
+                else:
+                    exchanges.append(Exchange.from_dict(data))
+        return cls(exchanges, header)
+
+    @property
+    def targets(self) -> List[str]:
+        return sorted({e.target for e in self.exchanges} | set(self.header.get('targets', {})))
+
+    def summary(self) -> Dict[str, Any]:
+        per_target: Dict[str, Dict[str, Any]] = {}
+        for e in self.exchanges:
+            entry = per_target.setdefault(e.target, {'requests': 0, 'latency': 0.0, 'bytes': 0})
+            entry['requests'] += 1
+            entry['latency'] = round(entry['latency'] + e.latency, 4)
+            entry['bytes'] += len(e.response)
+        duration = max((e.at + e.latency for e in self.exchanges), default=0.0)
+        return {'recorded_at': self.header.get('recorded_at'), 'duration': round(duration, 3), 'targets': per_target}
+
+
+class ReplayMatcher:
+    """Answers requests for one target in recorded order; the last response repeats once a key runs out"""
+
+    def __init__(self, exchanges: List[Exchange]):
+        self._lock = threading.Lock()
+        self._exact: Dict[Tuple[str, str, str], List[Exchange]] = {}
+        self._loose: Dict[Tuple[str, str], List[Exchange]] = {}
+        self._cursors: Dict[Any, int] = {}
+        self.hits = 0
+        self.repeats = 0
+        self.misses: List[str] = []
+        for exchange in exchanges:
+            key = exchange.key
+            self._exact.setdefault(key, []).append(exchange)
+            self._loose.setdefault(key[:2], []).append(exchange)
+
+    def _next(self, table: Dict[Any, List[Exchange]], key) -> Optional[Exchange]:
+        candidates = table.get(key)
+        if not candidates:
+            return None
+        cursor = self._cursors.get((id(table), key), 0)
+        if cursor >= len(candidates):
+            self.repeats += 1
+            return candidates[-1]
+        self._cursors[(id(table), key)] = cursor + 1
+        return candidates[cursor]
+
+    def match(self, method: str, path: str, body: bytes) -> Optional[Exchange]:
+        """Exact (method, path, body) match first, then (method, path) when only the body differs"""
+        key = (method, normalize_path(path), normalize_body(body))
+        with self._lock:
+            exchange = self._next(self._exact, key) or self._next(self._loose, key[:2])
+            if exchange is None:
+                self.misses.append(f"{method} {path}")
+            else:
+                self.hits += 1
+            return exchange
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {'hits': self.hits, 'repeats': self.repeats, 'misses': len(self.misses),
+                    'missed': self.misses[:20]}
+
+
+class _Handler(BaseHTTPRequestHandler):
+    """Hands every request to server.handle(handler, method): recording or replaying"""
+    protocol_version = "HTTP/1.1"
+    # Headers and body are separate writes; avoid Nagle/delayed-ACK stalls
+    disable_nagle_algorithm = True
+
+    def log_message(self, format, *args):
+        pass
+
+    def _read_body(self) -> bytes:
+        length = int(self.headers.get("Content-Length") or 0)
+        return self.rfile.read(length) if length else b""
+
+    def _send(self, status: int, body: bytes, headers: Optional[Dict[str, str]] = None):
+        self.send_response(status)
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        if not headers or not any(n.lower() == "content-type" for n in headers):
+            self.send_header("Content-Type", "application/json; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _error(self, status: int, error: str, message: str):
+        self._send(status, json.dumps({'value': {'error': error, 'message': message}}).encode("utf-8"))
+
+    def do_GET(self):
+        self.server.handle(self, "GET")
+
+    def do_POST(self):
+        self.server.handle(self, "POST")
+
+    def do_DELETE(self):
+        self.server.handle(self, "DELETE")
+
+
+def _record_exchange(handler: _Handler, method: str):
+    """Forward to server.upstream and log the exchange"""
+    server = handler.server
+    body = handler._read_body()
+    headers = {"Content-Type": handler.headers["Content-Type"]} if handler.headers.get("Content-Type") else {}
+    at = time.perf_counter() - server.writer.started
+    start = time.perf_counter()
+    try:
+        response = server.upstream.request(method, handler.path, data=body or None, headers=headers,
+                                           timeout=PROXY_TIMEOUT)
+    except Exception as e:
+        handler._error(502, "unknown error", f"{server.target} unreachable: {e}")
+        return
+    latency = time.perf_counter() - start
+    kept = {k: v for k, v in response.headers.items() if k.lower() not in _SKIP_HEADERS}
+    server.writer.add(Exchange(server.target, at, method, handler.path, body,
+                               response.status_code, kept, response.content, latency))
+    handler._send(response.status_code, response.content, kept)
+
+
+def _replay_exchange(handler: _Handler, method: str):
+    """Answer from server.matcher with the recorded response"""
+    server = handler.server
+    body = handler._read_body()
+    exchange = server.matcher.match(method, handler.path, body)
+    if exchange is None:
+        handler._error(404, "unknown command", f"not in recording: {method} {handler.path}")
+        return
+    if server.speed > 0:
+        time.sleep(exchange.latency / server.speed)
+    handler._send(exchange.status, exchange.response, exchange.headers)
+
+
+class _Server(ThreadingHTTPServer):
+    daemon_threads = True
+
+    @property
+    def url(self) -> str:
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}"
+
+
+class _Servers:
+    """Common start/stop for one HTTP server per target"""
+
+    def __init__(self):
+        self.servers: Dict[str, _Server] = {}
+        self._threads: List[threading.Thread] = []
+
+    @property
+    def urls(self) -> Dict[str, str]:
+        return {target: server.url for target, server in self.servers.items()}
+
+    def env(self) -> Dict[str, str]:
+        """E2EIOS_<TARGET>_URL overrides that point load_env() users at these servers"""
+        return {f"E2EIOS_{target.upper()}_URL": url for target, url in self.urls.items()}
+
+    def start(self):
+        for target, server in self.servers.items():
+            thread = threading.Thread(target=server.serve_forever, name=f"{type(self).__name__.lower()}-{target}",
+                                      daemon=True)
+            thread.start()
+            self._threads.append(thread)
+        return self
+
+    def stop(self):
+        for server in self.servers.values():
+            server.shutdown()
+            server.server_close()
+        self._threads.clear()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+
+class Recorder(_Servers):
+    """Recording proxies for {target: upstream URL}, e.g. {'appium': APPIUM_URL, 'wda': WDA_URL}"""
+
+    def __init__(self, path, targets: Dict[str, str], host: str = "127.0.0.1",
+                 ports: Optional[Dict[str, int]] = None):
+        super().__init__()
+        self.writer = SessionWriter(path, targets)
+        for target, upstream in targets.items():
+            server = _Server((host, (ports or {}).get(target, 0)), _Handler)
+            server.handle = _record_exchange
+            server.target = target
+            server.upstream = EndpointClient(upstream, timeout=PROXY_TIMEOUT)
+            server.writer = self.writer
+            self.servers[target] = server
+
+    @property
+    def count(self) -> int:
+        return self.writer.count
+
+    def stop(self):
+        super().stop()
+        for server in self.servers.values():
+            server.upstream.close()
+        self.writer.close()
+
+
+class Replayer(_Servers):
+    """Replay servers for every target in a session; speed=0 answers immediately, 1 at recorded latency"""
+
+    def __init__(self, session, host: str = "127.0.0.1", ports: Optional[Dict[str, int]] = None,
+                 speed: float = 0.0):
+        super().__init__()
+        self.session = session if isinstance(session, ReplaySession) else ReplaySession.load(session)
+        for target in self.session.targets:
+            server = _Server((host, (ports or {}).get(target, 0)), _Handler)
+            server.handle = _replay_exchange
+            server.matcher = ReplayMatcher([e for e in self.session.exchanges if e.target == target])
+            server.speed = speed
+            self.servers[target] = server
+
+    def stats(self) -> Dict[str, Dict[str, Any]]:
+        return {target: server.matcher.stats() for target, server in self.servers.items()}
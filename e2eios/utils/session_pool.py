@@ -0,0 +1,506 @@
+#!/usr/bin/env python3
+"""
+Appium Session Pool for Appium iOS Automation
+Keeps pre-created XCUITest sessions warm per capability set (UDID, bundleId,
+WDA URL), hands them out to scripts, resets app state between leases and
+retires sessions that are too old or keep failing. A SessionBroker hosts the
+pool in a long-lived process (daemon.py serve); scripts lease a session id
+over HTTP and attach to it instead of creating and quitting their own
+"""
+
+import itertools
+import json
+import threading
+import time
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Callable, Dict, Iterator, List, NamedTuple, Optional
+
+DEFAULT_BROKER_URL = "http://127.0.0.1:4731"
+
+
+class SessionKey(NamedTuple):
+    """Capability set that identifies interchangeable sessions"""
+    udid: str
+    bundle_id: str
+    wda_url: str
+
+
+def build_options(key: SessionKey, extra_caps: Optional[Dict[str, Any]] = None):
+    """AppiumOptions for a session key (same capabilities as open_settings.py)"""
+    from appium.options.common import AppiumOptions
+
+    opts = AppiumOptions()
+    opts.set_capability("platformName", "iOS")
+    opts.set_capability("appium:automationName", "XCUITest")
+    opts.set_capability("appium:udid", key.udid)
+    opts.set_capability("appium:webDriverAgentUrl", key.wda_url)
+    opts.set_capability("appium:bundleId", key.bundle_id)
+    opts.set_capability("appium:noReset", True)
+    opts.set_capability("appium:autoAcceptAlerts", True)
+    opts.set_capability("appium:newCommandTimeout", 120)
+    for name, value in (extra_caps or {}).items():
+        opts.set_capability(name, value)
+    return opts
+
+
+def attach_driver(appium_url: str, session_id: str, key: SessionKey):
+    """Appium driver bound to an existing session; quit() leaves the session to its owner"""
+    from appium import webdriver
+
+    class AttachedRemote(webdriver.Remote):
+        def start_session(self, capabilities, *args, **kwargs):
+            # No POST /session: reuse the broker's session
+            self.session_id = session_id
+            self.caps = dict(capabilities)
+
+        def quit(self):
+            pass
+
+    return AttachedRemote(appium_url, options=build_options(key))
+
+
+def ping_session(driver):
+    """Default keep-alive: a cheap command so Appium's newCommandTimeout never fires on idle sessions"""
+    driver.get_window_size()
+
+
+def reset_app(driver, key: SessionKey):
+    """Default reset between leases: restart the app under test"""
+    try:
+        driver.terminate_app(key.bundle_id)
+    except Exception:
+        pass
+    driver.activate_app(key.bundle_id)
+
+
+class PooledSession:
+    """A live driver plus bookkeeping"""
+
+    def __init__(self, key: SessionKey, driver: Any):
+        self.key = key
+        self.driver = driver
+        self.created_at = time.monotonic()
+        self.leases = 0
+        self.errors = 0
+        self.in_use = False
+
+    @property
+    def age(self) -> float:
+        return time.monotonic() - self.created_at
+
+
+class SessionPoolStats:
+    """Counters for reuse and waiting"""
+
+    def __init__(self):
+        self.created = 0
+        self.reused = 0
+        self.retired = 0
+        self.leases = 0
+        self.create_time = 0.0
+        self.wait_time = 0.0
+        self.max_wait = 0.0
+        self.reset_time = 0.0
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            'created': self.created,
+            'reused': self.reused,
+            'retired': self.retired,
+            'leases': self.leases,
+            'reuse_ratio': round(self.reused / self.leases, 3) if self.leases else 0.0,
+            'avg_create_time': round(self.create_time / self.created, 4) if self.created else 0.0,
+            'avg_wait_time': round(self.wait_time / self.leases, 4) if self.leases else 0.0,
+            'max_wait_time': round(self.max_wait, 4),
+            'avg_reset_time': round(self.reset_time / self.reused, 4) if self.reused else 0.0,
+        }
+
+
+class SessionPool:
+    """Warm Appium sessions keyed by capability set"""
+
+    def __init__(self, appium_url: str, factory: Optional[Callable[[SessionKey], Any]] = None,
+                 max_per_key: int = 2, max_age: float = 900.0, max_errors: int = 3,
+                 reset: Optional[Callable[[Any, SessionKey], None]] = reset_app):
+        self.appium_url = appium_url
+        self.factory = factory or self._remote_factory
+        self.max_per_key = max_per_key
+        self.max_age = max_age
+        self.max_errors = max_errors
+        self.reset = reset
+
+        self._sessions: Dict[SessionKey, List[PooledSession]] = {}
+        self._creating: Dict[SessionKey, int] = {}
+        self._cond = threading.Condition()
+        self._stats = SessionPoolStats()
+
+    def _remote_factory(self, key: SessionKey):
+        from appium import webdriver
+        return webdriver.Remote(self.appium_url, options=build_options(key))
+
+    # ---- warm-up ----
+
+    def warm(self, key: SessionKey, count: int = 1, wait: bool = False) -> List[threading.Thread]:
+        """Pre-create up to `count` idle sessions for key in the background"""
+        threads = []
+        with self._cond:
+            missing = min(count, self.max_per_key) - self._size(key)
+            for _ in range(max(0, missing)):
+                self._creating[key] = self._creating.get(key, 0) + 1
+                t = threading.Thread(target=self._create_into_pool, args=(key,), daemon=True)
+                threads.append(t)
+        for t in threads:
+            t.start()
+        if wait:
+            for t in threads:
+                t.join()
+        return threads
+
+    def _create_into_pool(self, key: SessionKey):
+        try:
+            session = self._create(key)
+        except Exception as e:
+            print(f"Session warm-up failed for {key.udid}: {e}")
+            session = None
+        with self._cond:
+            self._creating[key] -= 1
+            if session is not None:
+                self._sessions.setdefault(key, []).append(session)
+            self._cond.notify_all()
+
+    def _create(self, key: SessionKey) -> PooledSession:
+        start = time.perf_counter()
+        driver = self.factory(key)
+        with self._cond:
+            self._stats.created += 1
+            self._stats.create_time += time.perf_counter() - start
+        return PooledSession(key, driver)
+
+    def _size(self, key: SessionKey) -> int:
+        return len(self._sessions.get(key, [])) + self._creating.get(key, 0)
+
+    # ---- leasing ----
+
+    def acquire(self, key: SessionKey, timeout: Optional[float] = None) -> PooledSession:
+        """Lease a session for key: an idle warm one, a new one, or wait for a release"""
+        start = time.perf_counter()
+        deadline = None if timeout is None else time.monotonic() + timeout
+        create = False
+        with self._cond:
+            while True:
+                self._retire_expired(key)
+                idle = next((s for s in self._sessions.get(key, []) if not s.in_use), None)
+                if idle is not None:
+                    idle.in_use = True
+                    session = idle
+                    break
+                if self._size(key) < self.max_per_key:
+                    self._creating[key] = self._creating.get(key, 0) + 1
+                    create = True
+                    break
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    raise TimeoutError(f"No Appium session available for {key.udid}")
+                self._cond.wait(remaining)
+
+        if create:
+            try:
+                session = self._create(key)
+            except Exception:
+                with self._cond:
+                    self._creating[key] -= 1
+                    self._cond.notify_all()
+                raise
+            session.in_use = True
+            with self._cond:
+                self._creating[key] -= 1
+                self._sessions.setdefault(key, []).append(session)
+        elif session.leases > 0 and self.reset is not None:
+            # Reset app state left behind by the previous lease
+            reset_start = time.perf_counter()
+            try:
+                self.reset(session.driver, key)
+            except Exception:
+                session.errors += 1
+            with self._cond:
+                self._stats.reset_time += time.perf_counter() - reset_start
+
+        waited = time.perf_counter() - start
+        with self._cond:
+            session.leases += 1
+            self._stats.leases += 1
+            if session.leases > 1:
+                self._stats.reused += 1
+            self._stats.wait_time += waited
+            self._stats.max_wait = max(self._stats.max_wait, waited)
+        return session
+
+    def release(self, session: PooledSession, failed: bool = False):
+        """Return a session; failed leases count towards retirement"""
+        with self._cond:
+            if failed:
+                session.errors += 1
+            session.in_use = False
+            if session.errors >= self.max_errors or session.age >= self.max_age:
+                self._retire(session)
+            self._cond.notify_all()
+
+    @contextmanager
+    def lease(self, key: SessionKey, timeout: Optional[float] = None) -> Iterator[Any]:
+        """Context manager yielding a driver; exceptions mark the session as failed"""
+        session = self.acquire(key, timeout)
+        try:
+            yield session.driver
+        except Exception:
+            self.release(session, failed=True)
+            raise
+        else:
+            self.release(session)
+
+    # ---- retirement ----
+
+    def _retire_expired(self, key: SessionKey):
+        for session in list(self._sessions.get(key, [])):
+            if not session.in_use and (session.age >= self.max_age or session.errors >= self.max_errors):
+                self._retire(session)
+
+    def _retire(self, session: PooledSession):
+        sessions = self._sessions.get(session.key, [])
+        if session in sessions:
+            sessions.remove(session)
+            self._stats.retired += 1
+            threading.Thread(target=self._quit, args=(session,), daemon=True).start()
+
+    @staticmethod
+    def _quit(session: PooledSession):
+        try:
+            session.driver.quit()
+        except Exception:
+            pass
+
+    def heartbeat(self, ping: Callable[[Any], None] = ping_session):
+        """Ping idle sessions; the ones that no longer answer are retired"""
+        with self._cond:
+            idle = [s for group in self._sessions.values() for s in group if not s.in_use]
+            for session in idle:
+                session.in_use = True
+        for session in idle:
+            try:
+                ping(session.driver)
+            except Exception:
+                session.errors = self.max_errors
+            self.release(session)
+
+    def close(self):
+        """Quit every pooled session"""
+        with self._cond:
+            sessions = [s for group in self._sessions.values() for s in group]
+            self._sessions.clear()
+        for session in sessions:
+            self._quit(session)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._cond:
+            data = self._stats.to_dict()
+            data['idle'] = sum(1 for g in self._sessions.values() for s in g if not s.in_use)
+            data['in_use'] = sum(1 for g in self._sessions.values() for s in g if s.in_use)
+            return data
+
+
+_pools: Dict[str, SessionPool] = {}
+_pools_lock = threading.Lock()
+
+
+def get_session_pool(appium_url: str, **kwargs) -> SessionPool:
+    """Shared session pool per Appium server"""
+    with _pools_lock:
+        if appium_url not in _pools:
+            _pools[appium_url] = SessionPool(appium_url, **kwargs)
+        return _pools[appium_url]
+
+
+class _Lease(NamedTuple):
+    session: PooledSession
+    expires: float
+
+
+class _BrokerHandler(BaseHTTPRequestHandler):
+    def _reply(self, status: int, payload: Dict[str, Any]):
+        body = json.dumps(payload).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        if self.path.split("?", 1)[0] != "/stats":
+            self.send_error(404)
+            return
+        self._reply(200, self.server.broker.stats())
+
+    def do_POST(self):
+        broker: SessionBroker = self.server.broker
+        length = int(self.headers.get("Content-Length") or 0)
+        try:
+            body = json.loads(self.rfile.read(length) or b"{}")
+            if self.path == "/lease":
+                key = SessionKey(body["udid"], body["bundle_id"], body["wda_url"])
+                self._reply(200, broker.lease(key, body.get("timeout")))
+            elif self.path == "/renew":
+                self._reply(200, {'renewed': broker.renew(body["lease"]), 'ttl': broker.lease_ttl})
+            elif self.path == "/release":
+                self._reply(200, {'released': broker.release(body["lease"], bool(body.get("failed")))})
+            else:
+                self.send_error(404)
+        except TimeoutError as e:
+            self._reply(503, {'error': str(e)})
+        except (KeyError, TypeError, ValueError) as e:
+            self._reply(400, {'error': f"bad request: {e}"})
+        except Exception as e:
+            self._reply(502, {'error': f"session creation failed: {e}"})
+
+    def log_message(self, format, *args):
+        pass
+
+
+class SessionBroker:
+    """Hosts a SessionPool for other processes: lease over HTTP, attach by session id, renew, release.
+    A lease that is not renewed within lease_ttl (its script died) is reclaimed"""
+
+    def __init__(self, pool: SessionPool, host: str = "127.0.0.1", port: int = 4731,
+                 lease_ttl: float = 120.0, keepalive: float = 60.0,
+                 ping: Callable[[Any], None] = ping_session):
+        self.pool = pool
+        self.lease_ttl = lease_ttl
+        self.keepalive = keepalive
+        self.ping = ping
+        self.httpd = ThreadingHTTPServer((host, port), _BrokerHandler)
+        self.httpd.daemon_threads = True
+        self.httpd.broker = self
+        self._leases: Dict[str, _Lease] = {}
+        self._warm: Dict[SessionKey, int] = {}
+        self._ids = itertools.count(1)
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._threads: List[threading.Thread] = []
+
+    @property
+    def url(self) -> str:
+        host, port = self.httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self) -> "SessionBroker":
+        self._threads = [
+            threading.Thread(target=self.httpd.serve_forever, name="session-broker", daemon=True),
+            threading.Thread(target=self._maintain, name="session-keepalive", daemon=True),
+        ]
+        for t in self._threads:
+            t.start()
+        return self
+
+    def warm(self, key: SessionKey, count: int = 1):
+        """Keep `count` sessions for key ready; retired ones are replaced on the next keep-alive"""
+        self._warm[key] = count
+        self.pool.warm(key, count)
+
+    def lease(self, key: SessionKey, timeout: Optional[float] = None) -> Dict[str, Any]:
+        session = self.pool.acquire(key, timeout)
+        lease_id = f"L{next(self._ids)}"
+        with self._lock:
+            self._leases[lease_id] = _Lease(session, time.monotonic() + self.lease_ttl)
+        return {'lease': lease_id, 'session_id': session.driver.session_id, 'appium_url': self.pool.appium_url,
+                'reused': session.leases > 1, 'ttl': self.lease_ttl}
+
+    def renew(self, lease_id: str) -> bool:
+        """Push a live lease's expiry lease_ttl into the future; False when it is unknown or already reclaimed"""
+        with self._lock:
+            lease = self._leases.get(lease_id)
+            if lease is None:
+                return False
+            self._leases[lease_id] = lease._replace(expires=time.monotonic() + self.lease_ttl)
+        return True
+
+    def release(self, lease_id: str, failed: bool = False) -> bool:
+        with self._lock:
+            lease = self._leases.pop(lease_id, None)
+        if lease is None:
+            return False
+        self.pool.release(lease.session, failed)
+        return True
+
+    def _maintain(self):
+        """Reclaim leases that stopped being renewed, and keep idle sessions alive"""
+        last_ping = time.monotonic()
+        while not self._stop.wait(min(self.keepalive, self.lease_ttl / 2)):
+            now = time.monotonic()
+            with self._lock:
+                expired = [lease_id for lease_id, lease in self._leases.items() if lease.expires <= now]
+            for lease_id in expired:
+                self.release(lease_id, failed=True)
+            if now - last_ping >= self.keepalive:
+                last_ping = now
+                self.pool.heartbeat(self.ping)
+                for key, count in list(self._warm.items()):
+                    self.pool.warm(key, count)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            leased = len(self._leases)
+        return dict(self.pool.stats(), active_leases=leased)
+
+    def stop(self):
+        self._stop.set()
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+
+@contextmanager
+def lease_session(key: SessionKey, appium_url: str, broker_url: str = DEFAULT_BROKER_URL,
+                  timeout: Optional[float] = 300.0, attach: Callable[[str, str, SessionKey], Any] = attach_driver,
+                  create: Optional[Callable[[SessionKey], Any]] = None) -> Iterator[Any]:
+    """Driver for one script run: a warm broker session if daemon.py serve is running, otherwise a fresh one"""
+    import requests
+    from e2eios.utils.http_client import get_client
+
+    client = get_client(broker_url)
+    payload = {'udid': key.udid, 'bundle_id': key.bundle_id, 'wda_url': key.wda_url, 'timeout': timeout}
+    try:
+        # Session creation can take a while when nothing is warm yet
+        response = client.post("/lease", json=payload, timeout=None if timeout is None else timeout + 120)
+    except requests.ConnectionError:
+        response = None
+    if response is None:
+        print(f"No session broker at {broker_url}; creating a session for this run")
+        driver = (create or SessionPool(appium_url).factory)(key)
+        try:
+            yield driver
+        finally:
+            driver.quit()
+        return
+
+    response.raise_for_status()
+    lease = response.json()
+    done = threading.Event()
+
+    def renew():
+        # Renew well inside the TTL so a long run keeps its session; a crash stops the renewals
+        interval = max(1.0, float(lease.get('ttl', 120.0)) / 3)
+        while not done.wait(interval):
+            try:
+                client.post("/renew", json={'lease': lease['lease']}, timeout=10)
+            except requests.RequestException:
+                pass
+
+    threading.Thread(target=renew, name="session-lease-renew", daemon=True).start()
+    failed = True
+    try:
+        yield attach(lease['appium_url'], lease['session_id'], key)
+        failed = False
+    finally:
+        done.set()
+        try:
+            client.post("/release", json={'lease': lease['lease'], 'failed': failed})
+        except requests.RequestException:
+            pass
@@ -0,0 +1,154 @@
+#!/usr/bin/env python3
+"""
+Test Sharding for Appium iOS Automation
+Keeps a history of per-test durations and splits tests across devices with
+longest-processing-time-first scheduling, so every device's shard takes about
+the same time; tests pinned to devices are placed before the free ones
+"""
+
+import heapq
+import json
+import os
+import statistics
+import threading
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+
+# Estimate for tests with no history when nothing else is known
+DEFAULT_DURATION = 1.0
+
+
+@dataclass
+class ShardDevice:
+    """A device a shard runs on"""
+    udid: str
+    wda_url: str
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {'udid': self.udid, 'wda_url': self.wda_url}
+
+
+def parse_devices(spec: str) -> List[ShardDevice]:
+    """Devices from 'UDID=WDA_URL,UDID=WDA_URL'"""
+    devices = []
+    for item in spec.split(","):
+        item = item.strip()
+        if not item:
+            continue
+        if "=" not in item:
+            raise ValueError(f"Expected UDID=WDA_URL, got: {item}")
+        udid, url = item.split("=", 1)
+        devices.append(ShardDevice(udid.strip(), url.strip()))
+    return devices
+
+
+class DurationHistory:
+    """Per-test durations in a JSON file, smoothed so one slow run doesn't reshuffle every shard"""
+
+    def __init__(self, path: Path, smoothing: float = 0.5):
+        self.path = Path(path)
+        self.smoothing = smoothing
+        self._lock = threading.Lock()
+        self._durations: Dict[str, float] = {}
+        self.load()
+
+    def load(self):
+        try:
+            data = json.loads(self.path.read_text(encoding="utf-8"))
+            durations = {k: float(v) for k, v in data.get("durations", {}).items()}
+        except (OSError, ValueError, AttributeError):
+            durations = {}
+        with self._lock:
+            self._durations = durations
+
+    def save(self):
+        """Write atomically, so a crash mid-write never loses the history"""
+        with self._lock:
+            data = {'version': 1, 'durations': dict(sorted(self._durations.items()))}
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = self.path.with_suffix(self.path.suffix + ".tmp")
+        tmp.write_text(json.dumps(data, indent=1), encoding="utf-8")
+        os.replace(tmp, self.path)
+
+    def get(self, nodeid: str) -> Optional[float]:
+        with self._lock:
+            return self._durations.get(nodeid)
+
+    def update(self, durations: Dict[str, float]):
+        with self._lock:
+            for nodeid, seconds in durations.items():
+                previous = self._durations.get(nodeid)
+                if previous is None:
+                    self._durations[nodeid] = seconds
+                else:
+                    self._durations[nodeid] = previous + self.smoothing * (seconds - previous)
+
+    def estimate(self, nodeids: Iterable[str]) -> Dict[str, float]:
+        """Expected seconds per test; tests never seen get the median of the known ones"""
+        with self._lock:
+            known = dict(self._durations)
+        nodeids = list(nodeids)
+        seen = [known[n] for n in nodeids if n in known]
+        fallback = statistics.median(seen) if seen else DEFAULT_DURATION
+        return {n: known.get(n, fallback) for n in nodeids}
+
+    def __len__(self):
+        with self._lock:
+            return len(self._durations)
+
+
+@dataclass
+class Shard:
+    """Tests assigned to one device and their predicted total time"""
+    device: ShardDevice
+    nodeids: List[str] = field(default_factory=list)
+    predicted: float = 0.0
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            'device': self.device.to_dict(),
+            'tests': len(self.nodeids),
+            'predicted': round(self.predicted, 3),
+        }
+
+
+def lpt_schedule(durations: Dict[str, float], devices: Sequence[ShardDevice],
+                 affinity: Optional[Dict[str, Sequence[str]]] = None) -> List[Shard]:
+    """Longest job first onto the least-loaded device it may run on
+
+    affinity maps a test to the UDIDs it must run on; a test pinned only to
+    devices that are not present goes to the least-loaded device (the worker
+    skips it there).
+    """
+    if not devices:
+        raise ValueError("No devices to schedule on")
+    affinity = affinity or {}
+    shards = [Shard(device) for device in devices]
+    by_udid = {s.device.udid: s for s in shards}
+
+    def place(shard: Shard, nodeid: str):
+        shard.nodeids.append(nodeid)
+        shard.predicted += durations[nodeid]
+
+    pinned, free = [], []
+    for nodeid in durations:
+        allowed = [by_udid[u] for u in affinity.get(nodeid, ()) if u in by_udid]
+        (pinned if allowed else free).append((nodeid, allowed))
+
+    # Pinned tests have no choice, so they go first and the free ones fill around them
+    for nodeid, allowed in sorted(pinned, key=lambda p: (len(p[1]), -durations[p[0]])):
+        place(min(allowed, key=lambda s: s.predicted), nodeid)
+
+    heap: List[Tuple[float, int]] = [(s.predicted, i) for i, s in enumerate(shards)]
+    heapq.heapify(heap)
+    for nodeid, _ in sorted(free, key=lambda p: -durations[p[0]]):
+        _, index = heapq.heappop(heap)
+        place(shards[index], nodeid)
+        heapq.heappush(heap, (shards[index].predicted, index))
+
+    # Keep collection order inside each shard so module/class fixtures stay grouped
+    order = {nodeid: i for i, nodeid in enumerate(durations)}
+    for shard in shards:
+        shard.nodeids.sort(key=order.__getitem__)
+    return shards
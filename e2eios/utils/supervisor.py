@@ -0,0 +1,522 @@
+#!/usr/bin/env python3
+"""
+Service Supervisor for Appium iOS Automation
+Cross-platform replacement for tools/start.ps1 and stop.ps1: starts the
+go-ios stages (Developer Disk Image, forward, WDA) as a dependency graph,
+runs independent stages concurrently, waits for readiness with backoff,
+skips stages that are already satisfied and stops only the processes it
+started (tracked by PID, start time and command line, so a reused PID is
+never killed)
+"""
+
+import json
+import os
+import signal
+import subprocess
+import threading
+import time
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+from urllib.parse import urlparse
+
+from e2eios.utils.disk_image import DiskImageManager
+from e2eios.utils.goios import GoIosExecutor
+from e2eios.utils.probes import Probe, http_status_probe, url_port_probe
+from e2eios.utils.waits import Condition, any_of, wait_until
+
+ROOT = Path(__file__).resolve().parents[2]
+
+DEFAULT_WDA_BUNDLE = "com.yourwdaname.WebDriverAgentRunner"
+DEFAULT_WDA_XCTEST = "WebDriverAgentRunner.xctest"
+
+# Called with (message, level) for progress output, e.g. ControlPanel.log_console
+LogFn = Callable[[str, str], None]
+
+
+@dataclass
+class Stage:
+    """One startup step: a go-ios command plus how to tell it is done"""
+    name: str
+    args: Sequence[str]
+    # Long-running stages stay up and are ready when this probe passes;
+    # stages without one are one-shot commands that are ready when they exit 0
+    ready: Optional[Probe] = None
+    # Probe that means the stage's goal is already met, so it is skipped
+    satisfied: Optional[Probe] = None
+    depends_on: Tuple[str, ...] = ()
+    timeout: float = 60.0
+    # Failure is reported but does not block dependent stages
+    optional: bool = False
+    # One-shot Python step used instead of running `args`; returns (ok, detail)
+    run: Optional[Callable[[float], Tuple[bool, str]]] = None
+
+
+@dataclass
+class StageResult:
+    """Timeline entry for one stage (times in seconds since the pipeline started)"""
+    name: str
+    status: str
+    started: float
+    finished: float
+    pid: Optional[int] = None
+    checks: int = 0
+    detail: str = ""
+
+    @property
+    def ok(self) -> bool:
+        return self.status in ('ready', 'skipped')
+
+    @property
+    def duration(self) -> float:
+        return self.finished - self.started
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            'name': self.name,
+            'status': self.status,
+            'started': round(self.started, 3),
+            'finished': round(self.finished, 3),
+            'duration': round(self.duration, 3),
+            'pid': self.pid,
+            'checks': self.checks,
+            'detail': self.detail,
+        }
+
+
+@dataclass
+class StartupReport:
+    """Outcome of one start() call"""
+    results: List[StageResult] = field(default_factory=list)
+    elapsed: float = 0.0
+    optional: Tuple[str, ...] = ()
+
+    @property
+    def ok(self) -> bool:
+        return all(r.ok for r in self.results if r.name not in self.optional)
+
+    def __getitem__(self, name: str) -> StageResult:
+        return next(r for r in self.results if r.name == name)
+
+    def timeline(self) -> List[str]:
+        """Human-readable per-stage lines, ordered by start time"""
+        width = max((len(r.name) for r in self.results), default=0)
+        lines = []
+        for r in sorted(self.results, key=lambda r: (r.started, r.name)):
+            line = f"{r.name:<{width}}  {r.started:6.2f}s -> {r.finished:6.2f}s  {r.status}"
+            if r.pid:
+                line += f"  pid={r.pid}"
+            if r.detail:
+                line += f"  ({r.detail})"
+            lines.append(line)
+        lines.append(f"{'total':<{width}}  {self.elapsed:6.2f}s")
+        return lines
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            'ok': self.ok,
+            'elapsed': round(self.elapsed, 3),
+            'stages': [r.to_dict() for r in self.results],
+        }
+
+
+def _check(probe: Probe, timeout: float) -> bool:
+    try:
+        ok, _ = probe.check(max(0.1, min(probe.timeout, timeout)))
+        return bool(ok)
+    except Exception:
+        return False
+
+
+def _pid_alive(pid: int) -> bool:
+    if os.name == "nt":
+        import ctypes
+        kernel32 = ctypes.windll.kernel32
+        handle = kernel32.OpenProcess(0x1000, False, pid)  # PROCESS_QUERY_LIMITED_INFORMATION
+        if not handle:
+            return False
+        code = ctypes.c_ulong()
+        kernel32.GetExitCodeProcess(handle, ctypes.byref(code))
+        kernel32.CloseHandle(handle)
+        return code.value == 259  # STILL_ACTIVE
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    # An exited child of a finished panel/CLI run may linger as a zombie until reaped
+    try:
+        with open(f"/proc/{pid}/stat") as f:
+            return f.read().rsplit(")", 1)[-1].split()[0] != "Z"
+    except (OSError, IndexError):
+        return True
+
+
+# Start times read from /proc, ps or GetProcessTimes agree to within this many seconds
+START_TIME_TOLERANCE = 1.0
+
+
+def _process_started(pid: int) -> Optional[float]:
+    """Unix time the process was created, or None when it cannot be read"""
+    if os.name == "nt":
+        import ctypes
+        from ctypes import wintypes
+        kernel32 = ctypes.windll.kernel32
+        handle = kernel32.OpenProcess(0x1000, False, pid)  # PROCESS_QUERY_LIMITED_INFORMATION
+        if not handle:
+            return None
+        times = [wintypes.FILETIME() for _ in range(4)]
+        ok = kernel32.GetProcessTimes(handle, *[ctypes.byref(t) for t in times])
+        kernel32.CloseHandle(handle)
+        if not ok:
+            return None
+        ticks = (times[0].dwHighDateTime << 32) | times[0].dwLowDateTime
+        return ticks / 1e7 - 11644473600.0  # 100 ns since 1601 -> Unix time
+    try:
+        with open(f"/proc/{pid}/stat") as f:
+            ticks = int(f.read().rsplit(")", 1)[-1].split()[19])
+        with open("/proc/stat") as f:
+            boot = next(int(line.split()[1]) for line in f if line.startswith("btime"))
+        return boot + ticks / os.sysconf("SC_CLK_TCK")
+    except (OSError, ValueError, IndexError, StopIteration):
+        pass
+    try:
+        # macOS: no /proc
+        out = subprocess.run(["ps", "-o", "lstart=", "-p", str(pid)], capture_output=True, text=True,
+                             env=dict(os.environ, LC_ALL="C"), timeout=5).stdout.strip()
+        return time.mktime(time.strptime(out, "%a %b %d %H:%M:%S %Y")) if out else None
+    except (OSError, ValueError, subprocess.SubprocessError):
+        return None
+
+
+def _process_cmdline(pid: int) -> Optional[List[str]]:
+    """Executable plus arguments of a live process (only the executable on Windows), or None"""
+    if os.name == "nt":
+        import ctypes
+        from ctypes import wintypes
+        kernel32 = ctypes.windll.kernel32
+        handle = kernel32.OpenProcess(0x1000, False, pid)
+        if not handle:
+            return None
+        buf = ctypes.create_unicode_buffer(32768)
+        size = wintypes.DWORD(len(buf))
+        ok = kernel32.QueryFullProcessImageNameW(handle, 0, buf, ctypes.byref(size))
+        kernel32.CloseHandle(handle)
+        return [buf.value] if ok else None
+    try:
+        with open(f"/proc/{pid}/cmdline", "rb") as f:
+            raw = f.read()
+        return [part.decode(errors="replace") for part in raw.split(b"\0")[:-1]] or None
+    except OSError:
+        pass
+    try:
+        out = subprocess.run(["ps", "-o", "command=", "-p", str(pid)], capture_output=True, text=True,
+                             timeout=5).stdout.strip()
+        return out.split() or None
+    except (OSError, subprocess.SubprocessError):
+        return None
+
+
+def _exe_name(path: str) -> str:
+    name = Path(path).name.lower()
+    return name[:-4] if name.endswith(".exe") else name
+
+
+def _same_process(pid: int, entry: Dict[str, Any]) -> Tuple[bool, str]:
+    """Whether a live PID is still the process recorded in the state file; (match, reason if not)"""
+    recorded_start, recorded_cmd = entry.get('started'), entry.get('cmd')
+    if recorded_start is None or not recorded_cmd:
+        return False, "no start time or command line recorded for it"
+    started = _process_started(pid)
+    if started is None:
+        return False, "its start time cannot be read"
+    if abs(started - recorded_start) > START_TIME_TOLERANCE:
+        return False, f"started at {time.ctime(started)}, not {time.ctime(recorded_start)}"
+    live = _process_cmdline(pid)
+    if live is None:
+        return False, "its command line cannot be read"
+    if len(live) == 1 and os.name == "nt":
+        # Windows only exposes the image path cheaply
+        if _exe_name(live[0]) != _exe_name(recorded_cmd[0]):
+            return False, f"it runs {live[0]}"
+        return True, ""
+    # Scripts run through an interpreter (#! or python.exe) have it in front of the recorded command
+    tail = live[len(live) - len(recorded_cmd):] if len(live) >= len(recorded_cmd) else []
+    if not tail or tail[1:] != list(recorded_cmd[1:]) or _exe_name(tail[0]) != _exe_name(recorded_cmd[0]):
+        return False, f"it runs {' '.join(live)[:120]}"
+    return True, ""
+
+
+def _kill_pid(pid: int, timeout: float):
+    """Stop a process this supervisor started in an earlier run"""
+    if os.name == "nt":
+        subprocess.run(["taskkill", "/f", "/pid", str(pid)], capture_output=True)
+        return
+    os.kill(pid, signal.SIGTERM)
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline and _pid_alive(pid):
+        time.sleep(0.05)
+    if _pid_alive(pid):
+        os.kill(pid, signal.SIGKILL)
+
+
+class ServiceSupervisor:
+    """Starts stages concurrently in dependency order and owns their processes"""
+
+    def __init__(self, executor: GoIosExecutor, log_dir: Optional[Path] = None,
+                 log: Optional[LogFn] = None, initial_delay: float = 0.05,
+                 max_delay: float = 0.5, backoff: float = 1.5):
+        self.executor = executor
+        self.log_dir = Path(log_dir) if log_dir else ROOT / "logs"
+        self.state_file = self.log_dir / "supervisor.json"
+        self.log = log or (lambda message, level="info": None)
+        self.initial_delay = initial_delay
+        self.max_delay = max_delay
+        self.backoff = backoff
+
+        self._lock = threading.Lock()
+        self._procs: Dict[str, subprocess.Popen] = {}
+        self._log_files: Dict[str, Path] = {}
+        self._starts: Dict[str, int] = {}
+        self._restarts: Dict[str, int] = {}
+        self._started: Dict[str, Optional[float]] = {}
+
+    # ---- start ----
+
+    def start(self, stages: Sequence[Stage]) -> StartupReport:
+        """Run the stage graph; returns once every stage is ready, skipped or failed"""
+        names = {s.name for s in stages}
+        for stage in stages:
+            missing = [d for d in stage.depends_on if d not in names]
+            if missing:
+                raise ValueError(f"Stage '{stage.name}' depends on unknown stage(s): {', '.join(missing)}")
+
+        self.log_dir.mkdir(parents=True, exist_ok=True)
+        t0 = time.monotonic()
+        done = {s.name: threading.Event() for s in stages}
+        results: Dict[str, StageResult] = {}
+        optional = {s.name for s in stages if s.optional}
+
+        def worker(stage: Stage):
+            try:
+                results[stage.name] = self._run_stage(stage, t0, done, results, optional)
+            except Exception as e:
+                now = time.monotonic() - t0
+                results[stage.name] = StageResult(stage.name, 'failed', now, now, detail=str(e))
+            finally:
+                done[stage.name].set()
+
+        threads = [threading.Thread(target=worker, args=(s,), name=f"stage-{s.name}", daemon=True)
+                   for s in stages]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+
+        self._save_state()
+        return StartupReport([results[s.name] for s in stages], time.monotonic() - t0, tuple(optional))
+
+    def _run_stage(self, stage: Stage, t0: float, done: Dict[str, threading.Event],
+                   results: Dict[str, StageResult], optional: set) -> StageResult:
+        started = time.monotonic() - t0
+        if stage.satisfied is not None and _check(stage.satisfied, stage.satisfied.timeout):
+            self.log(f"⏭️ {stage.name}: already satisfied, skipping", "info")
+            return StageResult(stage.name, 'skipped', started, time.monotonic() - t0, checks=1)
+
+        for dep in stage.depends_on:
+            done[dep].wait()
+            dep_result = results.get(dep)
+            if dep_result is None or (not dep_result.ok and dep not in optional):
+                now = time.monotonic() - t0
+                return StageResult(stage.name, 'blocked', now, now, detail=f"{dep} did not start")
+
+        started = time.monotonic() - t0
+        self.log(f"▶️ {stage.name}: {' '.join(str(a) for a in stage.args)}", "info")
+        if stage.run is not None:
+            success, detail = stage.run(stage.timeout)
+            return StageResult(stage.name, 'ready' if success else 'failed', started,
+                               time.monotonic() - t0, detail=detail)
+        if stage.ready is None:
+            success, stdout, stderr = self.executor.run(stage.args, timeout=stage.timeout, use_cache=False)
+            detail = ""
+            if not success:
+                output = (stderr or stdout).strip().splitlines()
+                detail = output[-1] if output else "non-zero exit code"
+            return StageResult(stage.name, 'ready' if success else 'failed', started,
+                               time.monotonic() - t0, detail=detail)
+
+        with self._lock:
+            proc = self._procs.get(stage.name)
+        if proc is None or proc.poll() is not None:
+            proc = self._spawn(stage)
+        status, checks, detail = self._wait_ready(stage, proc)
+        return StageResult(stage.name, status, started, time.monotonic() - t0,
+                           pid=proc.pid, checks=checks, detail=detail)
+
+    def _spawn(self, stage: Stage) -> subprocess.Popen:
+        log_path = self.log_dir / f"{stage.name}-{time.strftime('%Y%m%d-%H%M%S')}.log"
+        kwargs: Dict[str, Any] = {'stdin': subprocess.DEVNULL, 'stderr': subprocess.STDOUT}
+        if os.name == "nt":
+            kwargs['creationflags'] = subprocess.CREATE_NO_WINDOW
+        else:
+            # Services outlive the panel like they did with start.ps1; stop() finds them via the state file
+            kwargs['start_new_session'] = True
+        with open(log_path, "ab") as out:
+            proc = self.executor.spawn(stage.args, stdout=out, **kwargs)
+        started = _process_started(proc.pid)
+        with self._lock:
+            # Replacing a process of ours that died counts as a restart
+            if stage.name in self._procs:
+                self._restarts[stage.name] = self._restarts.get(stage.name, 0) + 1
+            self._starts[stage.name] = self._starts.get(stage.name, 0) + 1
+            self._procs[stage.name] = proc
+            self._started[stage.name] = started
+            self._log_files[stage.name] = log_path
+        self._save_state()
+        return proc
+
+    def _wait_ready(self, stage: Stage, proc: subprocess.Popen) -> Tuple[str, int, str]:
+        """Poll the readiness probe with exponential backoff; give up early if the process exits"""
+        deadline = time.monotonic() + stage.timeout
+        ready = Condition(lambda: _check(stage.ready, deadline - time.monotonic()), "ready")
+        exited = Condition(lambda: proc.poll() is not None, "exited")
+        result = wait_until(any_of(ready, exited), timeout=stage.timeout, initial=self.initial_delay,
+                            max_interval=self.max_delay, backoff=self.backoff, name=f"{stage.name} ready",
+                            raise_on_timeout=False)
+        if not result.ok:
+            return 'timeout', result.polls, f"not ready after {stage.timeout:.0f}s"
+        if result.value[0] == "exited":
+            return 'failed', result.polls, f"exited with code {proc.poll()}: {self._log_tail(stage.name)}"
+        return 'ready', result.polls, ""
+
+    def _log_tail(self, name: str, limit: int = 200) -> str:
+        path = self._log_files.get(name)
+        try:
+            text = path.read_text(encoding="utf-8", errors="replace").strip() if path else ""
+        except OSError:
+            return ""
+        return text[-limit:].replace("\n", " | ")
+
+    # ---- stop / status ----
+
+    def stop(self, timeout: float = 5.0) -> List[str]:
+        """Stop the processes started by this supervisor (this run or an earlier one)"""
+        stopped = []
+        with self._lock:
+            procs = dict(self._procs)
+            self._procs.clear()
+        for name, proc in procs.items():
+            if proc.poll() is None:
+                proc.terminate()
+                try:
+                    proc.wait(timeout=timeout)
+                except subprocess.TimeoutExpired:
+                    proc.kill()
+                    proc.wait()
+                stopped.append(name)
+
+        owned = {p.pid for p in procs.values()}
+        for name, entry in self._load_state().items():
+            pid = entry.get('pid')
+            if pid and pid not in owned and _pid_alive(pid):
+                same, reason = _same_process(pid, entry)
+                if not same:
+                    # After a reboot or PID reuse the number belongs to someone else
+                    self.log(f"⚠️ {name}: pid {pid} is not the process started here ({reason}), "
+                             f"leaving it running", "warning")
+                    continue
+                try:
+                    _kill_pid(pid, timeout)
+                    stopped.append(name)
+                except OSError:
+                    pass
+
+        try:
+            self.state_file.unlink()
+        except OSError:
+            pass
+        return stopped
+
+    def status(self) -> Dict[str, Dict[str, Any]]:
+        """PID and liveness of every process this supervisor knows about"""
+        state = self._load_state()
+        for entry in state.values():
+            entry['alive'] = _pid_alive(entry['pid']) and _same_process(entry['pid'], entry)[0]
+        with self._lock:
+            for name, proc in self._procs.items():
+                state[name] = {'pid': proc.pid, 'args': [str(a) for a in proc.args[1:]],
+                               'alive': proc.poll() is None}
+        return state
+
+    def counters(self) -> Dict[str, Dict[str, int]]:
+        """Process starts and restarts per stage since this supervisor was created"""
+        with self._lock:
+            return {name: {'starts': count, 'restarts': self._restarts.get(name, 0)}
+                    for name, count in self._starts.items()}
+
+    def _save_state(self):
+        with self._lock:
+            live = {name: p for name, p in self._procs.items() if p.poll() is None}
+            started = dict(self._started)
+        state = {name: {'pid': p.pid, 'args': [str(a) for a in p.args[1:]], 'cmd': [str(a) for a in p.args],
+                        'started': started.get(name)}
+                 for name, p in live.items()}
+        previous = {k: v for k, v in self._load_state().items()
+                    if k not in state and _pid_alive(v['pid']) and _same_process(v['pid'], v)[0]}
+        previous.update(state)
+        try:
+            self.log_dir.mkdir(parents=True, exist_ok=True)
+            self.state_file.write_text(json.dumps(previous, indent=2), encoding="utf-8")
+        except OSError:
+            pass
+
+    def _load_state(self) -> Dict[str, Dict[str, Any]]:
+        try:
+            data = json.loads(self.state_file.read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            return {}
+        return {k: v for k, v in data.items() if isinstance(v, dict) and isinstance(v.get('pid'), int)}
+
+
+def default_stages(env: Dict[str, str], udid: Optional[str] = None,
+                   images: Optional[DiskImageManager] = None) -> List[Stage]:
+    """The start.ps1 pipeline: DDI mount and forward in parallel, then runwda until WDA /status answers"""
+    udid = udid or env.get("IOS_UDID", "")
+    if not udid:
+        raise ValueError("IOS_UDID is not configured")
+    wda_url = env.get("WDA_URL", "http://127.0.0.1:8200")
+    forward_port = urlparse(wda_url).port or 8200
+    device_port = env.get("WDA_DEVICE_PORT", "8100")
+    bundle = env.get("WDA_BUNDLE_ID", DEFAULT_WDA_BUNDLE)
+    xctest = env.get("WDA_XCTEST", DEFAULT_WDA_XCTEST)
+    timeout = float(env.get("STARTUP_TIMEOUT", "120"))
+
+    wda_up = http_status_probe("wda", wda_url, timeout=2)
+    forward_up = url_port_probe("forward", wda_url, timeout=1, default_port=8200)
+
+    if images is not None:
+        def mount(t: float) -> Tuple[bool, str]:
+            result = images.ensure_mounted(udid, timeout=t)
+            return result.ok, result.detail or f"{result.status} {result.version or ''}".strip()
+
+        def mounted(t: float) -> Tuple[bool, Any]:
+            # Mount-state cache first: no go-ios process on a warm restart
+            return images.is_mounted(udid) or _check(wda_up, t), None
+
+        image = Stage("image", ["image", "mount", "--udid", udid], satisfied=Probe("image", mounted, 2),
+                      timeout=timeout, optional=True, run=mount)
+    else:
+        # A responding WDA implies the image is mounted; `image auto` exits non-zero when it already is
+        image = Stage("image", ["image", "auto", "--udid", udid], satisfied=wda_up,
+                      timeout=timeout, optional=True)
+
+    return [
+        image,
+        Stage("forward", ["forward", str(forward_port), device_port, "--udid", udid],
+              ready=forward_up, satisfied=forward_up,
+              timeout=30),
+        Stage("wda", ["runwda", "--udid", udid, "--bundleid", bundle, "--testrunnerbundleid", bundle,
+                      "--xctestconfig", xctest, "--log-output", "-"],
+              ready=wda_up, satisfied=wda_up, depends_on=("image", "forward"), timeout=timeout),
+    ]
@@ -0,0 +1,251 @@
+#!/usr/bin/env python3
+"""
+WebDriver Command Tracing for Appium iOS Automation
+Wraps a driver's command executor so every WebDriver command becomes a
+span (command, endpoint, request size, HTTP status, wall time), groups
+spans by screen, and exports Chrome trace-event JSON (chrome://tracing,
+Perfetto) plus a per-session summary table
+"""
+
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional
+from urllib.parse import urlparse
+
+_TRACER_ATTR = "_e2eios_tracer"
+
+
+class Span:
+    """One timed interval; `cat` is 'command' for WebDriver calls"""
+    __slots__ = ('name', 'cat', 'start_ns', 'dur_ns', 'tid', 'args')
+
+    def __init__(self, name: str, cat: str, start_ns: int, tid: int, args: Dict[str, Any]):
+        self.name = name
+        self.cat = cat
+        self.start_ns = start_ns
+        self.dur_ns = 0
+        self.tid = tid
+        self.args = args
+
+    @property
+    def duration(self) -> float:
+        return self.dur_ns / 1e9
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {'name': self.name, 'cat': self.cat, 'duration': round(self.duration, 6), **self.args}
+
+
+def _percentile(values: List[float], pct: float) -> float:
+    ordered = sorted(values)
+    rank = (len(ordered) - 1) * pct / 100.0
+    low = int(rank)
+    high = min(low + 1, len(ordered) - 1)
+    return ordered[low] + (ordered[high] - ordered[low]) * (rank - low)
+
+
+class DriverTracer:
+    """Collects spans for one or more drivers"""
+
+    def __init__(self, label: str = "session", max_spans: int = 100_000):
+        self.label = label
+        self.max_spans = max_spans
+        self.dropped = 0
+        self._origin_ns = time.perf_counter_ns()
+        self._wall_origin = time.time()
+        self._spans: List[Span] = []
+        self._local = threading.local()
+
+    # ---- instrumentation ----
+
+    def instrument(self, driver):
+        """Wrap driver.command_executor in place; calling it twice is a no-op"""
+        executor = driver.command_executor
+        if getattr(executor, _TRACER_ATTR, None) is self:
+            return driver
+        if getattr(executor, _TRACER_ATTR, None) is not None:
+            self.uninstrument(driver)
+
+        # Wrappers installed before this one (e.g. WdaDirect) come back on uninstrument()
+        saved = {name: executor.__dict__.get(name) for name in ("execute", "_request")}
+        execute = executor.execute
+        request = getattr(executor, "_request", None)
+        local = self._local
+        tracer = self
+
+        def traced_execute(command, params=None):
+            span = tracer._open(command, 'command', {'screen': getattr(local, 'screen', None)})
+            local.command = span
+            try:
+                response = execute(command, params)
+            except Exception as e:
+                span.args['error'] = type(e).__name__
+                raise
+            finally:
+                local.command = None
+                tracer._close(span)
+            if isinstance(response, dict) and 'status' in response:
+                span.args.setdefault('status', response['status'])
+            if 'bytes_out' not in span.args and params:
+                span.args['bytes_out'] = len(json.dumps(params, default=str))
+            return response
+
+        def traced_request(method, url, body=None):
+            # The serialized body is already at hand here, so its size costs nothing
+            span = getattr(local, 'command', None)
+            if span is not None:
+                span.args['method'] = method
+                span.args['path'] = urlparse(url).path
+                span.args['bytes_out'] = len(body) if body else 0
+            response = request(method, url, body=body)
+            if span is not None and isinstance(response, dict):
+                span.args['status'] = response.get('status')
+            return response
+
+        executor.execute = traced_execute
+        if request is not None:
+            executor._request = traced_request
+        setattr(executor, _TRACER_ATTR, self)
+        setattr(executor, _TRACER_ATTR + "_saved", saved)
+        return driver
+
+    @staticmethod
+    def uninstrument(driver):
+        """Restore the executor's previous methods"""
+        executor = driver.command_executor
+        saved = executor.__dict__.pop(_TRACER_ATTR + "_saved", None) or {}
+        for name in ("execute", "_request"):
+            if saved.get(name) is None:
+                executor.__dict__.pop(name, None)
+            else:
+                setattr(executor, name, saved[name])
+        executor.__dict__.pop(_TRACER_ATTR, None)
+
+    # ---- manual spans ----
+
+    @contextmanager
+    def span(self, name: str, cat: str = 'step', **args) -> Iterator[Span]:
+        """Time a block of script code (shows as a parent of the commands inside it)"""
+        span = self._open(name, cat, args)
+        try:
+            yield span
+        except Exception as e:
+            span.args['error'] = type(e).__name__
+            raise
+        finally:
+            self._close(span)
+
+    @contextmanager
+    def screen(self, name: str) -> Iterator[Span]:
+        """Attribute every command in the block to a screen"""
+        previous = getattr(self._local, 'screen', None)
+        self._local.screen = name
+        try:
+            with self.span(name, 'screen') as span:
+                yield span
+        finally:
+            self._local.screen = previous
+
+    def _open(self, name: str, cat: str, args: Dict[str, Any]) -> Span:
+        return Span(name, cat, time.perf_counter_ns(), threading.get_ident(), args)
+
+    def _close(self, span: Span):
+        span.dur_ns = time.perf_counter_ns() - span.start_ns
+        if len(self._spans) < self.max_spans:
+            self._spans.append(span)
+        else:
+            self.dropped += 1
+
+    # ---- reporting ----
+
+    @property
+    def spans(self) -> List[Span]:
+        return list(self._spans)
+
+    def summary(self) -> Dict[str, Any]:
+        """Per-command and per-screen totals (milliseconds)"""
+        commands: Dict[str, List[Span]] = {}
+        screens: Dict[str, List[Span]] = {}
+        for span in self.spans:
+            if span.cat != 'command':
+                continue
+            commands.setdefault(span.name, []).append(span)
+            screens.setdefault(span.args.get('screen') or '-', []).append(span)
+
+        def rows(groups: Dict[str, List[Span]]) -> List[Dict[str, Any]]:
+            out = []
+            for name, spans in groups.items():
+                ms = [s.duration * 1000 for s in spans]
+                out.append({
+                    'name': name,
+                    'count': len(spans),
+                    'total_ms': round(sum(ms), 2),
+                    'mean_ms': round(sum(ms) / len(ms), 2),
+                    'p95_ms': round(_percentile(ms, 95), 2),
+                    'max_ms': round(max(ms), 2),
+                    'bytes_out': sum(s.args.get('bytes_out', 0) or 0 for s in spans),
+                    'errors': sum(1 for s in spans if 'error' in s.args or (s.args.get('status') or 200) >= 400),
+                })
+            return sorted(out, key=lambda r: r['total_ms'], reverse=True)
+
+        command_rows = rows(commands)
+        return {
+            'label': self.label,
+            'commands': command_rows,
+            'screens': rows(screens),
+            'total_commands': sum(r['count'] for r in command_rows),
+            'command_time_ms': round(sum(r['total_ms'] for r in command_rows), 2),
+            'dropped': self.dropped,
+        }
+
+    def format_summary(self, limit: int = 20) -> str:
+        """Plain-text table of the slowest commands and screens"""
+        data = self.summary()
+        header = f"{'':<28} {'count':>6} {'total ms':>10} {'mean':>8} {'p95':>8} {'max':>8} {'bytes':>8} {'err':>4}"
+        lines = [f"Trace summary: {data['label']} "
+                 f"({data['total_commands']} commands, {data['command_time_ms']:.0f} ms)", header]
+        for title, key in (("command", 'commands'), ("screen", 'screens')):
+            lines.append(f"-- by {title}")
+            for r in data[key][:limit]:
+                lines.append(f"{r['name'][:28]:<28} {r['count']:>6} {r['total_ms']:>10.1f} {r['mean_ms']:>8.1f} "
+                             f"{r['p95_ms']:>8.1f} {r['max_ms']:>8.1f} {r['bytes_out']:>8} {r['errors']:>4}")
+        return "\n".join(lines)
+
+    def to_chrome_trace(self) -> Dict[str, Any]:
+        """Trace-event JSON: one complete ('X') event per span"""
+        pid = os.getpid()
+        events: List[Dict[str, Any]] = [
+            {'name': 'process_name', 'ph': 'M', 'pid': pid, 'tid': 0, 'args': {'name': self.label}},
+        ]
+        for span in self.spans:
+            events.append({
+                'name': span.name,
+                'cat': span.cat,
+                'ph': 'X',
+                'ts': (span.start_ns - self._origin_ns) / 1000.0,
+                'dur': span.dur_ns / 1000.0,
+                'pid': pid,
+                'tid': span.tid,
+                'args': {k: v for k, v in span.args.items() if v is not None},
+            })
+        return {
+            'traceEvents': events,
+            'displayTimeUnit': 'ms',
+            'otherData': {'label': self.label, 'started_at': self._wall_origin, 'dropped': self.dropped},
+        }
+
+    def export_chrome_trace(self, path) -> Path:
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(json.dumps(self.to_chrome_trace()), encoding="utf-8")
+        return path
+
+
+def trace_driver(driver, label: str = "session", tracer: Optional[DriverTracer] = None) -> DriverTracer:
+    """Instrument a driver and return its tracer"""
+    tracer = tracer or DriverTracer(label)
+    tracer.instrument(driver)
+    return tracer
@@ -0,0 +1,395 @@
+#!/usr/bin/env python3
+"""
+Visual Checks for Appium iOS Automation
+Compares WDA/Appium screenshots with NumPy (tolerance, ignore regions, region
+crops) and a DCT perceptual hash for quick "same screen?" checks. Baselines
+are PNGs on disk; their hashes and decoded pixels are cached next to them so
+a run never decodes the same baseline twice
+"""
+
+import base64
+import io
+import json
+import os
+import re
+import threading
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Dict, Optional, Sequence, Tuple, Union
+
+import numpy as np
+from PIL import Image
+
+from e2eios.utils.logger import AppiumLogger
+from e2eios.utils.waits import Condition
+
+ROOT = Path(__file__).resolve().parents[2]
+BASELINE_DIR = ROOT / "baselines"
+
+# x, y, width, height in screenshot pixels (points x device scale)
+Region = Tuple[int, int, int, int]
+ImageLike = Union[np.ndarray, bytes, str, Path]
+
+HASH_SIZE = 8     # 64-bit hash
+HASH_SAMPLE = 32  # grayscale thumbnail the DCT runs on
+
+
+class VisualError(Exception):
+    """Raised for unusable images or missing baselines"""
+
+
+class VisualMismatch(AssertionError):
+    """Raised by VisualChecker.assert_matches() when a screen differs from its baseline"""
+
+    def __init__(self, result: "DiffResult"):
+        super().__init__(f"{result.name}: {result.ratio:.2%} of pixels differ "
+                         f"(allowed {result.threshold:.2%}, tolerance {result.tolerance})")
+        self.result = result
+
+
+# ---- decoding ----
+
+def decode_image(data: ImageLike) -> np.ndarray:
+    """RGB uint8 array (H, W, 3) from an array, PNG bytes, base64 PNG (WDA /screenshot) or a file path"""
+    if isinstance(data, np.ndarray):
+        if data.ndim == 3 and data.shape[2] == 4:
+            return data[:, :, :3]
+        return data
+    if isinstance(data, Path):
+        data = data.read_bytes()
+    elif isinstance(data, str):
+        data = base64.b64decode(data)
+    try:
+        with Image.open(io.BytesIO(data)) as image:
+            return np.asarray(image.convert("RGB"))
+    except Exception as e:
+        raise VisualError(f"Cannot decode image: {e}") from e
+
+
+def screenshot(driver) -> np.ndarray:
+    """Current screen of an Appium/Selenium driver as an RGB array"""
+    return decode_image(driver.get_screenshot_as_png())
+
+
+def crop(image: np.ndarray, region: Region) -> np.ndarray:
+    """View of a region (no copy); regions reaching past the edge are clipped"""
+    x, y, width, height = region
+    return image[max(0, y):max(0, y + height), max(0, x):max(0, x + width)]
+
+
+# ---- perceptual hash ----
+
+def _dct_matrix(n: int) -> np.ndarray:
+    k = np.arange(n)[:, None]
+    i = np.arange(n)[None, :]
+    matrix = np.cos(np.pi * (2 * i + 1) * k / (2 * n)) * np.sqrt(2.0 / n)
+    matrix[0] /= np.sqrt(2.0)
+    return matrix
+
+
+_DCT = _dct_matrix(HASH_SAMPLE)
+
+
+def phash(image: np.ndarray) -> int:
+    """64-bit DCT perceptual hash; similar screens are a few bits apart, different ones ~32"""
+    thumbnail = Image.fromarray(np.ascontiguousarray(image)).convert("L").resize(
+        (HASH_SAMPLE, HASH_SAMPLE), Image.Resampling.BOX)
+    pixels = np.asarray(thumbnail, dtype=np.float64)
+    low = (_DCT @ pixels @ _DCT.T)[:HASH_SIZE, :HASH_SIZE].ravel()
+    # Median without the DC term, which only carries overall brightness
+    bits = low > np.median(low[1:])
+    return int.from_bytes(np.packbits(bits).tobytes(), "big")
+
+
+def hamming(a: int, b: int) -> int:
+    return bin(a ^ b).count("1")
+
+
+def same_screen(a: np.ndarray, b: np.ndarray, max_distance: int = 10) -> bool:
+    """Fast perceptual check; use pixel_diff() when exact content matters"""
+    return hamming(phash(a), phash(b)) <= max_distance
+
+
+# ---- pixel diff ----
+
+@dataclass
+class DiffResult:
+    """Outcome of a pixel comparison"""
+    name: str
+    ok: bool
+    ratio: float
+    pixels: int
+    compared: int
+    max_delta: int
+    tolerance: int
+    threshold: float
+    bbox: Optional[Region] = None
+    distance: Optional[int] = None
+    new_baseline: bool = False
+    diff_file: Optional[str] = None
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            'name': self.name,
+            'ok': self.ok,
+            'ratio': round(self.ratio, 6),
+            'pixels': self.pixels,
+            'max_delta': self.max_delta,
+            'bbox': self.bbox,
+            'distance': self.distance,
+            'new_baseline': self.new_baseline,
+            'diff_file': self.diff_file,
+        }
+
+
+def diff_mask(actual: np.ndarray, expected: np.ndarray, tolerance: int = 16,
+              ignore: Sequence[Region] = ()) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """(delta, changed, considered): per-pixel max channel delta and masks; changed means delta > tolerance"""
+    if actual.shape != expected.shape:
+        raise VisualError(f"Size mismatch: {actual.shape[1]}x{actual.shape[0]} vs "
+                          f"{expected.shape[1]}x{expected.shape[0]}")
+    # |a - b| without widening to int16, and a channel max without a strided reduction (~10x faster)
+    delta = np.maximum(actual, expected)
+    delta -= np.minimum(actual, expected)
+    if delta.ndim == 3:
+        delta = np.maximum(np.maximum(delta[..., 0], delta[..., 1]), delta[..., 2])
+    considered = np.ones(delta.shape, dtype=bool)
+    for region in ignore:
+        crop(considered, region)[...] = False
+    return delta, (delta > tolerance) & considered, considered
+
+
+def pixel_diff(actual: np.ndarray, expected: np.ndarray, tolerance: int = 16, threshold: float = 0.001,
+               ignore: Sequence[Region] = (), region: Optional[Region] = None, name: str = "image") -> DiffResult:
+    """Vectorized comparison; ok when at most `threshold` of the compared pixels changed"""
+    if region is not None:
+        actual, expected = crop(actual, region), crop(expected, region)
+        # Ignore regions are given in full-screen coordinates
+        ignore = [(x - region[0], y - region[1], w, h) for x, y, w, h in ignore]
+    try:
+        delta, changed, considered = diff_mask(actual, expected, tolerance, ignore)
+    except VisualError:
+        return DiffResult(name, False, 1.0, 0, 0, 255, tolerance, threshold)
+    compared = int(considered.sum())
+    pixels = int(changed.sum())
+    ratio = pixels / compared if compared else 0.0
+    bbox = None
+    max_delta = 0
+    if pixels:
+        rows = np.flatnonzero(changed.any(axis=1))
+        cols = np.flatnonzero(changed.any(axis=0))
+        bbox = (int(cols[0]), int(rows[0]), int(cols[-1] - cols[0] + 1), int(rows[-1] - rows[0] + 1))
+        max_delta = int(delta[changed].max())
+    return DiffResult(name, ratio <= threshold, ratio, pixels, compared, max_delta, tolerance, threshold, bbox)
+
+
+# ---- baselines ----
+
+def _file_key(name: str) -> str:
+    return re.sub(r"[^A-Za-z0-9_.-]+", "_", name).strip("_") or "screen"
+
+
+class BaselineStore:
+    """Baseline PNGs plus a cache of their hashes and decoded pixels (.npy, memory-mapped on load)"""
+
+    def __init__(self, directory: Path = BASELINE_DIR):
+        self.directory = Path(directory)
+        self.cache_dir = self.directory / ".cache"
+        self.index_file = self.cache_dir / "index.json"
+        self._lock = threading.Lock()
+        self._arrays: Dict[str, np.ndarray] = {}
+        self._index: Dict[str, Dict[str, Any]] = self._load_index()
+
+    def _load_index(self) -> Dict[str, Dict[str, Any]]:
+        try:
+            return json.loads(self.index_file.read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            return {}
+
+    def _save_index(self):
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        tmp = self.index_file.with_suffix(".tmp")
+        tmp.write_text(json.dumps(self._index, indent=1), encoding="utf-8")
+        os.replace(tmp, self.index_file)
+
+    def png_path(self, name: str) -> Path:
+        return self.directory / f"{_file_key(name)}.png"
+
+    def _fresh(self, name: str) -> Optional[Dict[str, Any]]:
+        """Cache entry if it still matches the PNG on disk"""
+        entry = self._index.get(name)
+        try:
+            stat = self.png_path(name).stat()
+        except OSError:
+            return None
+        if entry and entry['mtime'] == stat.st_mtime_ns and entry['size'] == stat.st_size \
+                and (self.cache_dir / entry['array']).exists():
+            return entry
+        return None
+
+    def _rebuild(self, name: str) -> Dict[str, Any]:
+        """Decode the PNG once and cache its pixels and hash"""
+        png = self.png_path(name)
+        if not png.exists():
+            raise VisualError(f"No baseline for {name}: {png}")
+        image = decode_image(png)
+        stat = png.stat()
+        key = _file_key(name)
+        # One file per PNG version: a map of the previous one (here or in another worker) is never
+        # overwritten, which Windows refuses while the file is mapped
+        entry = {'mtime': stat.st_mtime_ns, 'size': stat.st_size,
+                 'array': f"{key}-{stat.st_mtime_ns}-{stat.st_size}.npy",
+                 'phash': f"{phash(image):016x}", 'shape': list(image.shape)}
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        # Drop our map of the old version so the file can be removed below
+        self._arrays.pop(name, None)
+        target = self.cache_dir / entry['array']
+        if not target.exists():
+            tmp = target.with_name(f"{target.stem}.{os.getpid()}.{threading.get_ident()}.tmp")
+            with open(tmp, "wb") as f:
+                np.save(f, image)
+            try:
+                os.replace(tmp, target)
+            except PermissionError:
+                # Another worker wrote (and mapped) the same version first
+                tmp.unlink()
+        self._index[name] = entry
+        self._save_index()
+        for old in self.cache_dir.glob(f"{key}-*.npy"):
+            if old != target and re.fullmatch(r"\d+-\d+", old.stem[len(key) + 1:]):
+                try:
+                    old.unlink()
+                except OSError:
+                    pass  # still mapped by another process; replaced on its next rebuild
+        return entry
+
+    def _entry(self, name: str) -> Dict[str, Any]:
+        with self._lock:
+            return self._fresh(name) or self._rebuild(name)
+
+    def exists(self, name: str) -> bool:
+        return self.png_path(name).exists()
+
+    def load(self, name: str) -> np.ndarray:
+        """Baseline pixels, memory-mapped from the cache instead of decoding the PNG"""
+        entry = self._entry(name)
+        with self._lock:
+            array = self._arrays.get(name)
+            if array is None:
+                array = self._arrays[name] = np.load(self.cache_dir / entry['array'], mmap_mode='r')
+            return array
+
+    def hash(self, name: str) -> int:
+        return int(self._entry(name)['phash'], 16)
+
+    def save(self, name: str, image: np.ndarray):
+        """Write (or replace) a baseline and refresh its cache entry"""
+        self.directory.mkdir(parents=True, exist_ok=True)
+        Image.fromarray(np.ascontiguousarray(image)).save(self.png_path(name), optimize=False)
+        with self._lock:
+            self._rebuild(name)
+
+    def names(self) -> Sequence[str]:
+        with self._lock:
+            known = set(self._index)
+        files = {p.stem for p in self.directory.glob("*.png")}
+        # Index names keep their original spelling (e.g. "Settings/General")
+        return sorted(known | {f for f in files if f not in {_file_key(n) for n in known}})
+
+    def identify(self, image: np.ndarray, max_distance: int = 12) -> Tuple[Optional[str], Optional[int]]:
+        """(closest baseline name, hash distance), using only the cached hashes"""
+        target = phash(image)
+        best, best_distance = None, None
+        for name in self.names():
+            try:
+                distance = hamming(target, self.hash(name))
+            except VisualError:
+                continue
+            if best_distance is None or distance < best_distance:
+                best, best_distance = name, distance
+        if best_distance is None or best_distance > max_distance:
+            return None, best_distance
+        return best, best_distance
+
+
+# ---- assertions ----
+
+class VisualChecker:
+    """Screen assertions against a BaselineStore; a missing baseline is recorded on first use"""
+
+    def __init__(self, store: Optional[BaselineStore] = None, tolerance: int = 16, threshold: float = 0.001,
+                 logger: Optional[AppiumLogger] = None, diff_dir: Optional[Path] = None, record_missing: bool = True):
+        self.store = store or BaselineStore()
+        self.tolerance = tolerance
+        self.threshold = threshold
+        self.logger = logger
+        self.diff_dir = Path(diff_dir) if diff_dir else ROOT / "logs" / "visual"
+        self.record_missing = record_missing
+
+    def _image(self, source) -> np.ndarray:
+        return screenshot(source) if hasattr(source, "get_screenshot_as_png") else decode_image(source)
+
+    def check(self, name: str, source, ignore: Sequence[Region] = (), region: Optional[Region] = None,
+              tolerance: Optional[int] = None, threshold: Optional[float] = None, update: bool = False,
+              log: bool = True) -> DiffResult:
+        """Compare a driver's screen (or an image) with the baseline `name`; log=False skips logging and diff files"""
+        image = self._image(source)
+        tolerance = self.tolerance if tolerance is None else tolerance
+        threshold = self.threshold if threshold is None else threshold
+        if update or (self.record_missing and not self.store.exists(name)):
+            self.store.save(name, image)
+            result = DiffResult(name, True, 0.0, 0, image.shape[0] * image.shape[1], 0, tolerance, threshold,
+                                new_baseline=True)
+        else:
+            baseline = self.store.load(name)
+            result = pixel_diff(image, baseline, tolerance, threshold, ignore, region, name)
+            result.distance = hamming(phash(image), self.store.hash(name))
+            if not result.ok and log:
+                result.diff_file = self._write_diff(name, image, baseline, result, ignore)
+        if log and self.logger is not None:
+            self._log(result)
+        return result
+
+    def assert_matches(self, name: str, source, **kwargs) -> DiffResult:
+        result = self.check(name, source, **kwargs)
+        if not result.ok:
+            raise VisualMismatch(result)
+        return result
+
+    def detect_screen(self, source, max_distance: int = 12) -> Optional[str]:
+        """Name of the baseline this screen looks like (perceptual hash only), logged as the screen state"""
+        name, distance = self.store.identify(self._image(source), max_distance)
+        if self.logger is not None:
+            self.logger.log_screen_state(name or "unknown", details={'hash_distance': distance})
+        return name
+
+    def _write_diff(self, name: str, actual: np.ndarray, baseline: np.ndarray, result: DiffResult,
+                    ignore: Sequence[Region]) -> Optional[str]:
+        """Actual screen with changed pixels painted red, for the failure report"""
+        if actual.shape != baseline.shape:
+            return None
+        _, changed, _ = diff_mask(actual, baseline, result.tolerance, ignore)
+        overlay = np.array(actual, copy=True)
+        overlay[changed] = (255, 0, 0)
+        self.diff_dir.mkdir(parents=True, exist_ok=True)
+        path = self.diff_dir / f"{_file_key(name)}-{time.strftime('%Y%m%d-%H%M%S')}-diff.png"
+        Image.fromarray(overlay).save(path)
+        return str(path)
+
+    def _log(self, result: DiffResult):
+        context = {'screen': result.name, 'diff': f"{result.ratio:.3%}"}
+        if result.new_baseline:
+            self.logger.info("Baseline recorded", {'screen': result.name})
+        elif result.ok:
+            self.logger.log_screen_state(result.name, details=context)
+        else:
+            self.logger.warning("Screen differs from baseline", dict(context, diff_file=result.diff_file))
+
+
+def screen_matches(checker: VisualChecker, name: str, driver, **kwargs) -> Condition:
+    """Wait condition: the screen matches its baseline (e.g. once a transition animation has settled)"""
+    def check():
+        result = checker.check(name, driver, log=False, **kwargs)
+        return result if result.ok else None
+    return Condition(check, f"screen={name}")
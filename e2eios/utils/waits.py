@@ -0,0 +1,229 @@
+#!/usr/bin/env python3
+"""
+Smart Waits for Appium iOS Automation
+Polls a condition with exponential backoff and returns as soon as it holds,
+instead of fixed sleeps and single attempts. Conditions compose (any/all),
+locator conditions share one page-source fetch per poll, and every wait's
+real duration is logged and kept for timeout tuning
+"""
+
+import threading
+import time
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+from e2eios.utils.locator import LocatorEngine, LocatorError
+from e2eios.utils.logger import AppiumLogger
+
+# Per-name wait durations kept for wait_stats()
+MAX_SAMPLES = 500
+
+
+class Condition:
+    """A named check; truthy return value means satisfied, an exception means not yet"""
+
+    def __init__(self, check: Callable[[], Any], name: str = "condition"):
+        self.check = check
+        self.name = name
+        self.last_error: Optional[BaseException] = None
+
+    def __call__(self) -> Any:
+        try:
+            value = self.check()
+        except Exception as e:
+            self.last_error = e
+            return None
+        self.last_error = None
+        return value
+
+    def __repr__(self):
+        return f"Condition({self.name})"
+
+
+def condition(check, name: Optional[str] = None) -> Condition:
+    """Wrap a plain callable (conditions pass through unchanged)"""
+    if isinstance(check, Condition):
+        return check
+    return Condition(check, name or getattr(check, "__name__", "condition"))
+
+
+def any_of(*conditions, name: Optional[str] = None) -> Condition:
+    """Satisfied by the first condition that holds; value is (condition name, its value)"""
+    parts = [condition(c) for c in conditions]
+
+    def check():
+        errors = []
+        for part in parts:
+            value = part()
+            if value:
+                return part.name, value
+            if part.last_error is not None:
+                errors.append(part.last_error)
+        if errors:
+            raise errors[-1]
+        return None
+    return Condition(check, name or " | ".join(p.name for p in parts))
+
+
+def all_of(*conditions, name: Optional[str] = None) -> Condition:
+    """Satisfied when every condition holds in the same poll; value is {condition name: value}"""
+    parts = [condition(c) for c in conditions]
+
+    def check():
+        values = {}
+        for part in parts:
+            value = part()
+            if not value:
+                if part.last_error is not None:
+                    raise part.last_error
+                return None
+            values[part.name] = value
+        return values
+    return Condition(check, name or " & ".join(p.name for p in parts))
+
+
+# ---- locator conditions ----
+
+def element_present(driver, by: str, value: str) -> Condition:
+    """First element matching the locator, through WDA (find_elements never raises on a miss)"""
+    def check():
+        elements = driver.find_elements(by, value)
+        return elements[0] if elements else None
+    return Condition(check, f"{by}={value}")
+
+
+def located(engine: LocatorEngine, by: str, value: str) -> Condition:
+    """First LocalElement matching the locator in a fresh page source (falls back to WDA if not local)"""
+    def check():
+        engine.invalidate()
+        try:
+            return engine.find(by, value, log=False)
+        except LocatorError:
+            elements = engine.driver.find_elements(by, value)
+            return elements[0] if elements else None
+    return Condition(check, f"{by}={value}")
+
+
+def located_any(engine: LocatorEngine, locators: Dict[str, Tuple[str, str]], name: Optional[str] = None) -> Condition:
+    """One page-source fetch per poll for all locators; value is (locator name, LocalElement)"""
+    def check():
+        engine.invalidate()
+        for key, element in engine.find_many(locators, log=False).items():
+            if element is not None:
+                return key, element
+        return None
+    return Condition(check, name or " | ".join(locators))
+
+
+def located_all(engine: LocatorEngine, locators: Dict[str, Tuple[str, str]], name: Optional[str] = None) -> Condition:
+    """One page-source fetch per poll for all locators; value is {locator name: LocalElement}"""
+    def check():
+        engine.invalidate()
+        found = engine.find_many(locators, log=False)
+        return found if all(e is not None for e in found.values()) else None
+    return Condition(check, name or " & ".join(locators))
+
+
+# ---- waiting ----
+
+@dataclass
+class WaitResult:
+    """Outcome of wait_until()"""
+    name: str
+    ok: bool
+    value: Any
+    elapsed: float
+    polls: int
+    timeout: float
+    error: Optional[str] = None
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            'name': self.name,
+            'ok': self.ok,
+            'elapsed': round(self.elapsed, 3),
+            'polls': self.polls,
+            'timeout': self.timeout,
+            'error': self.error,
+        }
+
+
+class WaitTimeout(Exception):
+    """Raised by wait_until() when the condition did not hold in time"""
+
+    def __init__(self, result: WaitResult):
+        detail = f" (last error: {result.error})" if result.error else ""
+        super().__init__(f"Timed out after {result.elapsed:.2f}s waiting for {result.name}{detail}")
+        self.result = result
+
+
+_stats_lock = threading.Lock()
+_samples: Dict[str, List[float]] = {}
+_timeouts: Dict[str, int] = {}
+
+
+def _record(result: WaitResult):
+    with _stats_lock:
+        samples = _samples.setdefault(result.name, [])
+        samples.append(result.elapsed)
+        if len(samples) > MAX_SAMPLES:
+            del samples[0]
+        if not result.ok:
+            _timeouts[result.name] = _timeouts.get(result.name, 0) + 1
+
+
+def wait_until(check, timeout: float = 10.0, initial: float = 0.05, max_interval: float = 1.0,
+               backoff: float = 1.5, name: Optional[str] = None, logger: Optional[AppiumLogger] = None,
+               raise_on_timeout: bool = True) -> WaitResult:
+    """Poll until the condition holds (first check is immediate); the interval grows by `backoff` up to max_interval"""
+    cond = condition(check, name)
+    label = name or cond.name
+    start = time.monotonic()
+    deadline = start + timeout
+    delay = initial
+    polls = 0
+    while True:
+        polls += 1
+        value = cond()
+        now = time.monotonic()
+        if value:
+            result = WaitResult(label, True, value, now - start, polls, timeout)
+            break
+        remaining = deadline - now
+        if remaining <= 0:
+            error = repr(cond.last_error) if cond.last_error is not None else None
+            result = WaitResult(label, False, None, now - start, polls, timeout, error)
+            break
+        time.sleep(min(delay, remaining))
+        delay = min(delay * backoff, max_interval)
+
+    _record(result)
+    if logger is not None:
+        logger.log_wait(result.name, result.elapsed, result.ok, result.polls, timeout)
+    if not result.ok and raise_on_timeout:
+        raise WaitTimeout(result)
+    return result
+
+
+def _percentile(values: Sequence[float], pct: float) -> float:
+    ordered = sorted(values)
+    rank = (len(ordered) - 1) * pct / 100.0
+    low = int(rank)
+    high = min(low + 1, len(ordered) - 1)
+    return ordered[low] + (ordered[high] - ordered[low]) * (rank - low)
+
+
+def wait_stats() -> Dict[str, Dict[str, Any]]:
+    """Per-wait count, timeouts and p50/p95/max seconds, to size timeouts from real runs"""
+    with _stats_lock:
+        data = {name: (list(samples), _timeouts.get(name, 0)) for name, samples in _samples.items()}
+    return {
+        name: {
+            'count': len(samples),
+            'timeouts': timeouts,
+            'p50': round(_percentile(samples, 50), 3),
+            'p95': round(_percentile(samples, 95), 3),
+            'max': round(max(samples), 3),
+        }
+        for name, (samples, timeouts) in data.items()
+    }
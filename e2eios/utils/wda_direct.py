@@ -0,0 +1,194 @@
+#!/usr/bin/env python3
+"""
+Direct-to-WDA Fast Path for Appium iOS Automation
+Sends a configurable set of hot WebDriver commands (find, click, actions,
+source, screenshot) straight to WebDriverAgent using the session Appium
+already opened there, skipping the Appium hop; every other command, and any
+hot command WDA cannot take, still goes through Appium
+"""
+
+import json
+import string
+import threading
+from typing import Any, Dict, Optional, Set, Tuple
+
+from e2eios.utils.http_client import get_client
+
+_DIRECT_ATTR = "_e2eios_wda_direct"
+
+# Selenium/Appium command name -> (HTTP method, WDA path)
+HOT_COMMANDS: Dict[str, Tuple[str, str]] = {
+    "findElement": ("POST", "/session/$sessionId/element"),
+    "findElements": ("POST", "/session/$sessionId/elements"),
+    "findChildElement": ("POST", "/session/$sessionId/element/$id/element"),
+    "findChildElements": ("POST", "/session/$sessionId/element/$id/elements"),
+    "clickElement": ("POST", "/session/$sessionId/element/$id/click"),
+    "sendKeysToElement": ("POST", "/session/$sessionId/element/$id/value"),
+    "clearElement": ("POST", "/session/$sessionId/element/$id/clear"),
+    "getElementRect": ("GET", "/session/$sessionId/element/$id/rect"),
+    "getElementAttribute": ("GET", "/session/$sessionId/element/$id/attribute/$name"),
+    "getElementText": ("GET", "/session/$sessionId/element/$id/text"),
+    "isElementDisplayed": ("GET", "/session/$sessionId/element/$id/displayed"),
+    "isElementEnabled": ("GET", "/session/$sessionId/element/$id/enabled"),
+    "actions": ("POST", "/session/$sessionId/actions"),
+    "getPageSource": ("GET", "/session/$sessionId/source"),
+    "screenshot": ("GET", "/screenshot"),
+}
+
+COMMAND_GROUPS: Dict[str, Tuple[str, ...]] = {
+    'find': ("findElement", "findElements", "findChildElement", "findChildElements"),
+    'click': ("clickElement",),
+    'keys': ("sendKeysToElement", "clearElement"),
+    'element': ("getElementRect", "getElementAttribute", "getElementText", "isElementDisplayed",
+                "isElementEnabled"),
+    'gestures': ("actions",),
+    'source': ("getPageSource",),
+    'screenshot': ("screenshot",),
+}
+DEFAULT_GROUPS = ('find', 'click', 'gestures', 'source', 'screenshot')
+
+# Appium locator strategy -> WDA strategy; anything else (e.g. css selector) stays on Appium
+WDA_STRATEGIES = {
+    "-ios predicate string": "predicate string",
+    "-ios class chain": "class chain",
+    "accessibility id": "accessibility id",
+    "class name": "class name",
+    "xpath": "xpath",
+    "id": "id",
+    "name": "name",
+}
+
+
+def resolve_commands(spec) -> Set[str]:
+    """Command names from group names/command names, a comma list (WDA_DIRECT=find,click) or 1/true for defaults"""
+    if spec is None or spec is True:
+        spec = DEFAULT_GROUPS
+    if isinstance(spec, str):
+        spec = DEFAULT_GROUPS if spec.strip().lower() in ("1", "true", "yes", "default") else spec.split(",")
+    commands: Set[str] = set()
+    for item in spec:
+        item = item.strip()
+        if item in COMMAND_GROUPS:
+            commands.update(COMMAND_GROUPS[item])
+        elif item in HOT_COMMANDS:
+            commands.add(item)
+        elif item:
+            raise ValueError(f"Unknown WDA direct command or group: {item}")
+    return commands
+
+
+def _is_invalid_session(response: Any) -> bool:
+    if not isinstance(response, dict) or response.get('status') in (None, 0, 200):
+        return False
+    return "invalid session id" in str(response.get('value'))
+
+
+class WdaDirect:
+    """Routes hot commands of Appium drivers to WDA; find commands do not apply Appium's implicit wait"""
+
+    def __init__(self, wda_url: str, commands=None, status_timeout: float = 5.0):
+        self.wda_url = wda_url.rstrip('/')
+        self.commands = resolve_commands(commands)
+        self.status_timeout = status_timeout
+        self._session_id: Optional[str] = None
+        self._lock = threading.Lock()
+        self._counts: Dict[str, Dict[str, int]] = {}
+
+    # ---- WDA session ----
+
+    def wda_session(self, refresh: bool = False) -> Optional[str]:
+        """WDA's current session id from /status (the one Appium created); cached until it goes stale"""
+        if self._session_id and not refresh:
+            return self._session_id
+        try:
+            response = get_client(self.wda_url).get("/status", timeout=self.status_timeout)
+            session_id = response.json().get("sessionId") if response.ok else None
+        except Exception:
+            session_id = None
+        self._session_id = session_id
+        return session_id
+
+    # ---- instrumentation ----
+
+    def attach(self, driver):
+        """Wrap driver.command_executor in place; attach before DriverTracer.instrument so tracing sees both paths"""
+        executor = driver.command_executor
+        if getattr(executor, _DIRECT_ATTR, None) is self:
+            return driver
+        if getattr(executor, _DIRECT_ATTR, None) is not None:
+            self.detach(driver)
+
+        saved = executor.__dict__.get("execute")
+        execute = executor.execute
+        direct = self
+
+        def direct_execute(command, params=None):
+            if command in direct.commands:
+                response = direct._send(executor, command, dict(params or {}))
+                if response is not None:
+                    direct._count(command, 'direct')
+                    return response
+                direct._count(command, 'fallback')
+            return execute(command, params)
+
+        executor.execute = direct_execute
+        setattr(executor, _DIRECT_ATTR, self)
+        setattr(executor, _DIRECT_ATTR + "_saved", saved)
+        return driver
+
+    @staticmethod
+    def detach(driver):
+        """Restore the executor's previous execute()"""
+        executor = driver.command_executor
+        if executor.__dict__.pop(_DIRECT_ATTR, None) is None:
+            return
+        saved = executor.__dict__.pop(_DIRECT_ATTR + "_saved", None)
+        if saved is None:
+            executor.__dict__.pop("execute", None)
+        else:
+            executor.execute = saved
+
+    def _send(self, executor, command: str, params: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """Response dict from WDA, or None to let Appium handle the command"""
+        method, path = HOT_COMMANDS[command]
+        if "using" in params:
+            using = WDA_STRATEGIES.get(params["using"])
+            if using is None:
+                return None
+            params["using"] = using
+
+        for attempt in range(2):
+            session_id = self.wda_session(refresh=attempt > 0)
+            if not session_id:
+                return None
+            values = dict(params, sessionId=session_id)
+            url = self.wda_url + string.Template(path).substitute(values)
+            body = {k: v for k, v in values.items() if k != "sessionId" and f"${k}" not in path}
+            try:
+                # The executor's own _request keeps Selenium's response parsing and error mapping
+                response = executor._request(method, url, body=json.dumps(body) if method == "POST" else None)
+            except Exception:
+                self._session_id = None
+                return None
+            if not _is_invalid_session(response):
+                return response
+        return None
+
+    # ---- reporting ----
+
+    def _count(self, command: str, route: str):
+        with self._lock:
+            entry = self._counts.setdefault(command, {'direct': 0, 'fallback': 0})
+            entry[route] += 1
+
+    def stats(self) -> Dict[str, Dict[str, int]]:
+        """Per-command counts of commands sent to WDA directly versus handed back to Appium"""
+        with self._lock:
+            return {command: dict(counts) for command, counts in self._counts.items()}
+
+
+def enable_wda_direct(driver, wda_url: str, commands=None) -> WdaDirect:
+    """Attach a WdaDirect to a driver and return it"""
+    direct = WdaDirect(wda_url, commands)
+    direct.attach(driver)
+    return direct
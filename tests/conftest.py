@@ -0,0 +1,8 @@
+import sys
+from pathlib import Path
+
+# Same layout as the scripts: import e2eios from the project root
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT))
+
+pytest_plugins = ["pytester"]
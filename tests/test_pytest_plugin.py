@@ -0,0 +1,79 @@
+"""Device sharding end to end: two fake devices, each a FakeServer standing in for its WDA"""
+
+import os
+
+import pytest
+
+from e2eios.benchmarks.fake_server import FakeServer
+from e2eios.utils.pytest_plugin import worker_args
+from e2eios.utils.sharding import DurationHistory
+
+from conftest import ROOT
+
+TESTS = """
+import os
+import pytest
+import requests
+
+
+def record(ios_device, name):
+    assert requests.get(ios_device.wda_url + "/status", timeout=5).status_code == 200
+    with open(os.environ["E2EIOS_TEST_RUNS"], "a") as f:
+        f.write(f"{name} {ios_device.udid}\\n")
+
+
+@pytest.mark.parametrize("n", range(4))
+def test_anywhere(ios_device, n):
+    record(ios_device, f"anywhere{n}")
+
+
+@pytest.mark.device("DEV-B")
+def test_pinned(ios_device):
+    record(ios_device, "pinned")
+
+
+def test_fails(ios_device):
+    record(ios_device, "fails")
+    assert False, "boom"
+"""
+
+
+@pytest.fixture
+def devices():
+    with FakeServer(kind="wda") as a, FakeServer(kind="wda") as b:
+        yield {"DEV-A": a.url, "DEV-B": b.url}
+
+
+def test_worker_args_drop_report_outputs():
+    args = ["-q", "--junitxml", "out.xml", "--html=r.html", "--self-contained-html", "-k", "smoke",
+            "--report-log", "log.jsonl", "tests/"]
+    assert worker_args(args) == ["-q", "-k", "smoke", "tests/"]
+
+
+def test_tests_are_sharded_pinned_and_replayed(pytester, devices, monkeypatch):
+    runs = pytester.path / "runs.txt"
+    monkeypatch.setenv("E2EIOS_TEST_RUNS", str(runs))
+    monkeypatch.setenv("PYTHONPATH", os.pathsep.join(filter(None, [str(ROOT), os.environ.get("PYTHONPATH")])))
+    pytester.makepyfile(test_shards=TESTS)
+    spec = ",".join(f"{udid}={url}" for udid, url in devices.items())
+
+    result = pytester.runpytest_subprocess(
+        "-p", "e2eios.utils.pytest_plugin", f"--e2eios-devices={spec}",
+        f"--e2eios-durations={pytester.path / 'durations.json'}", f"--e2eios-log-dir={pytester.path / 'logs'}",
+        "--junitxml", str(pytester.path / "junit.xml"))
+
+    # Results come back through the controller's own reporting, failures included
+    result.assert_outcomes(passed=5, failed=1)
+    result.stdout.fnmatch_lines(["*e2eios device shards*", "*DEV-A: * tests*", "*DEV-B: * tests*"])
+    ran = dict(line.split() for line in runs.read_text().splitlines())
+    assert len(ran) == 6
+    assert ran["pinned"] == "DEV-B"
+    assert set(ran.values()) == {"DEV-A", "DEV-B"}
+
+    # Only the controller writes the junit report, with every test in it
+    junit = (pytester.path / "junit.xml").read_text()
+    assert junit.count("<testcase") == 6
+    for udid in devices:
+        assert "junit.xml" not in (pytester.path / "logs" / f"pytest-{udid}.log").read_text()
+
+    assert len(DurationHistory(pytester.path / "durations.json")) == 6
@@ -0,0 +1,157 @@
+"""ServiceSupervisor against a fake go-ios executable (no device needed)"""
+
+import json
+import os
+import socket
+import subprocess
+import sys
+import time
+
+import pytest
+
+from e2eios.utils.goios import GoIosExecutor
+from e2eios.utils.supervisor import ServiceSupervisor, _pid_alive, _process_started, default_stages
+
+pytestmark = pytest.mark.skipif(os.name == "nt", reason="fake go-ios is a #! script")
+
+# forward serves WDA's /status on the forwarded port, answering 200 once runwda is up
+FAKE_IOS = """\
+#!{python}
+import http.server, os, pathlib, sys, time
+
+state = pathlib.Path(os.environ["FAKE_IOS_STATE"])
+with open(state / "events.log", "a") as f:
+    f.write(sys.argv[1] + "\\n")
+if sys.argv[1] == "forward":
+    class Handler(http.server.BaseHTTPRequestHandler):
+        def do_GET(self):
+            self.send_response(200 if (state / "wda.up").exists() else 503)
+            self.end_headers()
+            self.wfile.write(b'{{"value": {{}}}}')
+
+        def log_message(self, *args):
+            pass
+
+    http.server.HTTPServer(("127.0.0.1", int(sys.argv[2])), Handler).serve_forever()
+elif sys.argv[1] == "runwda":
+    time.sleep(0.2)
+    (state / "wda.up").touch()
+    while True:
+        time.sleep(1)
+else:
+    time.sleep(0.2)
+"""
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+@pytest.fixture
+def fake_ios(tmp_path, monkeypatch):
+    exe = tmp_path / "ios"
+    exe.write_text(FAKE_IOS.format(python=sys.executable), encoding="utf-8")
+    exe.chmod(0o755)
+    monkeypatch.setenv("FAKE_IOS_STATE", str(tmp_path))
+    return exe
+
+
+@pytest.fixture
+def env():
+    return {"IOS_UDID": "FAKE-UDID", "WDA_URL": f"http://127.0.0.1:{free_port()}", "STARTUP_TIMEOUT": "15"}
+
+
+@pytest.fixture
+def supervisor(fake_ios, tmp_path):
+    messages = []
+    sup = ServiceSupervisor(GoIosExecutor(str(fake_ios)), log_dir=tmp_path / "logs",
+                            log=lambda message, level="info": messages.append((level, message)))
+    sup.messages = messages
+    yield sup
+    sup.stop(timeout=2)
+
+
+def events(tmp_path):
+    return (tmp_path / "events.log").read_text().split()
+
+
+def test_stages_start_in_dependency_order(supervisor, env, tmp_path):
+    report = supervisor.start(default_stages(env))
+
+    assert report.ok, report.timeline()
+    assert [report[name].status for name in ("image", "forward", "wda")] == ["ready"] * 3
+    # image and forward run side by side; runwda waits for both
+    assert report["image"].started < report["forward"].finished
+    assert report["wda"].started >= max(report["image"].finished, report["forward"].finished)
+    assert events(tmp_path)[-1] == "runwda"
+
+
+def test_satisfied_stages_are_skipped(supervisor, fake_ios, env, tmp_path):
+    assert supervisor.start(default_stages(env)).ok
+    spawned = len(events(tmp_path))
+
+    again = ServiceSupervisor(GoIosExecutor(str(fake_ios)), log_dir=tmp_path / "logs")
+    report = again.start(default_stages(env))
+
+    assert [r.status for r in report.results] == ["skipped"] * 3
+    assert len(events(tmp_path)) == spawned
+
+
+def test_stop_from_state_file_kills_only_recorded_processes(supervisor, fake_ios, env, tmp_path):
+    report = supervisor.start(default_stages(env))
+    pids = [report["forward"].pid, report["wda"].pid]
+
+    # A later CLI run only has the state file to go on
+    stopped = ServiceSupervisor(GoIosExecutor(str(fake_ios)), log_dir=tmp_path / "logs").stop(timeout=2)
+
+    assert sorted(stopped) == ["forward", "wda"]
+    assert not any(_pid_alive(pid) for pid in pids)
+    assert not (tmp_path / "logs" / "supervisor.json").exists()
+
+
+@pytest.mark.parametrize("mismatch", ["started", "cmd"])
+def test_stop_leaves_reused_pids_alone(fake_ios, tmp_path, mismatch):
+    # Stands in for an unrelated process that got the PID of an old forward
+    other = subprocess.Popen([sys.executable, "-c", "import time; time.sleep(30)"])
+    try:
+        entry = {'pid': other.pid, 'args': ["forward", "8200", "8100"],
+                 'cmd': [sys.executable, "-c", "import time; time.sleep(30)"],
+                 'started': _process_started(other.pid)}
+        if mismatch == "started":
+            entry['started'] -= 3600
+        else:
+            entry['cmd'] = [str(fake_ios), "forward", "8200", "8100"]
+        log_dir = tmp_path / "logs"
+        log_dir.mkdir()
+        (log_dir / "supervisor.json").write_text(json.dumps({'forward': entry}))
+        messages = []
+
+        sup = ServiceSupervisor(GoIosExecutor(str(fake_ios)), log_dir=log_dir,
+                                log=lambda message, level="info": messages.append((level, message)))
+        stopped = sup.stop(timeout=1)
+
+        assert stopped == []
+        assert other.poll() is None
+        assert messages and messages[0][0] == "warning" and str(other.pid) in messages[0][1]
+    finally:
+        other.kill()
+        other.wait()
+
+
+def test_stop_kills_matching_recorded_process(fake_ios, tmp_path):
+    proc = subprocess.Popen([sys.executable, "-c", "import time; time.sleep(30)"])
+    log_dir = tmp_path / "logs"
+    log_dir.mkdir()
+    (log_dir / "supervisor.json").write_text(json.dumps({'forward': {
+        'pid': proc.pid, 'args': ["-c", "import time; time.sleep(30)"],
+        'cmd': [sys.executable, "-c", "import time; time.sleep(30)"], 'started': _process_started(proc.pid)}}))
+
+    stopped = ServiceSupervisor(GoIosExecutor(str(fake_ios)), log_dir=log_dir).stop(timeout=1)
+
+    assert stopped == ["forward"]
+    deadline = time.monotonic() + 2
+    while proc.poll() is None and time.monotonic() < deadline:
+        time.sleep(0.05)
+    assert proc.poll() is not None